@@ -1,45 +1,70 @@
 import cv2
-from picamera2 import Picamera2
+import numpy as np
 import time
+import sys
 
-class CameraReader:
-    def __init__(self, main_resolution=(1024, 1024), raw_resolution=(2028, 1520)):
-        """Initialize the camera and set it up with custom resolution."""
-        self.camera = Picamera2()
+class CameraSource:
+    """Common interface of every frame source used by the vision pipeline.
 
-        self.camera.configure(
-            self.camera.create_preview_configuration(
-                raw={"size": raw_resolution},
-                main={"format": 'RGB888', "size": main_resolution}
-            )
-        )
+    Subclasses implement _read(). When fps is set, capture_image() paces the
+    source to that rate; sources that are paced by hardware pass fps=None.
+    A source that can run out of frames (a video file played once) sets finished.
+    """
 
-        self.camera.start()
+    # Longest wait between reads while the source returns nothing
+    MAX_BACKOFF = 1.0
+
+    def __init__(self, main_resolution=(1024, 1024), fps=30):
+        self.main_resolution = tuple(main_resolution)   # (width, height)
+        self.fps = fps
+        self.finished = False
+        self._next_frame_time = None
+
+    def _read(self):
+        raise NotImplementedError
+
+    def _pace(self):
+        """Sleep until the next frame is due, without accumulating drift."""
+        if not self.fps:
+            return
+        now = time.perf_counter()
+        if self._next_frame_time is None or now - self._next_frame_time > 1.0:
+            self._next_frame_time = now
+        delay = self._next_frame_time - now
+        if delay > 0:
+            time.sleep(delay)
+        self._next_frame_time += 1.0 / self.fps
 
     def capture_image(self):
         """Capture a single image."""
-        image = self.camera.capture_array()
-        return image
+        self._pace()
+        return self._read()
 
     def continous_capture(self):
-        """Capture images continuously."""
-        while True:
-            image = self.camera.capture_array()
+        """Capture images continuously, until the source is finished."""
+        backoff = 0.01
+        while not self.finished:
+            image = self.capture_image()
             if image is not None:
+                backoff = 0.01
                 yield image
+            elif not self.finished:
+                # Nothing from the device (unpaced sources would otherwise spin): wait, longer each time
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.MAX_BACKOFF)
 
     def stop_camera(self):
         """Stop the camera and release resources."""
-        self.camera.stop()
+        pass
 
     def test_camera(self):
         """Test the camera by continuously showing the captured image."""
         while True:
-            image = self.camera.capture_array()
+            image = self.capture_image()
             if image is not None:
                 cv2.imshow("Output", image)
                 # Press 'q' to quit the loop
-                if cv2.waitKey(34) & 0xFF == ord('q'):
+                if cv2.waitKey(1) & 0xFF == ord('q'):
                     break
             else:
                 print("[WARNING] No image captured.")
@@ -49,10 +74,127 @@ class CameraReader:
         cv2.destroyAllWindows()
         print("[INFO] Camera stopped.")
 
+
+class CameraReader(CameraSource):
+    """Raspberry Pi camera through Picamera2; the sensor itself paces the frames."""
+
+    def __init__(self, main_resolution=(1024, 1024), raw_resolution=(2028, 1520), fps=30):
+        """Initialize the camera and set it up with custom resolution."""
+        from picamera2 import Picamera2     # only available on the Pi
+
+        super().__init__(main_resolution=main_resolution, fps=None)
+        self.camera = Picamera2()
+
+        self.camera.configure(
+            self.camera.create_preview_configuration(
+                raw={"size": raw_resolution},
+                main={"format": 'RGB888', "size": self.main_resolution},
+                controls={"FrameRate": fps}
+            )
+        )
+
+        self.camera.start()
+
+    def _read(self):
+        return self.camera.capture_array()
+
+    def stop_camera(self):
+        """Stop the camera and release resources."""
+        self.camera.stop()
+
+
+class VideoCaptureSource(CameraSource):
+    """OpenCV VideoCapture on a video file (looped) or a device index such as 0."""
+
+    def __init__(self, source="tests/Vids/The Hobbit.mp4", main_resolution=(1024, 1024), fps=None, loop=True):
+        self.source = int(source) if str(source).isdigit() else source
+        self.is_device = isinstance(self.source, int)
+        self.cap = cv2.VideoCapture(self.source)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open video source: {source}")
+
+        if self.is_device:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, main_resolution[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, main_resolution[1])
+            if fps:
+                self.cap.set(cv2.CAP_PROP_FPS, fps)
+            fps = None      # a device delivers frames at its own rate
+        elif fps is None:
+            fps = self.cap.get(cv2.CAP_PROP_FPS) or 30      # play the file at its native rate
+
+        super().__init__(main_resolution=main_resolution, fps=fps)
+        self.loop = loop
+
+    def _read(self):
+        success, image = self.cap.read()
+        if not success and self.loop and not self.is_device:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, image = self.cap.read()
+        if not success:
+            self.finished = not self.is_device and not self.loop
+            return None
+
+        if (image.shape[1], image.shape[0]) != self.main_resolution:
+            image = cv2.resize(image, self.main_resolution, interpolation=cv2.INTER_AREA)
+        return image
+
+    def stop_camera(self):
+        self.cap.release()
+
+
+class SyntheticSource(CameraSource):
+    """Generated frames (a square moving over a gradient) for benchmarks without any camera."""
+
+    def __init__(self, main_resolution=(1024, 1024), fps=30, square_size=None):
+        super().__init__(main_resolution=main_resolution, fps=fps)
+        width, height = self.main_resolution
+        self.square_size = square_size or max(min(width, height) // 4, 1)
+        self.frame_index = 0
+
+        gradient_x = np.linspace(0, 255, width, dtype=np.uint8)
+        gradient_y = np.linspace(0, 255, height, dtype=np.uint8)
+        self._background = np.empty((height, width, 3), dtype=np.uint8)
+        self._background[..., 0] = gradient_x[None, :]
+        self._background[..., 1] = gradient_y[:, None]
+        self._background[..., 2] = 96
+
+    def _read(self):
+        width, height = self.main_resolution
+        image = self._background.copy()
+
+        # Move the square along a circle so consecutive frames differ a little
+        angle = self.frame_index * 2 * np.pi / 120
+        x = int((width - self.square_size) * (0.5 + 0.4 * np.cos(angle)))
+        y = int((height - self.square_size) * (0.5 + 0.4 * np.sin(angle)))
+        cv2.rectangle(image, (x, y), (x + self.square_size, y + self.square_size), (255, 255, 255), -1)
+        cv2.putText(image, str(self.frame_index), (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+
+        self.frame_index += 1
+        return image
+
+
+CAMERA_SOURCES = {
+    "picamera": CameraReader,
+    "video": VideoCaptureSource,
+    "synthetic": SyntheticSource,
+}
+
+
+def create_camera(kind="picamera", **options):
+    """Build a camera source by name ("picamera", "video" or "synthetic")."""
+    try:
+        source_cls = CAMERA_SOURCES[kind]
+    except KeyError:
+        raise ValueError(f"Unknown camera source '{kind}', expected one of {list(CAMERA_SOURCES)}.")
+    return source_cls(**options)
+
+
 # Usage Example:
 if __name__ == "__main__":
-    camera_reader = CameraReader()
-    
+    # python src/camera.py [picamera|video|synthetic]
+    kind = sys.argv[1] if len(sys.argv) > 1 else "picamera"
+    camera_reader = create_camera(kind)
+
     # Example of capturing a single image
     single_image = camera_reader.capture_image()
     if single_image is not None:
@@ -0,0 +1,304 @@
+import os, hashlib, inspect
+import numpy as np
+
+from face_index import FaceIndex
+
+try:
+    import hnswlib
+except ImportError:  # optional backend
+    hnswlib = None
+
+
+class IVFFaceIndex(FaceIndex):
+    """Inverted-file (IVF) approximate index in pure NumPy.
+
+    The gallery is partitioned into ``nlist`` clusters by spherical k-means and a
+    query only scans the rows of its ``nprobe`` nearest clusters. Raising nprobe
+    trades latency for recall; nprobe == nlist is an exact search. Until the
+    gallery holds ``min_train_size`` faces the index behaves like FaceIndex.
+
+    A gallery grown one add() at a time is trained when it reaches min_train_size,
+    and retrained once it has grown ``retrain_growth`` times past its last training,
+    when the clusters (and a sqrt(n) nlist) no longer fit the faces added since.
+    """
+
+    def __init__(self, dim=512, capacity=1024, nlist=0, nprobe=8, min_train_size=2048, train_iters=10,
+                 retrain_growth=2.0):
+        super().__init__(dim=dim, capacity=capacity)
+        self.nlist = nlist              # 0 = choose sqrt(n) at train time
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.train_iters = train_iters
+        self.retrain_growth = retrain_growth
+        self._centroids = None
+        self._trained_size = 0          # gallery size at the last training
+        self._assign = np.zeros(self._matrix.shape[0], dtype=np.int32)   # row -> cluster
+        self._sorted_rows = None        # rows grouped by cluster, rebuilt lazily after mutations
+        self._offsets = None
+
+    @property
+    def is_trained(self):
+        return self._centroids is not None
+
+    def needs_training(self):
+        """True when the gallery is large enough to train and untrained, or has outgrown its clusters."""
+        if self._size < self.min_train_size:
+            return False
+        return not self.is_trained or self._size >= self.retrain_growth * self._trained_size
+
+    def _nearest_centroid(self, vectors):
+        return np.argmax(vectors @ self._centroids.T, axis=-1).astype(np.int32)
+
+    def _add_row(self, user_id, name, embedding):
+        super().add(user_id, name, embedding)
+        if self._assign.shape[0] < self._matrix.shape[0]:
+            self._assign = np.resize(self._assign, self._matrix.shape[0])
+
+        row = self._rows[user_id]
+        self._assign[row] = self._nearest_centroid(self._matrix[row]) if self.is_trained else 0
+        self._sorted_rows = None
+
+    def add(self, user_id, name, embedding):
+        with self._lock:
+            self._add_row(user_id, name, embedding)
+            if self.needs_training():
+                self.train()
+
+    def remove(self, user_id):
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                return False
+
+            last = self._size - 1
+            super().remove(user_id)
+            self._assign[row] = self._assign[last]
+            self._sorted_rows = None
+            return True
+
+    def rebuild(self, entries):
+        # Trained once at the end rather than at every threshold add() would cross
+        with self._lock:
+            self.clear()
+            for user_id, name, embedding in entries:
+                self._add_row(user_id, name, embedding)
+            self.train()
+
+    def train(self, seed=0):
+        """(Re)cluster the current gallery and reassign every row."""
+        with self._lock:
+            vectors = self._matrix[:self._size]
+            if self._size < self.min_train_size:
+                self._centroids = None
+                self._trained_size = 0
+                self._assign[:self._size] = 0
+                self._sorted_rows = None
+                return
+
+            nlist = self.nlist or int(np.sqrt(self._size))
+            rng = np.random.default_rng(seed)
+
+            # Train on a sample, then assign the full gallery once
+            sample_size = min(self._size, nlist * 64)
+            sample = vectors[rng.choice(self._size, sample_size, replace=False)]
+            centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+            for _ in range(self.train_iters):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                empty = norms[:, 0] == 0
+                centroids = np.where(empty[:, None], centroids, sums / np.maximum(norms, 1e-12))
+                if empty.any():
+                    centroids[empty] = sample[rng.choice(sample_size, int(empty.sum()), replace=False)]
+
+            self._centroids = centroids.astype(np.float32)
+            self._trained_size = self._size
+            self._assign[:self._size] = self._nearest_centroid(vectors)
+            self._sorted_rows = None
+            self.dirty = True
+
+    def _cluster_rows(self):
+        if self._sorted_rows is None:
+            nlist = self._centroids.shape[0]
+            assign = self._assign[:self._size]
+            self._sorted_rows = np.argsort(assign, kind="stable")
+            self._offsets = np.searchsorted(assign[self._sorted_rows], np.arange(nlist + 1))
+        return self._sorted_rows, self._offsets
+
+    def search(self, embedding, k=1):
+        if not self.is_trained:
+            return super().search(embedding, k)
+
+        query = self.normalize(embedding)
+
+        with self._lock:
+            if self._size == 0:
+                return []
+
+            nprobe = min(self.nprobe, self._centroids.shape[0])
+            probes = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+
+            sorted_rows, offsets = self._cluster_rows()
+            candidates = np.concatenate([sorted_rows[offsets[p]:offsets[p + 1]] for p in probes])
+            if candidates.shape[0] < k:
+                return super().search(embedding, k)
+
+            similarities = self._matrix[candidates] @ query
+
+            k = min(k, candidates.shape[0])
+            top = np.argpartition(-similarities, k - 1)[:k]
+            top = top[np.argsort(-similarities[top])]
+
+            distances = np.sqrt(np.maximum(2.0 - 2.0 * similarities[top], 0.0))
+            return [
+                (self._ids[candidates[i]], self._names[candidates[i]], float(dist))
+                for i, dist in zip(top, distances)
+            ]
+
+    def best_matches(self, embeddings):
+        return [self.best_match(embedding) for embedding in embeddings]
+
+    def _state(self):
+        state = super()._state()
+        state["assign"] = self._assign[:self._size]
+        if self.is_trained:
+            state["centroids"] = self._centroids
+            state["trained_size"] = np.asarray(self._trained_size)
+        return state
+
+    def _load_state(self, state):
+        super()._load_state(state)
+        self._assign = np.zeros(self._matrix.shape[0], dtype=np.int32)
+        self._assign[:self._size] = state["assign"]
+        self._centroids = state["centroids"] if "centroids" in state else None
+        if self.is_trained:
+            self._trained_size = int(state["trained_size"]) if "trained_size" in state else self._size
+        else:
+            self._trained_size = 0
+        self._sorted_rows = None
+
+    def load(self, path):
+        # A file saved untrained (or before the gallery outgrew its clusters) is trained
+        # now, and left dirty so the periodic save writes the clusters back
+        super().load(path)
+        with self._lock:
+            if self.needs_training():
+                self.train()
+
+
+class HNSWFaceIndex(FaceIndex):
+    """Graph-based approximate index backed by the optional ``hnswlib`` package.
+
+    Embeddings are also kept in the FaceIndex matrix so the gallery can be saved,
+    renamed and reloaded like the other backends. ``ef`` is the query-time
+    recall/latency knob; ``m`` and ``ef_construction`` shape the graph.
+    """
+
+    def __init__(self, dim=512, capacity=1024, m=16, ef_construction=200, ef=64):
+        if hnswlib is None:
+            raise ImportError("hnswlib is not installed (pip install hnswlib).")
+
+        super().__init__(dim=dim, capacity=capacity)
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef = ef
+        self._graph = self._new_graph(capacity)
+
+    def _new_graph(self, capacity):
+        graph = hnswlib.Index(space="ip", dim=self.dim)
+        graph.init_index(max_elements=max(capacity, 1), M=self.m, ef_construction=self.ef_construction)
+        graph.set_ef(self.ef)
+        return graph
+
+    def add(self, user_id, name, embedding):
+        with self._lock:
+            super().add(user_id, name, embedding)
+            if self._graph.get_current_count() >= self._graph.get_max_elements():
+                self._graph.resize_index(self._graph.get_max_elements() * 2)
+            self._graph.add_items(self._matrix[self._rows[user_id]][None, :], [user_id])
+
+    def remove(self, user_id):
+        with self._lock:
+            if not super().remove(user_id):
+                return False
+            self._graph.mark_deleted(user_id)
+            return True
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+            self._graph = self._new_graph(self._matrix.shape[0])
+
+    def search(self, embedding, k=1):
+        query = self.normalize(embedding)
+
+        with self._lock:
+            if self._size == 0:
+                return []
+
+            k = min(k, self._size)
+            self._graph.set_ef(max(self.ef, k))
+            labels, distances = self._graph.knn_query(query, k=k)
+
+            # hnswlib "ip" distance is 1 - cos; convert to the Euclidean scale of FaceIndex
+            return [
+                (int(user_id), self._names[self._rows[int(user_id)]], float(np.sqrt(max(2.0 * dist, 0.0))))
+                for user_id, dist in zip(labels[0], distances[0])
+            ]
+
+    def best_matches(self, embeddings):
+        return [self.best_match(embedding) for embedding in embeddings]
+
+    @staticmethod
+    def _file_digest(path):
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, "blake2b").hexdigest()
+
+    def save(self, path):
+        # The graph goes to a temporary file too; the .npz, replaced last, records its digest,
+        # so a crash between the two renames is caught by load() rather than serving a graph
+        # whose labels the row map does not know
+        with self._lock:
+            graph_path = path + ".hnsw"
+            self._graph.save_index(graph_path + ".tmp")
+            self._graph_digest = self._file_digest(graph_path + ".tmp")
+            os.replace(graph_path + ".tmp", graph_path)
+            super().save(path)
+
+    def _state(self):
+        state = super()._state()
+        state["graph_digest"] = np.asarray(self._graph_digest)
+        return state
+
+    def _load_state(self, state):
+        if "graph_digest" not in state or self._file_digest(self._graph_path) != str(state["graph_digest"]):
+            raise ValueError(f"{self._graph_path} does not belong to the saved index.")
+        super()._load_state(state)
+        self._graph_digest = str(state["graph_digest"])
+        self._graph = hnswlib.Index(space="ip", dim=self.dim)
+        self._graph.load_index(self._graph_path, max_elements=self._matrix.shape[0])
+        self._graph.set_ef(self.ef)
+
+    def load(self, path):
+        self._graph_path = path + ".hnsw"
+        super().load(path)
+
+
+FACE_INDEX_BACKENDS = {
+    "exact": FaceIndex,
+    "ivf": IVFFaceIndex,
+    "hnsw": HNSWFaceIndex,
+}
+
+
+def create_face_index(backend="exact", **options):
+    """Build an empty gallery index. Unknown options for the chosen backend are ignored."""
+    try:
+        index_cls = FACE_INDEX_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown face index backend '{backend}', expected one of {list(FACE_INDEX_BACKENDS)}.")
+
+    accepted = inspect.signature(index_cls).parameters
+    return index_cls(**{key: value for key, value in options.items() if key in accepted})
@@ -0,0 +1,145 @@
+# balances.py
+#
+# item_balances holds, per item, the quantity stocked in boxes (the sum of box_items) and
+# the quantity users hold (the sum of user_items), so /inventory/{item_id} is one primary
+# key lookup. Every route that changes box_items or user_items passes its per-item deltas
+# to balance_statements() and runs the statements in its own transaction.
+# ItemMaster.total_quantity follows in_boxes.
+#
+# Consistency check:    cd RFID-Vision-Logger/web/backend/
+#                       python balances.py          (report items whose balance is off)
+#                       python balances.py --fix    (rebuild the table from boxes and logs)
+
+import sys, itertools, collections
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.sqlite import insert
+from models import ItemMaster, BoxItem, UserItem, ItemLogLine, ItemBalance
+
+balances = ItemBalance.__table__
+item_master = ItemMaster.__table__
+
+
+def balance_statements(in_boxes=None, checked_out=None):
+    """Statements adding per-item deltas ({item_id: delta}) to item_balances, for the caller to execute.
+
+    Core statements, so the same call serves the sync and the async sessions; with a
+    sync session, flush the ORM changes first.
+    """
+    in_boxes, checked_out = in_boxes or {}, checked_out or {}
+    item_ids = sorted(item_id for item_id in set(in_boxes) | set(checked_out)
+                      if in_boxes.get(item_id) or checked_out.get(item_id))
+    if not item_ids:
+        return []
+
+    upsert = insert(balances).values([
+        {"item_id": item_id, "in_boxes": in_boxes.get(item_id, 0), "checked_out": checked_out.get(item_id, 0)}
+        for item_id in item_ids
+    ])
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[balances.c.item_id],
+        set_={
+            "in_boxes": balances.c.in_boxes + upsert.excluded.in_boxes,
+            "checked_out": balances.c.checked_out + upsert.excluded.checked_out,
+        }
+    )
+    statements = [upsert]
+
+    stocked = [item_id for item_id in item_ids if in_boxes.get(item_id)]
+    if stocked:
+        statements.append(
+            update(item_master)
+            .where(item_master.c.id.in_(stocked))
+            .values(total_quantity=select(balances.c.in_boxes).where(balances.c.item_id == item_master.c.id).scalar_subquery())
+        )
+    return statements
+
+
+# ---------------------------------------------------------------- consistency check
+
+def replay_checked_out(db):
+    """Per item, the quantity users hold according to the item logs.
+
+    Replays item_log_lines, one log at a time, through logbook.apply_log(): the rules
+    /create-log, /create-logs and the journal's writer record logs with.
+    """
+    from logbook import apply_log        # logbook imports balance_statements from here
+
+    held = {}               # (user_id, item_id) -> quantity
+    lines = db.execute(
+        select(ItemLogLine.log_id, ItemLogLine.user_id, ItemLogLine.item_id, ItemLogLine.quantity, ItemLogLine.direction)
+        .order_by(ItemLogLine.log_id, ItemLogLine.id)
+        .execution_options(yield_per=5000)
+    )
+    for _, log_lines in itertools.groupby(lines, key=lambda line: line.log_id):
+        log_lines = list(log_lines)
+        items = {"added": [], "returned": []}
+        for line in log_lines:
+            items[line.direction].append({"item_id": line.item_id, "quantity": line.quantity})
+        apply_log(held, log_lines[0].user_id, items["added"], items["returned"])
+
+    totals = collections.Counter()
+    for (_, item_id), quantity in held.items():
+        totals[item_id] += quantity
+    return totals
+
+
+def expected_balances(db):
+    in_boxes = dict(db.execute(select(BoxItem.item_id, func.sum(BoxItem.quantity)).group_by(BoxItem.item_id)).all())
+    checked_out = replay_checked_out(db)
+    return {
+        item_id: (in_boxes.get(item_id) or 0, checked_out.get(item_id, 0))
+        for item_id in set(in_boxes) | set(checked_out)
+    }
+
+
+def check_balances(db):
+    """Items whose stored balance differs from box_items and the replayed logs.
+
+    user_items is reported next to them: it should always match the replayed logs.
+    """
+    stored = {row.item_id: (row.in_boxes, row.checked_out) for row in db.execute(select(balances))}
+    held = dict(db.execute(select(UserItem.item_id, func.sum(UserItem.quantity)).group_by(UserItem.item_id)).all())
+    expected = expected_balances(db)
+
+    differences = []
+    for item_id in sorted(set(stored) | set(expected) | set(held)):
+        want = expected.get(item_id, (0, 0))
+        have = stored.get(item_id, (0, 0))
+        user_items = held.get(item_id) or 0
+        if have != want or user_items != want[1]:
+            differences.append({
+                "item_id": item_id,
+                "stored": {"in_boxes": have[0], "checked_out": have[1]},
+                "expected": {"in_boxes": want[0], "checked_out": want[1]},
+                "user_items": user_items,
+            })
+    return differences
+
+
+def rebuild_balances(db):
+    """Rewrite item_balances (and total_quantity) from box_items and the replayed logs; the caller commits."""
+    expected = expected_balances(db)
+    db.execute(delete(balances))
+    rows = [
+        {"item_id": item_id, "in_boxes": in_boxes, "checked_out": checked_out}
+        for item_id, (in_boxes, checked_out) in sorted(expected.items())
+    ]
+    if rows:
+        db.execute(balances.insert(), rows)
+    db.execute(update(item_master).values(total_quantity=func.coalesce(
+        select(balances.c.in_boxes).where(balances.c.item_id == item_master.c.id).scalar_subquery(), 0
+    )))
+    return len(rows)
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, init_db
+    init_db()
+    with SessionLocal() as db:
+        differences = check_balances(db)
+        for difference in differences:
+            print(difference)
+        print(f"{len(differences)} items out of balance")
+        if differences and "--fix" in sys.argv:
+            print(f"Rebuilt {rebuild_balances(db)} balances")
+            db.commit()
@@ -0,0 +1,89 @@
+# Recall and latency of the approximate gallery indexes against the exact FaceIndex.
+#
+# To run:   cd RFID-Vision-Logger/web/backend/
+#           python benchmarks/ann_index_bench.py [gallery_size]
+
+import os, sys, time, tempfile
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from face_index import FaceIndex
+from ann_index import IVFFaceIndex, HNSWFaceIndex, hnswlib
+
+DIM = 512
+QUERIES = 200
+NOISE = 0.35        # spread between a person's enrolment photo and a live capture
+
+
+def make_gallery(n, rng):
+    """Enrolled embeddings plus one noisy live capture per queried person."""
+    people = rng.standard_normal((n, DIM)).astype(np.float32)
+    gallery = people + NOISE * rng.standard_normal((n, DIM)).astype(np.float32)
+    asked = rng.choice(n, QUERIES, replace=False)
+    queries = people[asked] + NOISE * rng.standard_normal((QUERIES, DIM)).astype(np.float32)
+    return gallery, queries
+
+
+def run_queries(index, queries):
+    start = time.perf_counter()
+    results = [index.search(q, k=1)[0][0] for q in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def timed_build(index, gallery):
+    start = time.perf_counter()
+    index.rebuild((i, f"user_{i}", gallery[i]) for i in range(len(gallery)))
+    return time.perf_counter() - start
+
+
+def timed_reload(index, empty_index):
+    path = os.path.join(tempfile.mkdtemp(), "face_index.npz")
+    index.save(path)
+    start = time.perf_counter()
+    empty_index.load(path)
+    return time.perf_counter() - start
+
+
+def report(label, results, truth, latency_ms, exact_ms):
+    recall = np.mean([r == t for r, t in zip(results, truth)])
+    print(f"{label:<22} | recall@1 {recall:6.3f} | {latency_ms:8.3f} ms/query | {exact_ms / latency_ms:6.1f}x")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = np.random.default_rng(0)
+    gallery, queries = make_gallery(n, rng)
+
+    exact = FaceIndex(dim=DIM, capacity=n)
+    build_s = timed_build(exact, gallery)
+    truth, exact_ms = run_queries(exact, queries)
+    print(f"Gallery of {n} faces, {QUERIES} queries")
+    print(f"exact: build {build_s:.2f} s, reload {timed_reload(exact, FaceIndex(dim=DIM)):.2f} s\n")
+    report("exact", truth, truth, exact_ms, exact_ms)
+
+    ivf = IVFFaceIndex(dim=DIM, capacity=n)
+    build_s = timed_build(ivf, gallery)
+    reload_s = timed_reload(ivf, IVFFaceIndex(dim=DIM))
+    for nprobe in [1, 4, 8, 16, 32, 64]:
+        ivf.nprobe = nprobe
+        results, ms = run_queries(ivf, queries)
+        report(f"ivf nprobe={nprobe}", results, truth, ms, exact_ms)
+    print(f"ivf: build {build_s:.2f} s, reload {reload_s:.2f} s\n")
+
+    if hnswlib is None:
+        print("hnswlib not installed, skipping the HNSW backend.")
+        return
+
+    hnsw = HNSWFaceIndex(dim=DIM, capacity=n)
+    build_s = timed_build(hnsw, gallery)
+    reload_s = timed_reload(hnsw, HNSWFaceIndex(dim=DIM))
+    for ef in [16, 32, 64, 128]:
+        hnsw.ef = ef
+        results, ms = run_queries(hnsw, queries)
+        report(f"hnsw ef={ef}", results, truth, ms, exact_ms)
+    print(f"hnsw: build {build_s:.2f} s, reload {reload_s:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
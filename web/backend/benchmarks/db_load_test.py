@@ -0,0 +1,219 @@
+# Several kiosks logging and reading boxes at the same time, old data layer vs new.
+#
+#   sync      sync sessions on a threadpool, default (rollback) journal - the old setup
+#   async     aiosqlite sessions on the event loop, WAL + busy_timeout + synchronous=NORMAL
+#
+# To run:   cd RFID-Vision-Logger/web/backend/
+#           python benchmarks/db_load_test.py [kiosks] [seconds]
+#           python benchmarks/db_load_test.py --url http://localhost:8000 [kiosks] [seconds]
+#
+# The first form runs both setups against a scratch copy of the schema in a temp directory
+# (the real database is not touched). With --url the same mix of requests is sent to a
+# running backend instead (POST /create-log and GET /get-all-boxes), which is how the routes
+# are compared before and after a change. Each kiosk alternates one log write with
+# READS_PER_WRITE box reads.
+
+import os, sys, time, json, random, asyncio, tempfile, threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker, selectinload
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from database import Base, make_engine, make_async_engine
+from models import ItemMaster, RfidBox, BoxItem, User, UserItem, ItemLog
+
+BOXES, ITEMS_PER_BOX, USERS = 200, 5, 20
+READS_PER_WRITE = 3
+
+
+def seed(path):
+    engine = make_engine(f"sqlite:///{path}", wal=False)
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        items = [ItemMaster(name=f"item {i}", description="", total_quantity=100) for i in range(BOXES * ITEMS_PER_BOX)]
+        db.add_all(items)
+        db.add_all(User(name=f"user {i}") for i in range(USERS))
+        db.flush()
+        for b in range(BOXES):
+            box = RfidBox(uid=f"UID{b:05d}", box_name=f"box {b}")
+            db.add(box)
+            db.flush()
+            db.add_all(BoxItem(box_id=box.id, item_id=items[b * ITEMS_PER_BOX + i].id, quantity=10) for i in range(ITEMS_PER_BOX))
+        db.commit()
+    engine.dispose()
+
+
+def log_entry():
+    item_id = random.randint(1, BOXES * ITEMS_PER_BOX)
+    added = random.random() < 0.5
+    change = [{"item_id": item_id, "name": f"item {item_id}", "quantity": 1}]
+    return {"user_id": random.randint(1, USERS), "items_added": change if added else [],
+            "items_returned": [] if added else change, "comment": "load test"}
+
+
+def report(label, latencies, errors, elapsed):
+    print(f"\n{label}")
+    for kind in ("write", "read"):
+        ms = np.array(latencies[kind]) * 1000
+        if ms.size:
+            print(f"  {kind:<5} | {ms.size / elapsed:8.1f} ops/s | p50 {np.percentile(ms, 50):8.2f} ms"
+                  f" | p99 {np.percentile(ms, 99):8.2f} ms")
+    print(f"  errors | {errors}")
+
+
+# ------------------------------------------------------------------ sync (old setup)
+
+def sync_write(Session, entry):
+    with Session() as db:
+        for items, delta in ((entry["items_added"], 1), (entry["items_returned"], -1)):
+            for it in items:
+                ui = db.query(UserItem).filter_by(user_id=entry["user_id"], item_id=it["item_id"]).first()
+                if ui:
+                    ui.quantity += delta * it["quantity"]
+                    if ui.quantity <= 0:
+                        db.delete(ui)
+                elif delta > 0:
+                    db.add(UserItem(user_id=entry["user_id"], item_id=it["item_id"], quantity=it["quantity"]))
+        db.add(ItemLog(user_id=entry["user_id"], items_added=json.dumps(entry["items_added"]),
+                       items_returned=json.dumps(entry["items_returned"]), comment=entry["comment"]))
+        db.commit()
+
+
+def sync_read(Session):
+    with Session() as db:
+        box = db.query(RfidBox).filter(RfidBox.uid == f"UID{random.randrange(BOXES):05d}").first()
+        return [(bi.item.name, bi.quantity) for bi in box.box_items]
+
+
+def run_sync(path, kiosks, seconds):
+    engine = make_engine(f"sqlite:///{path}", wal=False)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    latencies, errors = {"write": [], "read": []}, [0]
+    deadline = time.perf_counter() + seconds
+    lock = threading.Lock()
+
+    def kiosk():
+        while time.perf_counter() < deadline:
+            for kind, call in [("write", lambda: sync_write(Session, log_entry()))] + [("read", lambda: sync_read(Session))] * READS_PER_WRITE:
+                start = time.perf_counter()
+                try:
+                    call()
+                except Exception:
+                    with lock:
+                        errors[0] += 1
+                    continue
+                latencies[kind].append(time.perf_counter() - start)
+
+    # FastAPI runs sync routes on a 40-thread pool; one thread per kiosk here
+    with ThreadPoolExecutor(max_workers=kiosks) as pool:
+        for _ in range(kiosks):
+            pool.submit(kiosk)
+    engine.dispose()
+    report(f"sync sessions, default journal, {kiosks} kiosks", latencies, errors[0], seconds)
+
+
+# ------------------------------------------------------------------ async (new setup)
+
+async def async_write(Session, entry):
+    async with Session() as db:
+        for items, delta in ((entry["items_added"], 1), (entry["items_returned"], -1)):
+            for it in items:
+                result = await db.execute(select(UserItem).filter_by(user_id=entry["user_id"], item_id=it["item_id"]))
+                ui = result.scalars().first()
+                if ui:
+                    ui.quantity += delta * it["quantity"]
+                    if ui.quantity <= 0:
+                        await db.delete(ui)
+                elif delta > 0:
+                    db.add(UserItem(user_id=entry["user_id"], item_id=it["item_id"], quantity=it["quantity"]))
+        db.add(ItemLog(user_id=entry["user_id"], items_added=json.dumps(entry["items_added"]),
+                       items_returned=json.dumps(entry["items_returned"]), comment=entry["comment"]))
+        await db.commit()
+
+
+async def async_read(Session):
+    async with Session() as db:
+        result = await db.execute(
+            select(RfidBox).filter(RfidBox.uid == f"UID{random.randrange(BOXES):05d}")
+            .options(selectinload(RfidBox.box_items).selectinload(BoxItem.item))
+        )
+        box = result.scalars().first()
+        return [(bi.item.name, bi.quantity) for bi in box.box_items]
+
+
+async def run_async(path, kiosks, seconds):
+    engine = make_async_engine(f"sqlite+aiosqlite:///{path}")
+    Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    latencies, errors = {"write": [], "read": []}, [0]
+    deadline = time.perf_counter() + seconds
+
+    async def kiosk():
+        while time.perf_counter() < deadline:
+            for kind, call in [("write", lambda: async_write(Session, log_entry()))] + [("read", lambda: async_read(Session))] * READS_PER_WRITE:
+                start = time.perf_counter()
+                try:
+                    await call()
+                except Exception:
+                    errors[0] += 1
+                    continue
+                latencies[kind].append(time.perf_counter() - start)
+
+    await asyncio.gather(*(kiosk() for _ in range(kiosks)))
+    await engine.dispose()
+    report(f"async sessions, WAL, {kiosks} kiosks", latencies, errors[0], seconds)
+
+
+# ------------------------------------------------------------------ running backend
+
+async def run_http(url, kiosks, seconds):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        boxes = (await client.get("/get-all-boxes")).json()
+        users = (await client.get("/users")).json()
+        if not boxes or not users:
+            sys.exit("The backend needs at least one box and one user.")
+        item_ids = [item["item_id"] for box in boxes for item in box["items"]] or [1]
+
+        latencies, errors = {"write": [], "read": []}, [0]
+        deadline = time.perf_counter() + seconds
+
+        async def kiosk():
+            while time.perf_counter() < deadline:
+                item_id = random.choice(item_ids)
+                change = [{"item_id": item_id, "name": "", "quantity": 1}]
+                entry = {"user_id": random.choice(users)["id"], "items_added": change, "items_returned": change,
+                         "comment": "load test"}   # add and return: user holdings are unchanged
+                requests = [("write", lambda: client.post("/create-log", json=entry))]
+                requests += [("read", lambda: client.get("/get-all-boxes"))] * READS_PER_WRITE
+                for kind, call in requests:
+                    start = time.perf_counter()
+                    response = await call()
+                    if response.status_code != 200:
+                        errors[0] += 1
+                        continue
+                    latencies[kind].append(time.perf_counter() - start)
+
+        await asyncio.gather(*(kiosk() for _ in range(kiosks)))
+    report(f"{url}, {kiosks} kiosks", latencies, errors[0], seconds)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    url = None
+    if args[:1] == ["--url"]:
+        url, args = args[1], args[2:]
+    kiosks = int(args[0]) if len(args) > 0 else 8
+    seconds = float(args[1]) if len(args) > 1 else 10
+
+    if url:
+        asyncio.run(run_http(url, kiosks, seconds))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("sync.db", "async.db"):
+                seed(os.path.join(tmp, name))
+            run_sync(os.path.join(tmp, "sync.db"), kiosks, seconds)
+            asyncio.run(run_async(os.path.join(tmp, "async.db"), kiosks, seconds))
@@ -0,0 +1,69 @@
+# Compares the old per-user matching loop against FaceIndex.
+#
+# To run:   cd RFID-Vision-Logger/web/backend/
+#           python benchmarks/face_index_bench.py
+
+import os, sys, time
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from face_index import FaceIndex
+
+DIM = 512
+GALLERY_SIZES = [1_000, 10_000, 100_000]
+QUERIES = 20
+
+
+def random_unit_vectors(n, rng):
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def loop_match(known_embeddings, embedding):
+    """The matcher face_recognition_worker used before FaceIndex."""
+    best_match = None
+    best_distance = float("inf")
+    for name, db_embedding in known_embeddings:
+        distance = np.linalg.norm(embedding - db_embedding)
+        if distance < best_distance:
+            best_distance = distance
+            best_match = name
+    return best_match, best_distance
+
+
+def time_per_query(fn, queries):
+    start = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    rng = np.random.default_rng(0)
+    queries = random_unit_vectors(QUERIES, rng)
+
+    print(f"{'users':>8} | {'loop ms':>9} | {'index ms':>9} | {'top-5 ms':>9} | {'speedup':>8}")
+    print("-" * 56)
+
+    for n in GALLERY_SIZES:
+        gallery = random_unit_vectors(n, rng)
+        known_embeddings = [(f"user_{i}", gallery[i]) for i in range(n)]
+
+        index = FaceIndex(dim=DIM, capacity=n)
+        for i in range(n):
+            index.add(i, f"user_{i}", gallery[i])
+
+        # Both matchers must agree before timing them
+        for q in queries[:3]:
+            assert loop_match(known_embeddings, q)[0] == index.best_match(q)[0]
+
+        loop_ms = time_per_query(lambda q: loop_match(known_embeddings, q), queries)
+        index_ms = time_per_query(index.best_match, queries)
+        topk_ms = time_per_query(lambda q: index.search(q, k=5), queries)
+
+        print(f"{n:>8} | {loop_ms:>9.3f} | {index_ms:>9.3f} | {topk_ms:>9.3f} | {loop_ms / index_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
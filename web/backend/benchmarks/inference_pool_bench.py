@@ -0,0 +1,113 @@
+# Throughput (frames/s) and p99 added latency of the threaded vs. process-pool inference modes.
+#
+# To run:   cd RFID-Vision-Logger/web/backend/
+#           python benchmarks/inference_pool_bench.py [detection|recognition] [workers] [frames]
+#
+# Frames come from tests/Vids/The Hobbit.mp4 at the stream resolution. While inference
+# runs, the main thread JPEG-encodes every frame like continuous_capture does, so the
+# threaded mode pays for sharing the GIL with the streaming loop.
+
+import os, sys, time, threading, queue
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import face_models
+from frame_ring import FrameRing, SharedFrameRing
+from inference_pool import InferencePool
+
+VIDEO_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../tests/Vids/The Hobbit.mp4'))
+RESOLUTION = (512, 512)
+
+
+def load_frames(count):
+    cap = cv2.VideoCapture(VIDEO_PATH)
+    frames = []
+    while len(frames) < count:
+        success, img = cap.read()
+        if not success:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            continue
+        frames.append(cv2.resize(img, RESOLUTION))
+    cap.release()
+    return frames
+
+
+def summarize(label, started, finished, latencies):
+    added_ms = np.array(latencies) * 1000
+    fps = len(latencies) / (finished - started)
+    print(f"{label:<18} | {fps:7.1f} frames/s | added latency p50 {np.percentile(added_ms, 50):7.2f} ms"
+          f" | p99 {np.percentile(added_ms, 99):7.2f} ms")
+
+
+def run_threaded(task, frames):
+    load_model, run, _ = face_models.TASKS[task]
+    model = load_model()
+    run(model, frames[0])    # warm-up
+
+    ring = FrameRing(slots=4)
+    pending = queue.Queue(maxsize=1)
+    latencies = []
+
+    def worker():
+        while True:
+            job = pending.get()
+            if job is None:
+                break
+            lease, submitted_at = job
+            with lease:
+                started = time.perf_counter()
+                run(model, lease.image)
+                finished = time.perf_counter()
+            latencies.append(finished - submitted_at - (finished - started))
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+
+    started = time.perf_counter()
+    for frame in frames:
+        ring.write(frame)
+        cv2.imencode('.jpg', frame)
+        try:
+            pending.put_nowait((ring.borrow_latest(), time.perf_counter()))
+        except queue.Full:
+            pass
+    pending.put(None)
+    thread.join()
+    summarize("threaded", started, time.perf_counter(), latencies)
+
+
+def run_pool(task, frames, workers):
+    ring = SharedFrameRing(slots=3 + workers)
+    pool = InferencePool(task, ring, workers=workers)
+    pool.start()
+    while pool.ready_workers < workers:
+        time.sleep(0.1)
+
+    started = time.perf_counter()
+    for frame in frames:
+        ring.write(frame)
+        cv2.imencode('.jpg', frame)
+        if pool.reserve(timeout=0):
+            pool.submit(ring.borrow_latest())
+    while pool.in_flight:
+        time.sleep(0.01)
+    finished = time.perf_counter()
+
+    stats = pool.stats()
+    print(f"{f'process x{workers}':<18} | {stats['completed'] / (finished - started):7.1f} frames/s"
+          f" | added latency p50 {stats['added_latency_p50_ms']:7.2f} ms | p99 {stats['added_latency_p99_ms']:7.2f} ms")
+    pool.stop()
+    ring.close()
+
+
+if __name__ == "__main__":
+    task = sys.argv[1] if len(sys.argv) > 1 else "detection"
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    frames = load_frames(int(sys.argv[3]) if len(sys.argv) > 3 else 300)
+
+    print(f"{task}: {len(frames)} frames at {RESOLUTION[0]}x{RESOLUTION[1]}")
+    run_threaded(task, frames)
+    for n in sorted({1, workers}):
+        run_pool(task, frames, n)
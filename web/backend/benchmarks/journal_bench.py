@@ -0,0 +1,108 @@
+# /create-log acknowledgement latency, committed directly vs. through the write-behind journal.
+#
+#   direct    the route's own transaction: UserItem SELECTs, log, balances, commit
+#   journal   LogJournal.append (write + fsync of one line); the writer group-commits
+#
+# To run:   cd RFID-Vision-Logger/web/backend/
+#           python benchmarks/journal_bench.py [kiosks] [seconds]
+#
+# Runs against a scratch database in a temp directory (the real one is not touched).
+# Afterwards it checks that every acknowledged entry reached item_logs, that item_balances
+# is consistent, and that a crash is recovered: entries journaled while the writer is
+# down, plus a torn half-written line, are committed by the next start.
+
+import os, sys, time, asyncio, tempfile
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from database import make_engine, make_async_engine
+from models import ItemLog
+from migrations import run_migrations
+from balances import check_balances
+from log_journal import LogJournal
+from db_load_test import seed
+from log_batch_bench import single, random_entry
+
+
+def report(label, latencies, elapsed):
+    ms = np.array(latencies) * 1000
+    print(f"{label:<8} | {ms.size / elapsed:8.1f} logs/s | ack p50 {np.percentile(ms, 50):7.2f} ms"
+          f" | p99 {np.percentile(ms, 99):7.2f} ms")
+
+
+async def kiosks(count, seconds, submit):
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    async def kiosk():
+        while time.perf_counter() < deadline:
+            entry = random_entry()
+            start = time.perf_counter()
+            await submit(entry)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(kiosk() for _ in range(count)))
+    return latencies, time.perf_counter() - start
+
+
+async def log_count(Session):
+    async with Session() as db:
+        return (await db.execute(select(func.count(ItemLog.id)))).scalar()
+
+
+async def run(tmp, kiosk_count, seconds):
+    engine = make_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+    Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    latencies, elapsed = await kiosks(kiosk_count, seconds, lambda entry: single(Session, entry))
+    report("direct", latencies, elapsed)
+
+    journal = LogJournal(os.path.join(tmp, "journal.ndjson"))
+    await journal.start(Session)
+    before = await log_count(Session)
+    latencies, elapsed = await kiosks(kiosk_count, seconds, lambda entry: asyncio.to_thread(journal.append, vars(entry)))
+    report("journal", latencies, elapsed)
+    stats = journal.stats()
+    start = time.perf_counter()
+    await journal.stop(timeout=600)
+    print(f"         | lag at the end {stats['lag_entries']} entries ({stats['lag_s'] * 1000:.0f} ms),"
+          f" drained in {time.perf_counter() - start:.1f} s | avg batch {journal.stats()['avg_batch']}"
+          f" | commit p50 {journal.stats()['commit_p50_ms']} ms")
+    print(f"acknowledged {len(latencies)}, in item_logs {await log_count(Session) - before}")
+
+    # Crash: entries journaled while no writer runs, then half a line
+    crashed = LogJournal(os.path.join(tmp, "journal.ndjson"))
+    await crashed.start(Session)
+    crashed._task.cancel()
+    for _ in range(50):
+        crashed.append(vars(random_entry()))
+    crashed._file.write('{"seq": 999999, "entry": {"user_')
+    crashed._file.close()
+
+    before = await log_count(Session)
+    recovered = LogJournal(os.path.join(tmp, "journal.ndjson"))
+    await recovered.start(Session)
+    await recovered.stop(timeout=600)
+    print(f"crash recovery: replayed {recovered.replayed}, in item_logs {await log_count(Session) - before}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    kiosk_count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed(path)
+        engine = make_engine(f"sqlite:///{path}")
+        run_migrations(engine)
+        asyncio.run(run(tmp, kiosk_count, seconds))
+        with sessionmaker(bind=engine)() as db:
+            differences = check_balances(db)
+        engine.dispose()
+        print(f"item_balances vs user_items and logs: {'consistent' if not differences else differences[:5]}")
@@ -0,0 +1,61 @@
+# Per-frame JPEG encode time of the available JpegEncoder backends.
+#
+# To run:   cd RFID-Vision-Logger/web/backend/
+#           python benchmarks/jpeg_encoder_bench.py
+
+import os, sys, time
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from jpeg_encoder import JpegEncoder, JPEG_PRESETS
+
+VIDEO_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../tests/Vids/The Hobbit.mp4'))
+RESOLUTIONS = [(512, 512), (1024, 1024)]
+FRAMES = 100
+
+
+def load_frames(size):
+    cap = cv2.VideoCapture(VIDEO_PATH)
+    frames = []
+    while len(frames) < 20:
+        success, img = cap.read()
+        if not success:
+            break
+        frames.append(cv2.resize(img, size))
+    cap.release()
+    return frames
+
+
+def bench(encode, frames):
+    encode(frames[0])    # warm-up
+    start = time.perf_counter()
+    total_bytes = 0
+    for i in range(FRAMES):
+        total_bytes += len(encode(frames[i % len(frames)]))
+    return (time.perf_counter() - start) / FRAMES * 1000, total_bytes / FRAMES / 1024
+
+
+def main():
+    for size in RESOLUTIONS:
+        frames = load_frames(size)
+        print(f"\n{size[0]}x{size[1]}")
+        print(f"{'backend':<12} {'preset':<10} | {'ms/frame':>9} | {'KiB/frame':>9}")
+
+        ms, kib = bench(lambda img: cv2.imencode('.jpg', img)[1].tobytes(), frames)
+        print(f"{'imencode':<12} {'default':<10} | {ms:>9.3f} | {kib:>9.1f}   (old code path)")
+
+        for backend in ["opencv", "simplejpeg", "turbojpeg"]:
+            for preset in JPEG_PRESETS:
+                try:
+                    encoder = JpegEncoder(backend=backend, preset=preset)
+                except ImportError as e:
+                    print(f"{backend:<12} skipped: {e}")
+                    break
+                ms, kib = bench(encoder.encode, frames)
+                print(f"{backend:<12} {preset:<10} | {ms:>9.3f} | {kib:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
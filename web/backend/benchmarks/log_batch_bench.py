@@ -0,0 +1,120 @@
+# Log throughput: one entry per request (POST /create-log) vs batches (POST /create-logs).
+#
+#   single    record_logs() for each entry on its own, with a commit each
+#   batch     record_logs() for a batch: one query for all affected user_items, bulk writes, one commit
+#
+# To run:   cd RFID-Vision-Logger/web/backend/
+#           python benchmarks/log_batch_bench.py [entries] [batch size]
+#           python benchmarks/log_batch_bench.py --url http://localhost:8000 [entries] [batch size]
+#
+# The first form runs against a scratch database in a temp directory (the real one is not
+# touched) and checks item_balances against user_items afterwards. With --url the entries
+# are posted to a running backend; each entry takes and returns the same item, so user
+# holdings are unchanged.
+
+import os, sys, time, random, asyncio, tempfile
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from database import Base, make_engine, make_async_engine
+from migrations import run_migrations
+from logbook import record_logs
+from balances import check_balances
+from db_load_test import seed, BOXES, ITEMS_PER_BOX, USERS
+
+
+def random_entry():
+    added = [{"item_id": random.randint(1, BOXES * ITEMS_PER_BOX), "quantity": random.randint(1, 3)} for _ in range(2)]
+    returned = [{"item_id": random.randint(1, BOXES * ITEMS_PER_BOX), "quantity": 1}]
+    return SimpleNamespace(user_id=random.randint(1, USERS), items_added=added, items_returned=returned, comment="bench")
+
+
+async def single(Session, entry):
+    """What the create_log route does: record_logs() for one entry, one commit."""
+    async with Session() as db:
+        await record_logs(db, [entry])
+        await db.commit()
+
+
+async def batch(Session, entries):
+    async with Session() as db:
+        errors = await record_logs(db, entries)
+        await db.commit()
+        return errors
+
+
+async def run_local(path, count, batch_size):
+    engine = make_async_engine(f"sqlite+aiosqlite:///{path}")
+    Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    entries = [random_entry() for _ in range(count)]
+    start = time.perf_counter()
+    for entry in entries:
+        await single(Session, entry)
+    single_s = time.perf_counter() - start
+
+    entries = [random_entry() for _ in range(count)]
+    start = time.perf_counter()
+    errors = []
+    for i in range(0, count, batch_size):
+        errors += await batch(Session, entries[i:i + batch_size])
+    batch_s = time.perf_counter() - start
+    await engine.dispose()
+
+    print(f"single entry       | {count / single_s:8.1f} logs/s")
+    print(f"batches of {batch_size:<7} | {count / batch_s:8.1f} logs/s | {single_s / batch_s:5.1f}x | rejected {len(errors)}")
+
+
+async def run_http(url, count, batch_size):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        users = (await client.get("/users")).json()
+        items = (await client.get("/item-master")).json()
+        if not users or not items:
+            sys.exit("The backend needs at least one user and one item.")
+
+        def entry():
+            change = [{"item_id": random.choice(items)["id"], "quantity": 1}]
+            return {"user_id": random.choice(users)["id"], "items_added": change, "items_returned": change,
+                    "comment": "bench"}
+
+        start = time.perf_counter()
+        for _ in range(count):
+            (await client.post("/create-log", json=entry())).raise_for_status()
+        single_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(0, count, batch_size):
+            entries = [entry() for _ in range(min(batch_size, count - i))]
+            (await client.post("/create-logs", json={"entries": entries})).raise_for_status()
+        batch_s = time.perf_counter() - start
+
+    print(f"POST /create-log   | {count / single_s:8.1f} logs/s")
+    print(f"POST /create-logs  | {count / batch_s:8.1f} logs/s | {single_s / batch_s:5.1f}x (batches of {batch_size})")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    url = None
+    if args[:1] == ["--url"]:
+        url, args = args[1], args[2:]
+    count = int(args[0]) if len(args) > 0 else 2000
+    batch_size = int(args[1]) if len(args) > 1 else 100
+
+    if url:
+        asyncio.run(run_http(url, count, batch_size))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            seed(path)
+            engine = make_engine(f"sqlite:///{path}")
+            run_migrations(engine)
+            asyncio.run(run_local(path, count, batch_size))
+            with sessionmaker(bind=engine)() as db:
+                differences = check_balances(db)
+            engine.dispose()
+            print(f"item_balances vs user_items and logs: {'consistent' if not differences else differences[:5]}")
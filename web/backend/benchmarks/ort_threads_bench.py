@@ -0,0 +1,95 @@
+# Latency of the detector and the recognition model across ONNX Runtime thread counts.
+#
+# To run:   cd RFID-Vision-Logger/web/backend/
+#           python benchmarks/ort_threads_bench.py [clip] [frames]
+#
+# The clip defaults to config.CAMERA_VIDEO_PATH (tests/Vids/The Hobbit.mp4). Each intra-op
+# thread count is measured twice: with the model running alone, and with detection and
+# recognition running at the same time in two threads, the way the stream uses them.
+# Concurrent p99 spikes as the combined thread count goes past the number of cores.
+
+import os, sys, time, threading
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import config
+from face_models import load_detector, load_embedder, align_face, run_embedding, session_report
+
+RESOLUTION = (512, 512)
+THREAD_COUNTS = [1, 2, 3, 4]
+
+
+def load_frames(path, count):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        success, img = cap.read()
+        if not success:
+            break
+        frames.append(cv2.resize(img, RESOLUTION))
+    cap.release()
+    if not frames:
+        sys.exit(f"Could not read frames from {path}")
+    return frames
+
+
+def timed(run, inputs, latencies, stop=None):
+    for item in inputs:
+        if stop is not None and stop.is_set():
+            break
+        start = time.perf_counter()
+        run(item)
+        latencies.append(time.perf_counter() - start)
+
+
+def repeat_until(stop, run, inputs, latencies):
+    while not stop.is_set():
+        timed(run, inputs, latencies, stop)
+
+
+def summary(latencies):
+    ms = np.array(latencies) * 1000
+    return f"p50 {np.percentile(ms, 50):7.2f} ms | p99 {np.percentile(ms, 99):7.2f} ms"
+
+
+if __name__ == "__main__":
+    clip = sys.argv[1] if len(sys.argv) > 1 else config.CAMERA_VIDEO_PATH
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    frames = load_frames(clip, count)
+
+    # Crops for the recognition model, cut with a default detector
+    detector = load_detector()
+    crops = [align_face(frame, face.kps) for frame in frames for face in detector.get(frame, max_num=0)]
+    if not crops:
+        crops = [np.ascontiguousarray(cv2.resize(frame, (112, 112))[:, :, ::-1]) for frame in frames]
+    crops = (crops * (len(frames) // len(crops) + 1))[:len(frames)]
+
+    print(f"{len(frames)} frames from {clip}, {os.cpu_count()} cores, "
+          f"graph optimization '{config.ORT_GRAPH_OPTIMIZATION}', providers {config.ORT_PROVIDERS}")
+    for threads in THREAD_COUNTS:
+        options = {"intra_op_threads": threads, "inter_op_threads": 1}
+        detector = load_detector(ort_options=options)
+        embedder = load_embedder(ort_options=options)
+        detect = lambda frame: detector.get(frame, max_num=0)
+        embed = lambda crop: run_embedding(embedder, crop)
+        detect(frames[0]), embed(crops[0])     # warm-up
+
+        alone = {"detection": [], "recognition": []}
+        timed(detect, frames, alone["detection"])
+        timed(embed, crops, alone["recognition"])
+
+        # Both at once: recognition loops over its crops until detection has gone through the clip
+        together = {"detection": [], "recognition": []}
+        stop = threading.Event()
+        recognizer = threading.Thread(target=repeat_until, args=(stop, embed, crops, together["recognition"]))
+        recognizer.start()
+        timed(detect, frames, together["detection"])
+        stop.set()
+        recognizer.join()
+
+        print(f"\nintra-op threads {threads} | {session_report(detector)['providers']}")
+        for stage in ("detection", "recognition"):
+            print(f"  {stage:<11} alone    | {summary(alone[stage])}")
+            print(f"  {stage:<11} together | {summary(together[stage])}")
@@ -0,0 +1,87 @@
+# Checks that the box and user-item reads run a constant number of SQL statements.
+#
+# To run:   cd RFID-Vision-Logger/web/backend/
+#           python benchmarks/query_count_check.py
+#
+# Scratch databases with growing numbers of boxes and items are built in a temp directory;
+# fetch_box, fetch_all_boxes and fetch_user_items must issue the same number of queries on
+# all of them. The old lazy-loading loop is counted alongside for comparison. Exits with
+# status 1 when a count grows with the data.
+
+import os, sys, asyncio, tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from database import Base, make_engine, make_async_engine, count_queries
+from models import ItemMaster, RfidBox, BoxItem, User, UserItem
+from queries import fetch_box, fetch_all_boxes, fetch_user_items
+
+SIZES = [(1, 1), (10, 5), (100, 10), (1000, 10)]    # (boxes, items per box)
+
+
+def seed(path, boxes, items_per_box):
+    engine = make_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        user = User(name="user")
+        items = [ItemMaster(name=f"item {i}", description="", total_quantity=1) for i in range(boxes * items_per_box)]
+        db.add(user)
+        db.add_all(items)
+        db.flush()
+        for b in range(boxes):
+            box = RfidBox(uid=f"UID{b:05d}", box_name=f"box {b}")
+            db.add(box)
+            db.flush()
+            db.add_all(BoxItem(box_id=box.id, item_id=items[b * items_per_box + i].id, quantity=1) for i in range(items_per_box))
+        db.add_all(UserItem(user_id=user.id, item_id=item.id, quantity=1) for item in items[:items_per_box * 10])
+        db.commit()
+    return engine
+
+
+def lazy_all_boxes(engine):
+    """The old get_all_boxes: box_items and item lazy-loaded per row."""
+    with sessionmaker(bind=engine)() as db, count_queries() as counter:
+        [(bi.item.name, bi.quantity) for box in db.query(RfidBox).all() for bi in box.box_items]
+    return counter.count
+
+
+async def counted(call):
+    with count_queries() as counter:
+        await call
+    return counter.count
+
+
+async def measure(path):
+    engine = make_async_engine(f"sqlite+aiosqlite:///{path}")
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    async with Session() as db:
+        counts = {
+            "fetch_box": await counted(fetch_box(db, "UID00000")),
+            "fetch_all_boxes": await counted(fetch_all_boxes(db)),
+            "fetch_user_items": await counted(fetch_user_items(db, 1)),
+        }
+    await engine.dispose()
+    return counts
+
+
+if __name__ == "__main__":
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for boxes, items_per_box in SIZES:
+            path = os.path.join(tmp, f"{boxes}x{items_per_box}.db")
+            sync_engine = seed(path, boxes, items_per_box)
+            lazy = lazy_all_boxes(sync_engine)
+            sync_engine.dispose()
+            counts = asyncio.run(measure(path))
+            results.append(counts)
+            print(f"{boxes:5d} boxes x {items_per_box:2d} items | "
+                  + " | ".join(f"{name} {count}" for name, count in counts.items())
+                  + f" | old lazy get_all_boxes {lazy}")
+
+    failed = [name for name in results[0] if len({counts[name] for counts in results}) > 1]
+    if failed:
+        print(f"FAIL: query count grows with the data for {', '.join(failed)}")
+        sys.exit(1)
+    print("OK: constant query counts")
@@ -0,0 +1,76 @@
+# Recognition throughput (faces/s) as the ONNX batch grows, plus batched gallery matching.
+#
+# To run:   cd RFID-Vision-Logger/web/backend/
+#           python benchmarks/recognition_batch_bench.py [max_batch] [gallery_size]
+#
+# Aligned crops are cut from the faces the detector finds in tests/Vids/The Hobbit.mp4,
+# the same way run_detection does for the live stream.
+
+import os, sys, time
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from face_models import load_detector, load_embedder, align_face, run_embedding
+from face_index import FaceIndex
+
+VIDEO_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../tests/Vids/The Hobbit.mp4'))
+RESOLUTION = (512, 512)
+REPEATS = 20
+
+
+def load_crops(count):
+    detector = load_detector()
+    cap = cv2.VideoCapture(VIDEO_PATH)
+    crops = []
+    for _ in range(5000):
+        success, img = cap.read()
+        if not success or len(crops) >= count:
+            break
+        img = cv2.resize(img, RESOLUTION)
+        for face in detector.get(img, max_num=0):
+            crops.append(align_face(img, face.kps))
+    cap.release()
+    if not crops:
+        sys.exit("No faces found in the video.")
+    while len(crops) < count:     # reuse crops if the clip has fewer faces than the largest batch
+        crops.extend(crops[:count - len(crops)])
+    return np.stack(crops[:count])
+
+
+if __name__ == "__main__":
+    max_batch = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    gallery_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    crops = load_crops(max_batch)
+    embedder = load_embedder()
+    run_embedding(embedder, crops[:1])     # warm-up
+
+    print(f"Recognition model, {REPEATS} runs per batch size")
+    batch = 1
+    while batch <= max_batch:
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            embeddings = run_embedding(embedder, crops[:batch])
+        elapsed = (time.perf_counter() - start) / REPEATS
+        print(f"batch {batch:3d} | {elapsed * 1000:8.2f} ms per batch | {batch / elapsed:8.1f} faces/s")
+        batch *= 2
+
+    # Gallery matching: one best_match() per face vs one best_matches() per batch
+    index = FaceIndex()
+    rng = np.random.default_rng(0)
+    for user_id, embedding in enumerate(rng.standard_normal((gallery_size, 512), dtype=np.float32)):
+        index.add(user_id, f"user_{user_id}", embedding)
+    embeddings = run_embedding(embedder, crops)
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        [index.best_match(embedding) for embedding in embeddings]
+    single_s = (time.perf_counter() - start) / REPEATS
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        index.best_matches(embeddings)
+    batched_s = (time.perf_counter() - start) / REPEATS
+    print(f"match {len(embeddings)} faces against {gallery_size} users | one by one {single_s * 1000:7.3f} ms"
+          f" | batched {batched_s * 1000:7.3f} ms")
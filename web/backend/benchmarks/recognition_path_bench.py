@@ -0,0 +1,97 @@
+# Per-stage time of the two ways to get an embedding for the face in a frame:
+#
+#   full      FaceAnalysis.get() on the frame: 640x640 detection + recognition (the old worker path)
+#   reuse     160x160 detection, crop aligned from its keypoints, recognition ONNX model only
+#             (load_detector / load_embedder, as the app runs it)
+#
+# To run:   cd RFID-Vision-Logger/web/backend/
+#           python benchmarks/recognition_path_bench.py [frames]
+#
+# Frames come from tests/Vids/The Hobbit.mp4; frames without a face are skipped. The
+# cosine similarity between the two embeddings of the same frame is printed as a sanity
+# check (the keypoints come from different detector sizes, so it is close to, not exactly, 1).
+
+import os, sys, time
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from insightface.app import FaceAnalysis
+from face_models import load_detector, load_embedder, align_face, run_embedding
+
+VIDEO_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../tests/Vids/The Hobbit.mp4'))
+RESOLUTION = (512, 512)
+
+
+def load_frames(count):
+    cap = cv2.VideoCapture(VIDEO_PATH)
+    frames = []
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or count
+    step = max(total // count, 1)
+    for index in range(0, total, step):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        success, img = cap.read()
+        if not success or len(frames) >= count:
+            break
+        frames.append(cv2.resize(img, RESOLUTION))
+    cap.release()
+    return frames
+
+
+def ms(samples):
+    return f"{np.mean(samples) * 1000:7.2f} ms"
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    frames = load_frames(count)
+
+    # The old worker path, only kept here as the baseline
+    rec_model = FaceAnalysis(name='buffalo_s', allowed_modules=['detection', 'recognition'])
+    rec_model.prepare(ctx_id=-1, det_size=(640, 640))
+
+    det_model = load_detector()
+    embedder = load_embedder()
+
+    timings = {"full": [], "detect": [], "align": [], "embed": []}
+    similarities = []
+    for image in frames:
+        start = time.perf_counter()
+        faces = rec_model.get(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), max_num=1)
+        full_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        detected = det_model.get(image, max_num=1)
+        detect_s = time.perf_counter() - start
+        if not faces or not detected:
+            continue
+
+        start = time.perf_counter()
+        crop = align_face(image, detected[0].kps)
+        align_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        embedding = run_embedding(embedder, crop)
+        embed_s = time.perf_counter() - start
+
+        timings["full"].append(full_s)
+        timings["detect"].append(detect_s)
+        timings["align"].append(align_s)
+        timings["embed"].append(embed_s)
+        reference = faces[0].embedding
+        similarities.append(float(np.dot(reference, embedding) / (np.linalg.norm(reference) * np.linalg.norm(embedding))))
+
+    if not similarities:
+        sys.exit("No faces found in the sampled frames.")
+
+    reuse = np.array(timings["detect"]) + np.array(timings["align"]) + np.array(timings["embed"])
+    print(f"{len(similarities)} frames with a face")
+    print(f"full   (detect 640 + recognize)    | {ms(timings['full'])}")
+    print(f"reuse  detect 160                  | {ms(timings['detect'])}")
+    print(f"       align crop                  | {ms(timings['align'])}")
+    print(f"       recognition model           | {ms(timings['embed'])}")
+    print(f"       total                       | {ms(reuse)}")
+    print(f"per recognized frame, the reuse path saves {ms(np.array(timings['full']) - np.array(timings['embed']) - np.array(timings['align']))}"
+          f" (the 160x160 detection runs anyway)")
+    print(f"embedding cosine similarity full vs reuse: mean {np.mean(similarities):.4f}, min {np.min(similarities):.4f}")
@@ -0,0 +1,107 @@
+import json, time, hashlib, threading, collections
+import numpy as np
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value lists this ETag (or is *)."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class CachedBox:
+    def __init__(self, payload, expires_at):
+        self.payload = payload
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.etag = '"' + hashlib.blake2b(self.body, digest_size=8).hexdigest() + '"'
+        self.expires_at = expires_at
+        self.item_names = {item["item_name"] for item in payload["items"]}
+
+
+class BoxCache:
+    """LRU cache of serialized /rfid-box/{uid} payloads, with a TTL as a safety net.
+
+    Entries are dropped by the routes that change a box (invalidate with its UID) and by
+    item description changes (invalidate with item names, which drops every cached box
+    listing one of them). A lookup that started before an invalidation does not store
+    its result, so a slow read cannot put stale contents back.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()     # uid -> CachedBox, least recently used first
+        self._lock = threading.Lock()                  # async routes and threadpool routes both use it
+        self._version = 0                              # bumped by every invalidation
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self._latency = {"hit": collections.deque(maxlen=500), "miss": collections.deque(maxlen=500)}
+
+    def get(self, uid, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(uid)
+            if entry is not None and entry.expires_at <= now:
+                del self._entries[uid]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(uid)
+            self.hits += 1
+            return entry
+
+    def version(self):
+        """Pass to put(): the result of a lookup started now is only stored if nothing was invalidated since."""
+        return self._version
+
+    def put(self, uid, payload, version, now=None):
+        now = time.monotonic() if now is None else now
+        entry = CachedBox(payload, now + self.ttl)
+        with self._lock:
+            if self.max_entries <= 0 or version != self._version:
+                return entry
+            self._entries[uid] = entry
+            self._entries.move_to_end(uid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, uids=(), item_names=()):
+        item_names = set(item_names)
+        with self._lock:
+            self._version += 1
+            stale = set(uids) & self._entries.keys()
+            if item_names:
+                stale.update(uid for uid, entry in self._entries.items() if entry.item_names & item_names)
+            for uid in stale:
+                del self._entries[uid]
+            self.invalidations += len(stale)
+
+    def record(self, kind, seconds, not_modified=False):
+        """Route latency of a cache hit or miss, and whether it was answered with 304."""
+        self._latency[kind].append(seconds)
+        self.not_modified += not_modified
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        latency = {}
+        for kind, samples in self._latency.items():
+            ms = np.array(samples) * 1000
+            latency[f"{kind}_p50_ms"] = round(float(np.percentile(ms, 50)), 3) if ms.size else None
+            latency[f"{kind}_p99_ms"] = round(float(np.percentile(ms, 99)), 3) if ms.size else None
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+            **latency,
+        }
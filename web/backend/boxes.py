@@ -0,0 +1,142 @@
+# boxes.py
+#
+# Saving RFID boxes in bulk: a fixed number of statements however many boxes and items,
+# all in the caller's transaction (one commit, one fsync).
+#
+#   1. item names resolved with one IN query; new items and changed descriptions written
+#      with one multi-row INSERT .. ON CONFLICT(name) DO UPDATE
+#   2. boxes upserted the same way on their UID
+#   3. the old contents of those boxes read (for item_balances) and deleted, the new
+#      contents inserted with one multi-row INSERT
+#
+# Used by POST /rfid-box/ (one box) and POST /import-boxes (initial warehouse onboarding).
+
+import csv, io
+from collections import Counter
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.sqlite import insert
+from models import ItemMaster, RfidBox, BoxItem
+from balances import balance_statements
+
+item_master = ItemMaster.__table__
+rfid_boxes = RfidBox.__table__
+box_items = BoxItem.__table__
+
+# Rows per statement, well under SQLite's bound-parameter limit
+CHUNK = 500
+
+
+def chunks(values, size=CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+async def resolve_items(db, items):
+    """Ids of the item masters for {name: description}, creating missing ones and updating descriptions."""
+    ids, stale = {}, {}
+    for names in chunks(items):
+        result = await db.execute(
+            select(item_master.c.id, item_master.c.name, item_master.c.description).where(item_master.c.name.in_(names))
+        )
+        for row in result:
+            ids[row.name] = row.id
+            if row.description != items[row.name]:
+                stale[row.name] = items[row.name]
+
+    # Missing items and changed descriptions in one upsert; total_quantity follows item_balances
+    changed = [name for name in items if name not in ids] + list(stale)
+    for names in chunks(changed):
+        upsert = insert(item_master).values([
+            {"name": name, "description": items[name], "total_quantity": 0} for name in names
+        ])
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[item_master.c.name],
+            set_={"description": upsert.excluded.description}
+        ).returning(item_master.c.id, item_master.c.name)
+        for row in await db.execute(upsert):
+            ids[row.name] = row.id
+    return ids
+
+
+async def save_boxes(db, boxes):
+    """Create or replace boxes (objects with uid, box_name and items); returns {uid: box_id}.
+
+    A UID given more than once keeps its last entry, like saving the box twice. The
+    caller commits.
+    """
+    boxes = list({box.uid: box for box in boxes}.values())
+    if not boxes:
+        return {}
+
+    descriptions = {}
+    for box in boxes:
+        for item in box.items:
+            descriptions[item.item_name] = item.item_description
+    item_ids = await resolve_items(db, descriptions)
+
+    box_ids = {}
+    for part in chunks(boxes):
+        upsert = insert(rfid_boxes).values([{"uid": box.uid, "box_name": box.box_name} for box in part])
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[rfid_boxes.c.uid],
+            set_={"box_name": upsert.excluded.box_name}
+        ).returning(rfid_boxes.c.id, rfid_boxes.c.uid)
+        for row in await db.execute(upsert):
+            box_ids[row.uid] = row.id
+
+    # Replace the contents, keeping item_balances in step
+    in_boxes = Counter()
+    for ids in chunks(box_ids.values()):
+        result = await db.execute(select(box_items.c.item_id, box_items.c.quantity).where(box_items.c.box_id.in_(ids)))
+        for row in result:
+            in_boxes[row.item_id] -= row.quantity or 0
+        await db.execute(delete(box_items).where(box_items.c.box_id.in_(ids)))
+
+    rows = []
+    for box in boxes:
+        for item in box.items:
+            rows.append({"box_id": box_ids[box.uid], "item_id": item_ids[item.item_name], "quantity": item.quantity})
+            in_boxes[item_ids[item.item_name]] += item.quantity
+    for part in chunks(rows):
+        await db.execute(box_items.insert().values(part))
+
+    for statement in balance_statements(in_boxes=in_boxes):
+        await db.execute(statement)
+    return box_ids
+
+
+def parse_box_csv(text):
+    """Boxes from CSV, one row per item: uid, box_name, item_name, item_description, quantity.
+
+    Only uid is required, so a scanner export (Timestamp,UID like tests/Excel/Output.csv)
+    registers each tag as an empty box named after its UID. Rows of the same UID are
+    merged into one box. Returns dicts shaped like RfidBoxCreate; raises ValueError
+    with the line number on a bad row.
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+    if "uid" not in reader.fieldnames:
+        raise ValueError("CSV needs a 'uid' column")
+
+    boxes = {}
+    for row in reader:
+        uid = (row.get("uid") or "").strip()
+        if not uid:
+            continue
+        box = boxes.setdefault(uid, {"uid": uid, "box_name": uid, "items": []})
+        if (row.get("box_name") or "").strip():
+            box["box_name"] = row["box_name"].strip()
+
+        item_name = (row.get("item_name") or "").strip()
+        if item_name:
+            try:
+                quantity = int(row.get("quantity") or 0)
+            except ValueError:
+                raise ValueError(f"line {reader.line_num}: quantity {row.get('quantity')!r} is not a number") from None
+            box["items"].append({
+                "item_name": item_name,
+                "item_description": (row.get("item_description") or row.get("description") or "").strip(),
+                "quantity": quantity,
+            })
+    return list(boxes.values())
@@ -0,0 +1,108 @@
+import asyncio, threading, time
+
+
+class CaptureThread:
+    """Background producer that pulls frames from a camera source into a FrameRing.
+
+    The camera's blocking capture runs in its own thread, so the asyncio loop never waits
+    on the sensor. The ring always holds the newest frame; coroutines await next_frame()
+    and are woken as soon as the producer commits one, so consumers run at sensor rate.
+    """
+
+    def __init__(self, camera, ring, transform=None, output_shape=None):
+        self.camera = camera
+        self.ring = ring
+        self.transform = transform          # transform(raw, dst=..., scratch=...) fills dst from the raw frame
+        self.output_shape = output_shape    # output_shape(raw.shape) -> shape of the transformed frame
+        self.frames_captured = 0
+        self.capture_errors = 0
+
+        self._thread = None
+        self._stop = threading.Event()
+        self._loop = None
+        self._frame_event = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, loop=None):
+        """Start producing frames. ``loop`` is the event loop next_frame() is awaited on."""
+        if self.is_running:
+            if not self._stop.is_set():
+                return
+            # stop() timed out and the old reader is still in a capture: a second one
+            # would share the camera with it
+            raise RuntimeError("The previous capture thread has not exited yet.")
+        self._loop = loop or asyncio.get_running_loop()
+        self._frame_event = asyncio.Event()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Stop the producer and wait for the in-flight capture to finish.
+
+        Returns False if the thread is still running after ``timeout``; it is kept, so
+        start() refuses to launch a second reader until it has exited.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                print(f"Capture thread did not stop within {timeout} s.")
+                return False
+            self._thread = None
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                for raw_image in self.camera.continous_capture():
+                    if self._stop.is_set():
+                        break
+                    self._publish(raw_image)
+                if self.camera.finished:
+                    print("Camera source has no more frames, capture thread stopping.")
+                    break
+            except Exception as e:
+                self.capture_errors += 1
+                print(f"Capture thread error: {e}")
+                time.sleep(0.1)
+
+    def _publish(self, raw_image):
+        if self.transform is None:
+            seq = self.ring.write(raw_image)
+        else:
+            shape = self.output_shape(raw_image.shape)
+            slot, buffer = self.ring.begin_write(shape, raw_image.dtype)
+            if slot is None:
+                return      # every slot is leased; drop this frame
+            self.transform(raw_image, dst=buffer, scratch=self.ring.scratch("capture", shape, raw_image.dtype))
+            seq = self.ring.commit(slot)
+
+        if seq is not None:
+            self.frames_captured += 1
+            self._loop.call_soon_threadsafe(self._notify)
+
+    def _notify(self):
+        # Runs on the event loop: wake every waiter and arm a fresh event for the next frame
+        event, self._frame_event = self._frame_event, asyncio.Event()
+        event.set()
+
+    async def next_frame(self, after=-1, timeout=None):
+        """Lease the newest frame with a sequence number above ``after``; None on timeout."""
+        deadline = None if timeout is None else self._loop.time() + timeout
+        while True:
+            lease = self.ring.borrow_latest(after=after, timeout=0)
+            if lease is not None:
+                return lease
+
+            event = self._frame_event
+            remaining = None if deadline is None else deadline - self._loop.time()
+            if remaining is not None and remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
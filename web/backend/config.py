@@ -0,0 +1,147 @@
+# config.py
+#
+# Deployment settings, overridable through environment variables:
+#       FACE_INDEX_BACKEND=ivf uvicorn main:app
+
+import os
+
+def env_int(name, default):
+    return int(os.getenv(name, default))
+
+# ----------------------------------------------------------------------------------------
+#                                 Face gallery index
+# ----------------------------------------------------------------------------------------
+
+# "exact" (brute force), "ivf" (pure NumPy IVF) or "hnsw" (needs the hnswlib package)
+FACE_INDEX_BACKEND = os.getenv("FACE_INDEX_BACKEND", "exact")
+
+FACE_INDEX_OPTIONS = {
+    "nlist": env_int("FACE_INDEX_NLIST", 0),                # IVF clusters, 0 = sqrt(gallery size)
+    "nprobe": env_int("FACE_INDEX_NPROBE", 8),              # IVF clusters scanned per query
+    "m": env_int("FACE_INDEX_HNSW_M", 16),                  # HNSW graph degree
+    "ef_construction": env_int("FACE_INDEX_HNSW_EF_CONSTRUCTION", 200),
+    "ef": env_int("FACE_INDEX_HNSW_EF", 64),                # HNSW query beam width
+}
+
+# Saved next to database/test.db so a restart does not rebuild the index
+FACE_INDEX_PATH = os.getenv("FACE_INDEX_PATH", "database/face_index.npz")
+FACE_INDEX_SAVE_INTERVAL = env_int("FACE_INDEX_SAVE_INTERVAL", 30)  # seconds
+
+# ----------------------------------------------------------------------------------------
+#                                 Database
+# ----------------------------------------------------------------------------------------
+
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")     # NORMAL is durable with WAL except on power loss
+DB_BUSY_TIMEOUT_MS = env_int("DB_BUSY_TIMEOUT_MS", 5000)    # how long a writer waits for the lock
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 8)                   # async connections kept open
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 8)
+DB_POOL_TIMEOUT = env_int("DB_POOL_TIMEOUT", 30)            # seconds to wait for a free connection
+
+# Listing endpoints (/list/...): rows per page, and rows per query when streaming an export
+LIST_PAGE_SIZE = env_int("LIST_PAGE_SIZE", 50)
+LIST_MAX_PAGE_SIZE = env_int("LIST_MAX_PAGE_SIZE", 500)
+EXPORT_CHUNK_SIZE = env_int("EXPORT_CHUNK_SIZE", 500)
+
+# Serialized /rfid-box/{uid} payloads kept in memory; the routes that change a box drop
+# its entry, the TTL covers changes made outside the API. 0 entries = no cache
+BOX_CACHE_SIZE = env_int("BOX_CACHE_SIZE", 1024)
+BOX_CACHE_TTL = env_int("BOX_CACHE_TTL", 300)       # seconds
+
+# Write-behind logging: /create-log appends the entry to a local journal file and answers
+# right away; a background writer group-commits the journal into the database
+LOG_WRITE_BEHIND = os.getenv("LOG_WRITE_BEHIND", "0") == "1"
+LOG_JOURNAL_PATH = os.getenv("LOG_JOURNAL_PATH", "database/log_journal.ndjson")
+# Journaled entries the database still rejected (e.g. the user was deleted in between), kept for review
+LOG_JOURNAL_DEAD_LETTER_PATH = os.getenv("LOG_JOURNAL_DEAD_LETTER_PATH", "database/log_journal.rejected.ndjson")
+LOG_JOURNAL_FSYNC = os.getenv("LOG_JOURNAL_FSYNC", "1") == "1"      # fsync each append (survives power loss)
+LOG_JOURNAL_BATCH = env_int("LOG_JOURNAL_BATCH", 200)               # entries per commit at most
+LOG_JOURNAL_INTERVAL_MS = env_int("LOG_JOURNAL_INTERVAL_MS", 20)    # writer waits this long for a group to form
+
+# ----------------------------------------------------------------------------------------
+#                                 Vision inference
+# ----------------------------------------------------------------------------------------
+
+# "thread": detection/recognition run in threads of the API process
+# "process": they run in worker processes and read frames from shared memory
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "thread")
+DETECTION_WORKERS = env_int("DETECTION_WORKERS", 1)
+RECOGNITION_WORKERS = env_int("RECOGNITION_WORKERS", 1)
+# "fp32" or "int8": int8 uses the dynamically quantized graphs written by quantize_models.py
+FACE_MODEL_PRECISION = os.getenv("FACE_MODEL_PRECISION", "fp32")
+INSIGHTFACE_ROOT = os.path.expanduser(os.getenv("INSIGHTFACE_ROOT", "~/.insightface"))
+# ONNX Runtime sessions. Keep detector + recognition threads (times worker processes in
+# process mode) within the board's cores; 0 threads = ONNX Runtime default (one per core)
+ORT_OPTIONS = {
+    "detector": {
+        "intra_op_threads": env_int("DETECTOR_INTRA_OP_THREADS", 2),
+        "inter_op_threads": env_int("DETECTOR_INTER_OP_THREADS", 1),
+    },
+    "embedder": {
+        "intra_op_threads": env_int("EMBEDDER_INTRA_OP_THREADS", 2),
+        "inter_op_threads": env_int("EMBEDDER_INTER_OP_THREADS", 1),
+    },
+}
+ORT_GRAPH_OPTIMIZATION = os.getenv("ORT_GRAPH_OPTIMIZATION", "all")     # "disable", "basic", "extended" or "all"
+# Execution providers in order of preference; ones not available in this onnxruntime build are skipped
+ORT_PROVIDERS = [p for p in os.getenv("ORT_PROVIDERS", "CPUExecutionProvider").split(",") if p]
+MAX_FACES = env_int("MAX_FACES", 0)                    # faces kept per detection, 0 = all
+# Aligned crops waiting for recognition are embedded together in one ONNX batch
+RECOGNITION_BATCH_SIZE = env_int("RECOGNITION_BATCH_SIZE", 8)        # 1 = one face per model call
+RECOGNITION_BATCH_WAIT_MS = env_int("RECOGNITION_BATCH_WAIT_MS", 10)  # wait for more crops before running
+
+# ----------------------------------------------------------------------------------------
+#                                 Camera
+# ----------------------------------------------------------------------------------------
+
+# "picamera" (Raspberry Pi camera), "video" (file or device through OpenCV) or "synthetic"
+CAMERA_SOURCE = os.getenv("CAMERA_SOURCE", "picamera")
+CAMERA_RESOLUTION = (env_int("CAMERA_WIDTH", 512), env_int("CAMERA_HEIGHT", 512))
+CAMERA_FPS = env_int("CAMERA_FPS", 30)
+# File path or device index used by the "video" source
+CAMERA_VIDEO_PATH = os.getenv(
+    "CAMERA_VIDEO_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tests/Vids/The Hobbit.mp4'))
+)
+
+def camera_options():
+    options = {"main_resolution": CAMERA_RESOLUTION, "fps": CAMERA_FPS}
+    if CAMERA_SOURCE == "video":
+        options["source"] = CAMERA_VIDEO_PATH
+    return options
+
+# ----------------------------------------------------------------------------------------
+#                                 Live stream
+# ----------------------------------------------------------------------------------------
+
+# Bounds for the adaptive stream controller (JPEG quality, output scale, frames per second)
+STREAM_OPTIONS = {
+    "min_quality": env_int("STREAM_MIN_QUALITY", 40),
+    "max_quality": env_int("STREAM_MAX_QUALITY", 90),
+    "min_scale": float(os.getenv("STREAM_MIN_SCALE", "0.5")),
+    "max_scale": float(os.getenv("STREAM_MAX_SCALE", "1.0")),
+    "min_fps": env_int("STREAM_MIN_FPS", 5),
+    "max_fps": env_int("STREAM_MAX_FPS", 30),
+}
+
+# JPEG encoder for the stream: "auto" (simplejpeg > turbojpeg > opencv), "simplejpeg", "turbojpeg" or "opencv"
+JPEG_BACKEND = os.getenv("JPEG_BACKEND", "auto")
+JPEG_PRESET = os.getenv("JPEG_PRESET", "balanced")     # "fast", "balanced" or "quality"
+
+# Motion gating: skip detection, recognition and frame pushes while the scene is static
+MOTION_GATE_ENABLED = os.getenv("MOTION_GATE_ENABLED", "1") == "1"
+MOTION_GATE_OPTIONS = {
+    "pixel_threshold": env_int("MOTION_PIXEL_THRESHOLD", 25),            # grey levels
+    "area_threshold": float(os.getenv("MOTION_AREA_THRESHOLD", "0.005")),  # fraction of changed pixels
+    "hold_frames": env_int("MOTION_HOLD_FRAMES", 15),
+    "idle_interval": float(os.getenv("MOTION_IDLE_INTERVAL", "1.0")),      # seconds between idle keep-alive frames
+}
+
+# Face tracking: recognition runs once per tracked face, then again only when the cached
+# identity's confidence (1 when matched, halved every half-life) runs low
+FACE_TRACKER_OPTIONS = {
+    "iou_threshold": float(os.getenv("TRACKER_IOU_THRESHOLD", "0.3")),
+    "max_misses": env_int("TRACKER_MAX_MISSES", 10),                          # detections without the face before the track is dropped
+    "confidence_half_life": float(os.getenv("TRACKER_CONFIDENCE_HALF_LIFE", "10.0")),  # seconds
+    "min_confidence": float(os.getenv("TRACKER_MIN_CONFIDENCE", "0.2")),
+    "unknown_retry": float(os.getenv("TRACKER_UNKNOWN_RETRY", "1.0")),        # seconds between retries for unmatched faces
+}
@@ -1,14 +1,89 @@
 # database.py
 
-from sqlalchemy import create_engine
+import contextvars, contextlib
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import config
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///database/test.db"
+SQLALCHEMY_DATABASE_PATH = "database/test.db"
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{SQLALCHEMY_DATABASE_PATH}"
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{SQLALCHEMY_DATABASE_PATH}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers run next to the single writer; busy_timeout makes writers wait instead of failing."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={config.DB_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={config.DB_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+
+# The counter of the request (or block) being run; context variables follow the
+# request into the threadpool and into SQLAlchemy's async greenlets
+_query_counter = contextvars.ContextVar("query_counter", default=None)
+
+
+@contextlib.contextmanager
+def count_queries():
+    """Count the SQL statements run inside the block, on any engine made here."""
+    counter = QueryCounter()
+    token = _query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_counter.reset(token)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter.count += 1
+        counter.statements.append(statement)
+
+
+def make_engine(url=SQLALCHEMY_DATABASE_URL, wal=True):
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    if wal:
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(engine, "before_cursor_execute", _count_query)
+    return engine
+
+
+def make_async_engine(url=ASYNC_DATABASE_URL, wal=True):
+    engine = create_async_engine(
+        url,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+    )
+    if wal:
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    event.listen(engine.sync_engine, "before_cursor_execute", _count_query)
+    return engine
+
+
+# Sync engine: startup, enrolment and the less frequent routes
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine (aiosqlite): the hot routes, so kiosks reading and logging at the same
+# time do not tie up the threadpool while they wait on SQLite
+async_engine = make_async_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def init_db():
     # from models import RfidBox, BoxItem  # ✅ Import models so Base knows them
     Base.metadata.create_all(bind=engine)
+
+    from migrations import run_migrations   # imports the models, which import this module
+    run_migrations(engine)
@@ -0,0 +1,222 @@
+import os, struct, hashlib, threading
+import numpy as np
+
+
+def gallery_digest(ids, names, embeddings):
+    """Digest of a gallery's (user id, name, unit embedding) rows, whatever their order.
+
+    Saved with the index, and compared with the users table at startup: a face
+    re-enrolled or a user renamed since the last save changes it.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for row in sorted(range(len(ids)), key=lambda row: int(ids[row])):
+        digest.update(struct.pack("<q", int(ids[row])))
+        digest.update(str(names[row]).encode("utf-8") + b"\0")
+        digest.update(np.ascontiguousarray(embeddings[row], dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+class FaceIndex:
+    """In-memory gallery of face embeddings stored in one contiguous float32 matrix.
+
+    Rows are kept packed: removing a user moves the last row into the freed slot,
+    so search always runs a single matrix product over ``matrix[:size]``.
+    All methods are thread-safe, so one instance can be shared between the API
+    routes that enrol users and the recognition worker thread.
+    """
+
+    def __init__(self, dim=512, capacity=1024):
+        self.dim = dim
+        self._matrix = np.zeros((max(capacity, 1), dim), dtype=np.float32)
+        self._size = 0
+        self._ids = []          # row -> user id
+        self._names = []        # row -> user name
+        self._rows = {}         # user id -> row
+        self._lock = threading.RLock()
+        self.dirty = False      # True when the in-memory gallery differs from the saved file
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, user_id):
+        with self._lock:
+            return user_id in self._rows
+
+    @staticmethod
+    def normalize(embedding):
+        """Return the embedding as a unit-length float32 vector."""
+        emb = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(emb)
+        return emb / norm if norm > 0 else emb
+
+    def _grow(self):
+        new_matrix = np.zeros((self._matrix.shape[0] * 2, self.dim), dtype=np.float32)
+        new_matrix[:self._size] = self._matrix[:self._size]
+        self._matrix = new_matrix
+
+    def add(self, user_id, name, embedding):
+        """Insert a user, or overwrite the stored embedding if the id already exists."""
+        emb = self.normalize(embedding)
+        if emb.shape[0] != self.dim:
+            raise ValueError(f"Embedding has {emb.shape[0]} values, index expects {self.dim}.")
+
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                if self._size == self._matrix.shape[0]:
+                    self._grow()
+                row = self._size
+                self._size += 1
+                self._rows[user_id] = row
+                self._ids.append(user_id)
+                self._names.append(name)
+            else:
+                self._names[row] = name
+
+            self._matrix[row] = emb
+            self.dirty = True
+
+    def rename(self, user_id, name):
+        """Change the name reported for a user. Returns False if the id is unknown."""
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                return False
+            self._names[row] = name
+            self.dirty = True
+            return True
+
+    def remove(self, user_id):
+        """Remove a user. Returns False if the id was not in the index."""
+        with self._lock:
+            row = self._rows.pop(user_id, None)
+            if row is None:
+                return False
+
+            last = self._size - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = self._ids[last]
+                self._names[row] = self._names[last]
+                self._rows[self._ids[row]] = row
+
+            self._ids.pop()
+            self._names.pop()
+            self._size = last
+            self.dirty = True
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._size = 0
+            self._ids.clear()
+            self._names.clear()
+            self._rows.clear()
+            self.dirty = True
+
+    def rebuild(self, entries):
+        """Atomically replace the whole gallery with [(user_id, name, embedding), ...]."""
+        with self._lock:
+            self.clear()
+            for user_id, name, embedding in entries:
+                self.add(user_id, name, embedding)
+
+    def search(self, embedding, k=1):
+        """Return up to k closest users as [(user_id, name, distance), ...], nearest first.
+
+        Distance is the Euclidean distance between unit vectors, sqrt(2 - 2 * cos),
+        so it is directly comparable with the old per-user np.linalg.norm loop.
+        """
+        query = self.normalize(embedding)
+
+        with self._lock:
+            if self._size == 0:
+                return []
+
+            similarities = self._matrix[:self._size] @ query
+
+            k = min(k, self._size)
+            if k == 1:
+                top = np.array([int(np.argmax(similarities))])
+            else:
+                top = np.argpartition(-similarities, k - 1)[:k]
+                top = top[np.argsort(-similarities[top])]
+
+            distances = np.sqrt(np.maximum(2.0 - 2.0 * similarities[top], 0.0))
+            return [
+                (self._ids[row], self._names[row], float(dist))
+                for row, dist in zip(top, distances)
+            ]
+
+    def user_ids(self):
+        with self._lock:
+            return list(self._ids)
+
+    def digest(self):
+        with self._lock:
+            return gallery_digest(self._ids, self._names, self._matrix[:self._size])
+
+    def _state(self):
+        """Arrays written by save(); subclasses extend this with their own structures."""
+        return {
+            "matrix": self._matrix[:self._size],
+            "ids": np.asarray(self._ids, dtype=np.int64),
+            "names": np.asarray(self._names, dtype=str),
+        }
+
+    def _load_state(self, state):
+        matrix = state["matrix"]
+        self._ids = [int(user_id) for user_id in state["ids"]]
+        self._names = [str(name) for name in state["names"]]
+        self._rows = {user_id: row for row, user_id in enumerate(self._ids)}
+        self._size = len(self._ids)
+
+        if self._size:
+            self.dim = matrix.shape[1]
+        self._matrix = np.zeros((max(self._size * 2, 1024), self.dim), dtype=np.float32)
+        self._matrix[:self._size] = matrix
+
+    def save(self, path):
+        """Write the gallery to an .npz file (atomically, via a temporary file)."""
+        with self._lock:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, kind=np.asarray(type(self).__name__), digest=np.asarray(self.digest()), **self._state())
+            os.replace(tmp_path, path)
+            self.dirty = False
+
+    def load(self, path):
+        """Replace the gallery with the contents of a file written by save()."""
+        with np.load(path) as data:
+            if str(data["kind"]) != type(self).__name__:
+                raise ValueError(f"{path} holds a {data['kind']}, not a {type(self).__name__}.")
+            state = {key: data[key] for key in data.files}
+        if "digest" in state and gallery_digest(state["ids"], state["names"], state["matrix"]) != str(state["digest"]):
+            raise ValueError(f"{path} is corrupt: its rows do not match the saved digest.")
+
+        with self._lock:
+            self._load_state(state)
+            self.dirty = False
+
+    def best_match(self, embedding):
+        """Return (name, distance) of the closest user, or (None, inf) for an empty index."""
+        matches = self.search(embedding, k=1)
+        if not matches:
+            return None, float("inf")
+        _, name, distance = matches[0]
+        return name, distance
+
+    def best_matches(self, embeddings):
+        """best_match() for a batch of embeddings, with one matrix product for the whole batch."""
+        queries = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms > 0, norms, 1.0)
+
+        with self._lock:
+            if self._size == 0:
+                return [(None, float("inf"))] * queries.shape[0]
+
+            similarities = queries @ self._matrix[:self._size].T
+            best = np.argmax(similarities, axis=1)
+            distances = np.sqrt(np.maximum(2.0 - 2.0 * similarities[np.arange(queries.shape[0]), best], 0.0))
+            return [(self._names[row], float(dist)) for row, dist in zip(best, distances)]
@@ -0,0 +1,173 @@
+# face_models.py
+#
+# InsightFace model construction and the per-frame inference steps, kept apart from
+# main.py so the inference worker processes can load them without starting the app.
+
+import os
+import cv2
+import numpy as np
+import onnxruntime
+import config
+from insightface.app.common import Face
+from insightface.model_zoo.model_zoo import ModelRouter
+from insightface.utils import face_align, ensure_available
+
+
+# Model packs the detector and the recognition model come from, and the graph used from each
+DETECTOR_PACK, DETECTOR_FILE = 'buffalo_l', 'det_10g.onnx'
+EMBEDDER_PACK, EMBEDDER_FILE = 'buffalo_s', 'w600k_mbf.onnx'
+
+
+def model_pack(pack, precision=None):
+    """Pack name for the configured precision; int8 packs sit next to the originals as <pack>_int8."""
+    precision = precision or config.FACE_MODEL_PRECISION
+    if precision == "fp32":
+        return pack
+    if precision != "int8":
+        raise ValueError(f"Unknown FACE_MODEL_PRECISION '{precision}'.")
+    quantized = pack + "_int8"
+    if not os.path.isdir(os.path.join(config.INSIGHTFACE_ROOT, 'models', quantized)):
+        raise FileNotFoundError(f"No int8 models for '{pack}'; run python quantize_models.py first.")
+    return quantized
+
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+
+def session_kwargs(role, ort_options=None):
+    """InferenceSession arguments for "detector" or "embedder" from config.ORT_OPTIONS (or ort_options)."""
+    options = dict(config.ORT_OPTIONS[role], **(ort_options or {}))
+
+    sess_options = onnxruntime.SessionOptions()
+    sess_options.intra_op_num_threads = options["intra_op_threads"]     # 0 = one thread per core
+    sess_options.inter_op_num_threads = options["inter_op_threads"]
+    # inter-op threads only run independent graph branches in parallel mode
+    sess_options.execution_mode = (onnxruntime.ExecutionMode.ORT_PARALLEL if options["inter_op_threads"] > 1
+                                   else onnxruntime.ExecutionMode.ORT_SEQUENTIAL)
+    sess_options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[options.get("graph_optimization", config.ORT_GRAPH_OPTIMIZATION)]
+
+    available = onnxruntime.get_available_providers()
+    providers = [p for p in options.get("providers", config.ORT_PROVIDERS) if p in available] or ['CPUExecutionProvider']
+    return {"sess_options": sess_options, "providers": providers}
+
+
+def _load_graph(path, role, ort_options=None):
+    # insightface's model_zoo.get_model() only forwards providers, so go through the
+    # router to hand the session options to the InferenceSession as well
+    kwargs = session_kwargs(role, ort_options)
+    model = ModelRouter(path).get_model(**kwargs)
+    # prepare() with ctx_id < 0 would reset the providers to CPU only
+    return model, (-1 if kwargs["providers"] == ['CPUExecutionProvider'] else 0)
+
+
+class Detector:
+    """SCRFD detector with the get() interface of FaceAnalysis, built from the detection graph alone."""
+
+    def __init__(self, det_model):
+        self.det_model = det_model
+
+    def get(self, img, max_num=0):
+        bboxes, kpss = self.det_model.detect(img, max_num=max_num, metric='default')
+        return [
+            Face(bbox=bboxes[i, 0:4], kps=kpss[i] if kpss is not None else None, det_score=bboxes[i, 4])
+            for i in range(bboxes.shape[0])
+        ]
+
+
+def load_detector(precision=None, ort_options=None):
+    """Only load the detection graph (fast and lightweight)."""
+    model_dir = ensure_available('models', model_pack(DETECTOR_PACK, precision), root=config.INSIGHTFACE_ROOT)
+    det_model, ctx_id = _load_graph(os.path.join(model_dir, DETECTOR_FILE), "detector", ort_options)
+    det_model.prepare(ctx_id, input_size=(160, 160), det_thresh=0.5)
+    return Detector(det_model)
+
+
+def load_embedder(precision=None, ort_options=None):
+    """The ArcFace ONNX model of buffalo_s on its own, for crops aligned from detection keypoints.
+
+    Only the recognition graph is opened; going through FaceAnalysis would also build
+    sessions for the pack's detector and landmark models just to throw them away.
+    """
+    model_dir = ensure_available('models', model_pack(EMBEDDER_PACK, precision), root=config.INSIGHTFACE_ROOT)
+    model, ctx_id = _load_graph(os.path.join(model_dir, EMBEDDER_FILE), "embedder", ort_options)
+    model.prepare(ctx_id)
+    return model
+
+
+def session_report(model):
+    """Effective ONNX Runtime settings of a loaded detector or recognition model."""
+    session = (model.det_model if isinstance(model, Detector) else model).session
+    options = session.get_session_options()
+    return {
+        "providers": session.get_providers(),
+        "intra_op_threads": options.intra_op_num_threads,
+        "inter_op_threads": options.inter_op_num_threads,
+        "execution_mode": options.execution_mode.name,
+        "graph_optimization": options.graph_optimization_level.name,
+    }
+
+
+def warm_up_detector(model):
+    """One inference on a blank frame, so ONNX Runtime allocates its buffers before the first real frame."""
+    model.get(np.zeros((512, 512, 3), dtype=np.uint8), max_num=1)
+
+
+def warm_up_embedder(model):
+    model.get_feat(np.zeros((112, 112, 3), dtype=np.uint8))
+
+
+def align_face(image, kps, image_size=112):
+    """Aligned face crop of a BGR frame, in RGB.
+
+    The gallery embeddings are computed by FaceAnalysis on RGB frames (see add_user), so
+    the crop is converted the same way to keep live and stored embeddings comparable.
+    """
+    crop = face_align.norm_crop(image, landmark=kps, image_size=image_size)
+    return cv2.cvtColor(crop, cv2.COLOR_BGR2RGB, dst=crop)
+
+
+def run_detection(model, image):
+    """Return the detected faces (bbox, kps, det_score) of a BGR frame.
+
+    Each face also carries its aligned ``crop``, cut while the frame is still borrowed,
+    so recognition never has to look at the frame (or run a detector) again.
+    """
+    faces = model.get(image, max_num=config.MAX_FACES)
+    for face in faces:
+        face.crop = align_face(image, face.kps)
+    return faces
+
+
+def run_embedding(model, crops):
+    """Raw embeddings of aligned face crops (recognition ONNX model only).
+
+    A stacked (n, 112, 112, 3) batch runs as one ONNX call and returns (n, 512);
+    a single (112, 112, 3) crop returns one (512,) embedding.
+    """
+    if crops.ndim == 3:
+        return model.get_feat(crops).flatten()
+    return model.get_feat(list(crops))
+
+
+def embed_image(detector, embedder, image):
+    """Raw embedding of the most prominent face of a BGR image (enrolment), or None.
+
+    Same detector, alignment and recognition model as the live stream, so enrolled
+    and live embeddings are computed the same way.
+    """
+    faces = detector.get(image, max_num=1)
+    if not faces:
+        return None
+    return run_embedding(embedder, align_face(image, faces[0].kps))
+
+
+# task -> (load, run, warm_up)
+TASKS = {
+    "detection": (load_detector, run_detection, warm_up_detector),
+    "recognition": (load_embedder, run_embedding, warm_up_embedder),
+}
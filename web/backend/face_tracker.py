@@ -0,0 +1,161 @@
+import math, time, collections
+
+
+def iou(a, b):
+    """Intersection over union of two (x1, y1, x2, y2) boxes."""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(ix2 - ix1, 0) * max(iy2 - iy1, 0)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class Track:
+    def __init__(self, track_id, bbox, now):
+        self.id = track_id
+        self.bbox = bbox
+        self.created_at = now
+        self.misses = 0
+        self.name = None
+        self.distance = None
+        self.recognized_at = None       # time of the last recognition result for this track
+        self.base_confidence = 0.0
+        self.requested_at = None        # recognition requested, result not in yet
+
+    def center(self):
+        return ((self.bbox[0] + self.bbox[2]) / 2, (self.bbox[1] + self.bbox[3]) / 2)
+
+    def area(self):
+        return (self.bbox[2] - self.bbox[0]) * (self.bbox[3] - self.bbox[1])
+
+
+class FaceTracker:
+    """IoU / centroid tracker over the detector's boxes, caching one identity per track.
+
+    Recognition is only needed when a track is new, when the last attempt found no
+    match (retried every ``unknown_retry`` s), or when the identity's confidence has
+    decayed below ``min_confidence``. A match accepted by the index starts at full
+    confidence, whatever its distance, and halves every ``confidence_half_life``
+    seconds, so every identity is held for the same time.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_center_shift=0.5, max_misses=10,
+                 confidence_half_life=10.0, min_confidence=0.2,
+                 unknown_retry=1.0, request_timeout=2.0):
+        self.iou_threshold = iou_threshold
+        self.max_center_shift = max_center_shift    # fraction of the box diagonal
+        self.max_misses = max_misses
+        self.confidence_half_life = confidence_half_life
+        self.min_confidence = min_confidence
+        self.unknown_retry = unknown_retry
+        self.request_timeout = request_timeout
+
+        self.tracks = {}
+        self._next_id = 1
+        self.tracks_created = 0
+        self.recognitions_requested = 0
+        self._requested_at = collections.deque()    # timestamps, for the per-minute rate
+
+    def reset(self):
+        self.tracks.clear()
+
+    def _match_score(self, track, bbox):
+        overlap = iou(track.bbox, bbox)
+        if overlap >= self.iou_threshold:
+            return 1.0 + overlap
+        # Fall back to centroid distance for fast moves where the boxes stop overlapping
+        cx, cy = track.center()
+        bx, by = (bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2
+        diagonal = math.hypot(track.bbox[2] - track.bbox[0], track.bbox[3] - track.bbox[1]) or 1.0
+        shift = math.hypot(cx - bx, cy - by) / diagonal
+        return 1.0 - shift if shift <= self.max_center_shift else 0.0
+
+    def update(self, bboxes, now=None):
+        """Associate a new set of detector boxes with the tracks; returns one track per box, in order."""
+        now = time.perf_counter() if now is None else now
+        bboxes = [tuple(float(v) for v in bbox[:4]) for bbox in bboxes]
+
+        # Greedy matching, best score first
+        pairs = sorted(
+            ((self._match_score(track, bbox), track_id, i)
+             for track_id, track in self.tracks.items() for i, bbox in enumerate(bboxes)),
+            reverse=True
+        )
+        matched_tracks, matched_boxes, current = set(), set(), [None] * len(bboxes)
+        for score, track_id, i in pairs:
+            if score <= 0 or track_id in matched_tracks or i in matched_boxes:
+                continue
+            track = self.tracks[track_id]
+            track.bbox = bboxes[i]
+            track.misses = 0
+            matched_tracks.add(track_id)
+            matched_boxes.add(i)
+            current[i] = track
+
+        for track_id in list(self.tracks):
+            if track_id not in matched_tracks:
+                self.tracks[track_id].misses += 1
+                if self.tracks[track_id].misses > self.max_misses:
+                    del self.tracks[track_id]
+
+        for i, bbox in enumerate(bboxes):
+            if i not in matched_boxes:
+                track = Track(self._next_id, bbox, now)
+                self._next_id += 1
+                self.tracks[track.id] = track
+                self.tracks_created += 1
+                current[i] = track
+
+        return current
+
+    def confidence(self, track, now=None):
+        if track.recognized_at is None:
+            return 0.0
+        now = time.perf_counter() if now is None else now
+        return track.base_confidence * 0.5 ** ((now - track.recognized_at) / self.confidence_half_life)
+
+    def needs_recognition(self, track, now=None):
+        now = time.perf_counter() if now is None else now
+        if track.requested_at is not None and now - track.requested_at < self.request_timeout:
+            return False    # a request for this track is still in flight
+        if track.recognized_at is None:
+            return True
+        if track.name is None:
+            return now - track.recognized_at >= self.unknown_retry
+        return self.confidence(track, now) < self.min_confidence
+
+    def mark_requested(self, track, now=None):
+        now = time.perf_counter() if now is None else now
+        track.requested_at = now
+        self.recognitions_requested += 1
+        self._requested_at.append(now)
+
+    def set_identity(self, track_id, result, now=None):
+        """Store a recognition result ({"name", "distance"} or None) on a track."""
+        track = self.tracks.get(track_id)
+        if track is None:
+            return None
+        now = time.perf_counter() if now is None else now
+        track.requested_at = None
+        track.recognized_at = now
+        track.name = result.get("name") if result else None
+        track.distance = result.get("distance") if result else None
+        # The index already applied its distance threshold; a raw distance near it would
+        # otherwise start below min_confidence and be re-requested on the next frame
+        track.base_confidence = 1.0 if track.name is not None else 0.0
+        return track
+
+    def primary(self, tracks):
+        """The track to recognize first: the largest face in view."""
+        return max(tracks, key=Track.area) if tracks else None
+
+    def stats(self, now=None):
+        now = time.perf_counter() if now is None else now
+        while self._requested_at and now - self._requested_at[0] > 60:
+            self._requested_at.popleft()
+        return {
+            "active_tracks": len(self.tracks),
+            "tracks_created": self.tracks_created,
+            "recognitions_requested": self.recognitions_requested,
+            "recognitions_last_minute": len(self._requested_at),
+        }
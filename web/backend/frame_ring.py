@@ -0,0 +1,197 @@
+import threading
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class FrameLease:
+    """Read-only view of one ring slot. Use as a context manager so the slot is released."""
+
+    def __init__(self, ring, slot, seq, image):
+        self._ring = ring
+        self.slot = slot
+        self.seq = seq
+        self.image = image
+
+    def release(self):
+        if self._ring is not None:
+            self._ring._release(self.slot)
+            self._ring = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class FrameRing:
+    """Fixed set of preallocated frame slots shared by the capture loop and the vision workers.
+
+    The producer fills a free slot in place (begin_write / commit) and consumers borrow a
+    read-only view of the newest frame instead of receiving a copy. A slot is never
+    overwritten while it is the newest frame or while any consumer still holds it, so
+    ``slots`` must be at least the number of concurrent consumers + 2.
+    """
+
+    def __init__(self, slots=5):
+        self._buffers = [None] * slots
+        self._seqs = [-1] * slots
+        self._borrowed = [0] * slots
+        self._latest_slot = None
+        self._next_seq = 0
+        self._scratch = {}
+        self._cond = threading.Condition()
+
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.borrows = 0
+        self.allocations = 0        # slot + scratch buffer allocations since start
+
+    @property
+    def latest_seq(self):
+        with self._cond:
+            return self._seqs[self._latest_slot] if self._latest_slot is not None else -1
+
+    # ------------------------------------------------------------------ producer side
+
+    def begin_write(self, shape, dtype=np.uint8):
+        """Reserve a free slot and return (slot, writable buffer), or (None, None) if all are busy."""
+        with self._cond:
+            for slot in range(len(self._buffers)):
+                if slot != self._latest_slot and self._borrowed[slot] == 0:
+                    break
+            else:
+                self.frames_dropped += 1
+                return None, None
+
+            buffer = self._buffers[slot]
+            if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+                buffer = self._allocate_slot(slot, shape, dtype)
+                self._buffers[slot] = buffer
+                self.allocations += 1
+
+            self._seqs[slot] = -1   # not readable until committed
+            return slot, buffer
+
+    def _allocate_slot(self, slot, shape, dtype):
+        return np.empty(shape, dtype=dtype)
+
+    def commit(self, slot):
+        """Publish a slot filled after begin_write() as the newest frame and return its sequence number."""
+        with self._cond:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._seqs[slot] = seq
+            self._latest_slot = slot
+            self.frames_written += 1
+            self._cond.notify_all()
+            return seq
+
+    def write(self, frame):
+        """Copy a frame into the ring. Prefer begin_write() to fill the slot without the extra copy."""
+        slot, buffer = self.begin_write(frame.shape, frame.dtype)
+        if slot is None:
+            return None
+        np.copyto(buffer, frame)
+        return self.commit(slot)
+
+    # ------------------------------------------------------------------ consumer side
+
+    def borrow_latest(self, after=-1, timeout=None):
+        """Lease the newest frame with a sequence number greater than ``after``.
+
+        Blocks up to ``timeout`` seconds (forever if None) for such a frame and returns
+        None if none arrived in time.
+        """
+        with self._cond:
+            ready = self._cond.wait_for(
+                lambda: self._latest_slot is not None and self._seqs[self._latest_slot] > after,
+                timeout=timeout
+            )
+            if not ready:
+                return None
+
+            slot = self._latest_slot
+            self._borrowed[slot] += 1
+            self.borrows += 1
+
+            view = self._buffers[slot].view()
+            view.flags.writeable = False
+            return FrameLease(self, slot, self._seqs[slot], view)
+
+    def _release(self, slot):
+        with self._cond:
+            self._borrowed[slot] -= 1
+
+    def clear(self):
+        """Forget the newest frame so consumers wait for a fresh one (slot memory is kept)."""
+        with self._cond:
+            self._latest_slot = None
+
+    # ------------------------------------------------------------------ scratch buffers
+
+    def scratch(self, owner, shape, dtype=np.uint8):
+        """Return a reusable per-owner work buffer, reallocated only when the frame shape changes."""
+        with self._cond:
+            buffer = self._scratch.get(owner)
+            if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+                buffer = np.empty(shape, dtype=dtype)
+                self._scratch[owner] = buffer
+                self.allocations += 1
+            return buffer
+
+    def stats(self):
+        with self._cond:
+            frames = max(self.frames_written, 1)
+            return {
+                "slots": len(self._buffers),
+                "frames_written": self.frames_written,
+                "frames_dropped": self.frames_dropped,
+                "borrows": self.borrows,
+                "allocations": self.allocations,
+                "allocations_per_frame": self.allocations / frames,
+                "borrowed_slots": sum(1 for count in self._borrowed if count),
+            }
+
+
+class SharedFrameRing(FrameRing):
+    """FrameRing whose slots live in POSIX shared memory, so worker processes can map a
+    borrowed frame by name (see slot_info) instead of receiving a pickled copy."""
+
+    def __init__(self, slots=5):
+        super().__init__(slots=slots)
+        self._shm = [None] * slots
+
+    def _allocate_slot(self, slot, shape, dtype):
+        old = self._shm[slot]
+        if old is not None:
+            self._buffers[slot] = None
+            self._release_shm(old)
+
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        self._shm[slot] = shm
+        return np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    @staticmethod
+    def _release_shm(shm):
+        try:
+            shm.close()
+        except BufferError:
+            pass    # a stale view still maps it; the mapping goes away with that view
+        shm.unlink()
+
+    def slot_info(self, slot):
+        """(shared memory name, shape, dtype string) of a slot, enough to attach from another process."""
+        with self._cond:
+            buffer = self._buffers[slot]
+            return self._shm[slot].name, buffer.shape, buffer.dtype.str
+
+    def close(self):
+        with self._cond:
+            self._buffers = [None] * len(self._buffers)
+            self._latest_slot = None
+            for shm in self._shm:
+                if shm is not None:
+                    self._release_shm(shm)
+            self._shm = [None] * len(self._shm)
@@ -0,0 +1,182 @@
+import os, time, threading, collections
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+
+def _worker_main(task, task_queue, result_queue):
+    """Entry point of one inference process: load the model once, then serve frames by shm name."""
+    import face_models
+
+    load_model, run, warm_up = face_models.TASKS[task]
+    model = load_model()
+    warm_up(model)
+    print(f"{task} worker {os.getpid()}: {face_models.session_report(model)}")
+    result_queue.put(("ready", os.getpid(), None, 0.0))
+
+    attached = {}
+    while True:
+        job = task_queue.get()
+        if job is None:
+            break
+
+        seq, shm_name, shape, dtype = job
+        try:
+            if shm_name is None:
+                image = shape               # small array sent by value (submit_array)
+            else:
+                shm = attached.get(shm_name)
+                if shm is None:
+                    if len(attached) >= 16:     # slots were reallocated; drop the oldest mapping
+                        attached.pop(next(iter(attached))).close()
+                    # Spawned workers share the parent's resource tracker, so attaching
+                    # here does not make the segment disappear when this process exits
+                    shm = attached[shm_name] = shared_memory.SharedMemory(name=shm_name)
+                image = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+            started = time.perf_counter()
+            result = run(model, image)
+            result_queue.put(("result", seq, result, time.perf_counter() - started))
+            del image
+        except Exception as e:
+            result_queue.put(("error", seq, str(e), 0.0))
+
+    for shm in attached.values():
+        shm.close()
+
+
+class InferencePool:
+    """Runs one inference task ("detection" or "recognition") in separate worker processes.
+
+    Frames are not copied: submit() takes a lease on a SharedFrameRing slot, the worker maps
+    the slot by name, and the lease is released when the result comes back. With drop_stale,
+    results older than the newest one already delivered are dropped, so on_result always moves
+    forward in time (right for frames); without it every result is delivered, in completion
+    order (needed for recognition batches, whose tracks wait for their own result).
+
+    Small inputs such as aligned face crops can be sent by value with submit_array().
+    on_result is called as on_result(result, context), where context is the frame
+    sequence number or the value given to submit_array().
+    """
+
+    def __init__(self, task, ring, workers=1, on_result=None, drop_stale=True):
+        self.task = task
+        self.workers = workers
+        self.drop_stale = drop_stale
+        self._ring = ring
+        self._on_result = on_result
+
+        ctx = mp.get_context("spawn")
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._processes = [
+            ctx.Process(target=_worker_main, args=(task, self._tasks, self._results), daemon=True)
+            for _ in range(workers)
+        ]
+
+        self._capacity = threading.BoundedSemaphore(workers)
+        self._pending = {}          # seq -> (lease, submitted_at, context)
+        self._next_job = 0          # sequence numbers for submit_array() jobs
+        self._lock = threading.Lock()
+        self._last_delivered = -1
+
+        self.ready_workers = 0
+        self.completed = 0
+        self.errors = 0
+        self.callback_errors = 0
+        self._added_latency = collections.deque(maxlen=1000)   # seconds spent outside inference
+        self._inference_s = collections.deque(maxlen=1000)     # seconds spent in the model call
+        self._completed_at = collections.deque(maxlen=1000)
+
+    def start(self):
+        for process in self._processes:
+            process.start()
+        threading.Thread(target=self._collect, daemon=True).start()
+        print(f"✅ {self.task} pool started with {self.workers} worker process(es).")
+
+    def stop(self):
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+
+    @property
+    def last_delivered_seq(self):
+        return self._last_delivered
+
+    @property
+    def in_flight(self):
+        with self._lock:
+            return len(self._pending)
+
+    def reserve(self, timeout=None):
+        """Wait for an idle worker. Call before borrowing a frame so no lease is held while waiting."""
+        return self._capacity.acquire(timeout=timeout)
+
+    def unreserve(self):
+        self._capacity.release()
+
+    def submit(self, lease):
+        """Hand a borrowed frame to an idle worker reserved with reserve()."""
+        shm_name, shape, dtype = self._ring.slot_info(lease.slot)
+        with self._lock:
+            self._pending[lease.seq] = (lease, time.perf_counter(), lease.seq)
+        self._tasks.put((lease.seq, shm_name, shape, dtype))
+
+    def submit_array(self, array, context=None):
+        """Send a small array (pickled, not through shared memory) to a worker reserved with reserve()."""
+        with self._lock:
+            self._next_job += 1
+            seq = self._next_job
+            self._pending[seq] = (None, time.perf_counter(), context)
+        self._tasks.put((seq, None, array, None))
+
+    def _collect(self):
+        while True:
+            kind, seq, payload, inference_s = self._results.get()
+            if kind == "ready":
+                self.ready_workers += 1
+                continue
+
+            with self._lock:
+                lease, submitted_at, context = self._pending.pop(seq)
+            if lease is not None:
+                lease.release()
+            self._capacity.release()
+
+            now = time.perf_counter()
+            self._added_latency.append(now - submitted_at - inference_s)
+            self._inference_s.append(inference_s)
+            self._completed_at.append(now)
+            self.completed += 1
+
+            if kind == "error":
+                self.errors += 1
+                print(f"{self.task} worker error: {payload}")
+            elif seq > self._last_delivered or not self.drop_stale:
+                self._last_delivered = max(seq, self._last_delivered)
+                if self._on_result is not None:
+                    try:
+                        self._on_result(payload, context)
+                    except Exception as e:
+                        # Keep collecting: a dead collector would stall every later submission
+                        self.callback_errors += 1
+                        print(f"{self.task} result callback error: {e!r}")
+
+    def stats(self):
+        added_ms = np.array(self._added_latency) * 1000
+        inference_ms = np.array(self._inference_s) * 1000
+        times = list(self._completed_at)
+        fps = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 0.0
+        return {
+            "task": self.task,
+            "workers": self.workers,
+            "ready_workers": self.ready_workers,
+            "completed": self.completed,
+            "errors": self.errors,
+            "callback_errors": self.callback_errors,
+            "fps": fps,
+            "inference_p50_ms": float(np.percentile(inference_ms, 50)) if inference_ms.size else None,
+            "added_latency_p50_ms": float(np.percentile(added_ms, 50)) if added_ms.size else None,
+            "added_latency_p99_ms": float(np.percentile(added_ms, 99)) if added_ms.size else None,
+        }
@@ -0,0 +1,118 @@
+import time
+import cv2
+import numpy as np
+
+try:
+    import simplejpeg
+except ImportError:  # optional backend
+    simplejpeg = None
+
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420, TJSAMP_422, TJSAMP_444
+except ImportError:  # optional backend
+    TurboJPEG = None
+
+
+# Named quality / chroma-subsampling combinations
+JPEG_PRESETS = {
+    "fast": {"quality": 70, "subsampling": "420"},
+    "balanced": {"quality": 85, "subsampling": "420"},
+    "quality": {"quality": 95, "subsampling": "444"},
+}
+
+_CV2_SAMPLING = {
+    "420": getattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR_420", None),
+    "422": getattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR_422", None),
+    "444": getattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR_444", None),
+}
+
+
+def _load_turbojpeg():
+    if TurboJPEG is None:
+        return None
+    try:
+        return TurboJPEG()
+    except Exception:   # Python wrapper installed but libturbojpeg missing
+        return None
+
+
+class JpegEncoder:
+    """JPEG encoder for BGR frames with a pluggable backend.
+
+    ``backend`` is "auto" (simplejpeg, then turbojpeg, then OpenCV), or one of those
+    names. encode() returns the JPEG as bytes, ready for WebSocket.send_bytes; every
+    backend allocates a new output buffer per frame. Input frames that are not
+    C-contiguous (e.g. slices) are first copied into a staging array kept between calls.
+    """
+
+    def __init__(self, backend="auto", preset="balanced", smoothing=0.2):
+        settings = JPEG_PRESETS[preset]
+        self.quality = settings["quality"]
+        self.subsampling = settings["subsampling"]
+        self.smoothing = smoothing
+
+        self._turbo = None
+        if backend == "auto":
+            backend = "simplejpeg" if simplejpeg is not None else "turbojpeg" if _load_turbojpeg() else "opencv"
+        if backend == "simplejpeg" and simplejpeg is None:
+            raise ImportError("simplejpeg is not installed (pip install simplejpeg).")
+        if backend == "turbojpeg":
+            self._turbo = _load_turbojpeg()
+            if self._turbo is None:
+                raise ImportError("turbojpeg is not available (pip install PyTurboJPEG and libturbojpeg).")
+        if backend not in ("simplejpeg", "turbojpeg", "opencv"):
+            raise ValueError(f"Unknown JPEG backend '{backend}'.")
+        self.backend = backend
+
+        self._staging = None
+        self.frames_encoded = 0
+        self.last_encode_s = 0.0
+        self.avg_encode_s = 0.0
+
+    def _contiguous(self, image):
+        if image.flags.c_contiguous:
+            return image
+        if self._staging is None or self._staging.shape != image.shape or self._staging.dtype != image.dtype:
+            self._staging = np.empty_like(image, order="C")
+        np.copyto(self._staging, image)
+        return self._staging
+
+    def encode(self, image, quality=None, subsampling=None):
+        """Encode a BGR (or grayscale) uint8 frame and return the JPEG as bytes."""
+        quality = int(quality or self.quality)
+        subsampling = subsampling or self.subsampling
+        start = time.perf_counter()
+
+        image = self._contiguous(image)
+        if self.backend == "simplejpeg":
+            colorspace = "GRAY" if image.ndim == 2 else "BGR"
+            data = simplejpeg.encode_jpeg(
+                image if image.ndim == 3 else image[:, :, None],
+                quality=quality, colorspace=colorspace, colorsubsampling=subsampling
+            )
+        elif self.backend == "turbojpeg":
+            sampling = {"420": TJSAMP_420, "422": TJSAMP_422, "444": TJSAMP_444}[subsampling]
+            data = self._turbo.encode(image, quality=quality, jpeg_subsample=sampling)
+        else:
+            params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+            if _CV2_SAMPLING.get(subsampling) is not None:
+                params += [cv2.IMWRITE_JPEG_SAMPLING_FACTOR, _CV2_SAMPLING[subsampling]]
+            success, encoded = cv2.imencode('.jpg', image, params)
+            if not success:
+                raise Exception("JPEG encoding failed.")
+            data = encoded.tobytes()        # ASGI send_bytes takes bytes, not an ndarray view
+
+        self.last_encode_s = time.perf_counter() - start
+        self.avg_encode_s += self.smoothing * (self.last_encode_s - self.avg_encode_s)
+        self.frames_encoded += 1
+        return data
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "quality": self.quality,
+            "subsampling": self.subsampling,
+            "frames_encoded": self.frames_encoded,
+            "last_encode_ms": round(self.last_encode_s * 1000, 3),
+            "avg_encode_ms": round(self.avg_encode_s * 1000, 3),
+        }
@@ -0,0 +1,225 @@
+# log_journal.py
+#
+# Write-behind item logging (config.LOG_WRITE_BEHIND). POST /create-log appends the entry
+# to an append-only journal file, one JSON line with a sequence number, fsynced, and
+# answers right away. A background task group-commits the pending entries into item_logs,
+# user_items and item_balances with record_logs(). In the same transaction it stores the
+# last sequence number committed in journal_checkpoints.
+#
+# On startup the journal is replayed: entries after the checkpoint are committed again,
+# so every acknowledged entry reaches the database. A torn last line, from a crash in the
+# middle of an append, is cut off. The file is truncated whenever the writer catches up.
+#
+# The route validates an entry before journaling it, but the database can still reject
+# it at commit time (its user or item deleted in between). Such entries go to a
+# dead-letter file, one JSON line each, written before the commit (so a crash can repeat
+# a line but never lose one); /log-journal shows the most recent.
+
+import os, json, time, asyncio, threading, collections
+from types import SimpleNamespace
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from models import JournalCheckpoint
+from logbook import record_logs
+
+CHECKPOINT = "item_logs"
+checkpoints = JournalCheckpoint.__table__
+
+
+class LogJournal:
+    def __init__(self, path, dead_letter_path=None, batch_size=200, interval=0.02, fsync=True):
+        self.path = path
+        self.dead_letter_path = dead_letter_path or path + ".rejected"
+        self.batch_size = batch_size
+        self.interval = interval
+        self.fsync = fsync
+
+        self._lock = threading.Lock()           # appends (threadpool) vs. the writer
+        self._pending = collections.deque()     # (seq, entry, appended_at), oldest first
+        self._file = None
+        self._loop = None
+        self._wakeup = None
+        self._task = None
+        self._session_factory = None
+
+        self.appended_seq = 0
+        self.committed_seq = 0
+        self.replayed = 0
+        self.batches = 0
+        self.committed = 0
+        self.rejected = 0
+        self.last_error = None
+        self._commit_ms = collections.deque(maxlen=100)
+        self._dead_letters = collections.deque(maxlen=20)     # most recent rejections, for stats()
+
+    # ------------------------------------------------------------------ startup / shutdown
+
+    async def start(self, session_factory):
+        """Load the checkpoint, queue the journaled entries after it and start the writer."""
+        self._session_factory = session_factory
+        async with session_factory() as db:
+            result = await db.execute(select(JournalCheckpoint.seq).where(JournalCheckpoint.name == CHECKPOINT))
+            self.committed_seq = result.scalar() or 0
+
+        self.appended_seq = self.committed_seq
+        now = time.perf_counter()
+        for seq, entry in self._read():
+            self.appended_seq = max(self.appended_seq, seq)
+            if seq > self.committed_seq:
+                self._pending.append((seq, entry, now))
+        self.replayed = len(self._pending)
+        if os.path.exists(self.dead_letter_path):
+            with open(self.dead_letter_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._dead_letters.append(json.loads(line))
+                    except ValueError:
+                        pass
+        if self.replayed:
+            print(f"♻️ Replaying {self.replayed} journaled log entries")
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        print(f"✅ Write-behind log journal at {self.path}")
+
+    async def stop(self, timeout=5.0):
+        """Give the writer up to timeout s to catch up, then stop it; anything left is replayed next start."""
+        deadline = time.perf_counter() + timeout
+        while self._pending and self.last_error is None and time.perf_counter() < deadline:
+            await asyncio.sleep(self.interval)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._file is not None:
+            self._file.close()
+
+    def _read(self):
+        """(seq, entry) records in the journal file; a torn last line is cut off the file."""
+        if not os.path.exists(self.path):
+            return []
+        records, valid_bytes = [], 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete line")
+                    record = json.loads(line)
+                    records.append((record["seq"], record["entry"]))
+                except (ValueError, KeyError):
+                    break
+                valid_bytes += len(line)
+        if valid_bytes < os.path.getsize(self.path):
+            print(f"⚠️ Log journal: cutting {os.path.getsize(self.path) - valid_bytes} bytes of a torn entry")
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_bytes)
+        return records
+
+    # ------------------------------------------------------------------ appends
+
+    def append(self, entry):
+        """Journal one entry (a dict shaped like LogEntry); returns its sequence number once it is on disk.
+
+        Blocking (fsync): call it from a thread, e.g. asyncio.to_thread.
+        """
+        line = json.dumps(entry)
+        with self._lock:
+            self.appended_seq += 1
+            seq = self.appended_seq
+            self._file.write(f'{{"seq": {seq}, "entry": {line}}}\n')
+            self._file.flush()
+            self._pending.append((seq, entry, time.perf_counter()))
+        # Outside the lock, so concurrent appends share the disk flush
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+        return seq
+
+    # ------------------------------------------------------------------ writer
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            if len(self._pending) < self.batch_size:
+                await asyncio.sleep(self.interval)      # let more entries join this commit
+
+            batch = [self._pending[i] for i in range(min(len(self._pending), self.batch_size))]
+            try:
+                await self._commit(batch)
+            except Exception as e:
+                # Entries stay pending and are retried; nothing acknowledged is dropped
+                self.last_error = str(e)
+                print(f"❌ Log journal commit failed, retrying: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            self.last_error = None
+
+            with self._lock:
+                for _ in batch:
+                    self._pending.popleft()
+                self.committed_seq = batch[-1][0]
+                if not self._pending:
+                    self._file.truncate(0)      # caught up: every journaled entry is in the database
+
+    async def _commit(self, batch):
+        start = time.perf_counter()
+        async with self._session_factory() as db:
+            errors = await record_logs(db, [SimpleNamespace(**entry) for _, entry, _ in batch])
+            if errors:
+                self._dead_letter(batch, errors)
+            upsert = insert(checkpoints).values(name=CHECKPOINT, seq=batch[-1][0])
+            upsert = upsert.on_conflict_do_update(index_elements=[checkpoints.c.name], set_={"seq": upsert.excluded.seq})
+            await db.execute(upsert)
+            await db.commit()
+
+        self._commit_ms.append((time.perf_counter() - start) * 1000)
+        self.batches += 1
+        self.committed += len(batch) - len(errors)
+        self.rejected += len(errors)
+
+    def _dead_letter(self, batch, errors):
+        records = [
+            {"seq": batch[error["index"]][0], "entry": batch[error["index"]][1], "detail": error["detail"],
+             "rejected_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+            for error in errors
+        ]
+        os.makedirs(os.path.dirname(os.path.abspath(self.dead_letter_path)), exist_ok=True)
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._dead_letters.extend(records)
+        print(f"⚠️ {len(records)} journaled log entries rejected, kept in {self.dead_letter_path}")
+
+    # ------------------------------------------------------------------ metrics
+
+    def stats(self):
+        with self._lock:
+            oldest = self._pending[0][2] if self._pending else None
+            lag_entries = len(self._pending)
+        return {
+            "enabled": True,
+            "lag_entries": lag_entries,
+            "lag_s": round(time.perf_counter() - oldest, 3) if oldest is not None else 0.0,
+            "appended_seq": self.appended_seq,
+            "committed_seq": self.committed_seq,
+            "replayed_at_start": self.replayed,
+            "batches": self.batches,
+            "committed": self.committed,
+            "rejected": self.rejected,
+            "dead_letter_path": self.dead_letter_path,
+            "recent_rejections": list(self._dead_letters),
+            "avg_batch": round((self.committed + self.rejected) / self.batches, 1) if self.batches else 0.0,
+            "commit_p50_ms": round(float(np.percentile(self._commit_ms, 50)), 2) if self._commit_ms else None,
+            "last_error": self.last_error,
+        }
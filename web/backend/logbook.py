@@ -0,0 +1,216 @@
+# logbook.py
+#
+# Write side of the item logs. An ItemLog keeps the JSON lists the kiosk sent
+# (items_added / items_returned); its item_log_lines hold the same items one row each,
+# with the log's user and timestamp, for the indexed history queries in queries.py.
+#
+# record_logs() writes every log: one (POST /create-log) or many at once (POST
+# /create-logs, the write-behind journal), under apply_log()'s rules. The user_items
+# rows they touch are read with one query, changed in memory and written back in bulk,
+# with all the logs and their lines as multi-row INSERTs, in the caller's transaction.
+
+import json
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import select, insert, update, delete, tuple_, bindparam
+from models import ItemLog, ItemLogLine, ItemMaster, User, UserItem
+from balances import balance_statements
+
+user_items = UserItem.__table__
+item_logs = ItemLog.__table__
+item_log_lines = ItemLogLine.__table__
+
+# Rows per statement, well under SQLite's bound-parameter limit
+CHUNK = 500
+
+
+def item_quantity(item):
+    # The kiosks send "quantity"; early logs used "qty"
+    return int(item.get("quantity", item.get("qty", 0)) or 0)
+
+
+def line_values(user_id, items_added, items_returned, timestamp):
+    """Column values of the item_log_lines rows for one log's item lists."""
+    values = []
+    for direction, items in (("added", items_added), ("returned", items_returned)):
+        for item in items or []:
+            if item.get("item_id") is None:
+                continue
+            values.append({
+                "user_id": user_id,
+                "item_id": int(item["item_id"]),
+                "quantity": item_quantity(item),
+                "direction": direction,
+                "timestamp": timestamp,
+            })
+    return values
+
+
+def new_log(user_id, items_added, items_returned, comment=""):
+    """An ItemLog with its lines, ready to be added to a session."""
+    timestamp = datetime.utcnow()
+    log = ItemLog(
+        user_id=user_id,
+        timestamp=timestamp,
+        items_added=json.dumps(items_added),
+        items_returned=json.dumps(items_returned),
+        comment=comment
+    )
+    log.lines = [ItemLogLine(**values) for values in line_values(user_id, items_added, items_returned, timestamp)]
+    return log
+
+
+def apply_log(held, user_id, items_added, items_returned):
+    """Apply one log to held ({(user_id, item_id): quantity}); the one set of rules for logs.
+
+    Returns the per-item change of the quantity checked out. A user's existing holding
+    is changed and dropped once it reaches zero; returns of items not held are ignored,
+    including items first taken in this same log. An item listed twice is one holding.
+    """
+    checked_out, created = Counter(), set()
+    for item in items_added or []:
+        key = (user_id, int(item["item_id"]))
+        if key not in held:
+            created.add(key)
+        held[key] = held.get(key, 0) + item_quantity(item)
+        checked_out[key[1]] += item_quantity(item)
+    for item in items_returned or []:
+        key = (user_id, int(item["item_id"]))
+        if key in held and key not in created:
+            before = held[key]
+            held[key] -= item_quantity(item)
+            if held[key] <= 0:
+                del held[key]
+            checked_out[key[1]] -= before - held.get(key, 0)
+    return checked_out
+
+
+def chunks(values, size=CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def item_id_of(item):
+    try:
+        return int(item["item_id"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def entry_error(entry, users, items):
+    if entry.user_id not in users:
+        return f"user {entry.user_id} not found"
+    for item in list(entry.items_added) + list(entry.items_returned):
+        item_id = item_id_of(item)
+        if item_id is None:
+            return f"invalid item_id {item.get('item_id')!r}"
+        if item_id not in items:
+            return f"item {item_id} not found"
+        try:
+            quantity = item_quantity(item)
+        except (TypeError, ValueError):
+            return f"item {item_id}: invalid quantity"
+        if quantity <= 0:
+            return f"item {item_id}: quantity must be positive"
+    return None
+
+
+async def insert_logs(db, entries):
+    """The logs of the entries and their item_log_lines, as multi-row INSERTs.
+
+    Core statements: the ORM inserts each log on its own to learn its id. RETURNING
+    gives the new ids back in the entries' order (ItemLog.sentinel).
+    """
+    timestamp = datetime.utcnow()
+    for part in chunks(entries):
+        rows = [
+            {"user_id": entry.user_id, "timestamp": timestamp, "items_added": json.dumps(entry.items_added),
+             "items_returned": json.dumps(entry.items_returned), "comment": entry.comment or ""}
+            for entry in part
+        ]
+        log_ids = await db.scalars(insert(item_logs).returning(item_logs.c.id, sort_by_parameter_order=True), rows)
+        lines = [
+            {"log_id": log_id, **values}
+            for entry, log_id in zip(part, log_ids)
+            for values in line_values(entry.user_id, entry.items_added, entry.items_returned, timestamp)
+        ]
+        for lines_part in chunks(lines):
+            await db.execute(insert(item_log_lines), lines_part)
+
+
+async def known_ids(db, entries):
+    """(users, items): the ids referenced by the entries that exist, one IN query each."""
+    user_ids = {entry.user_id for entry in entries}
+    item_ids = {item_id_of(item) for entry in entries
+                for item in list(entry.items_added) + list(entry.items_returned)} - {None}
+
+    users, items = set(), set()
+    for part in chunks(user_ids):
+        users.update((await db.execute(select(User.id).where(User.id.in_(part)))).scalars())
+    for part in chunks(item_ids):
+        items.update((await db.execute(select(ItemMaster.id).where(ItemMaster.id.in_(part)))).scalars())
+    return users, items
+
+
+async def check_entry(db, entry):
+    """Why record_logs() would reject this entry, or None; POST /create-log asks before journaling."""
+    users, items = await known_ids(db, [entry])
+    return entry_error(entry, users, items)
+
+
+async def record_logs(db, entries):
+    """Record many log entries (objects like LogEntry); returns [{"index", "detail"}] for the rejected ones.
+
+    Statements: one IN query each for users, items and the affected user_items rows,
+    then bulk writes for user_items, the logs with their lines and item_balances.
+    The caller commits.
+    """
+    users, items = await known_ids(db, entries)
+
+    errors, accepted = [], []
+    for index, entry in enumerate(entries):
+        detail = entry_error(entry, users, items)
+        if detail:
+            errors.append({"index": index, "detail": detail})
+        else:
+            accepted.append(entry)
+
+    # Current holdings of every (user, item) pair touched, in one query
+    pairs = {(entry.user_id, int(item["item_id"])) for entry in accepted
+             for item in list(entry.items_added) + list(entry.items_returned)}
+    rows = {}           # pair -> (user_items.id, quantity) of the row the logs change
+    for part in chunks(pairs):
+        result = await db.execute(
+            select(user_items.c.id, user_items.c.user_id, user_items.c.item_id, user_items.c.quantity)
+            .where(tuple_(user_items.c.user_id, user_items.c.item_id).in_(part))
+            .order_by(user_items.c.id)
+        )
+        for row in result:
+            rows.setdefault((row.user_id, row.item_id), (row.id, row.quantity))
+
+    held = {pair: quantity for pair, (_, quantity) in rows.items()}
+    checked_out = Counter()
+    for entry in accepted:
+        checked_out.update(apply_log(held, entry.user_id, entry.items_added, entry.items_returned))
+
+    # Write back only what changed
+    changed = [{"row_id": rows[pair][0], "new_quantity": held[pair]} for pair in rows
+               if pair in held and held[pair] != rows[pair][1]]
+    removed = [rows[pair][0] for pair in rows if pair not in held]
+    added = [{"user_id": user_id, "item_id": item_id, "quantity": quantity}
+             for (user_id, item_id), quantity in held.items() if (user_id, item_id) not in rows]
+    if changed:
+        await db.execute(
+            update(user_items).where(user_items.c.id == bindparam("row_id")).values(quantity=bindparam("new_quantity")),
+            changed
+        )
+    for part in chunks(removed):
+        await db.execute(delete(user_items).where(user_items.c.id.in_(part)))
+    for part in chunks(added):
+        await db.execute(user_items.insert().values(part))
+
+    await insert_logs(db, accepted)
+    for statement in balance_statements(checked_out=checked_out):
+        await db.execute(statement)
+    return errors
@@ -2,7 +2,8 @@
 #                                 Standart libraries
 # ========================================================================================
 
-import threading, queue, math, asyncio, json
+import threading, queue, math, asyncio, json, time
+from collections import Counter
 import sys, os
 import cv2
 
@@ -13,18 +14,28 @@ import cv2
 from fastapi import FastAPI, BackgroundTasks, Request, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi import Path, Query, Depends, Body
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response, JSONResponse, FileResponse
+from fastapi.responses import Response, JSONResponse, FileResponse, StreamingResponse
 
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import ItemMaster, RfidBox, BoxItem, User, UserItem, ItemLog  # These are the models you created
-from database import SessionLocal, init_db
-
-from typing import List
+from database import SessionLocal, AsyncSessionLocal, async_engine, init_db, count_queries
+from queries import fetch_box, fetch_all_boxes, fetch_user_items
+from queries import box_listing, item_listing, user_listing, log_listing, fetch_page, export_ndjson
+from queries import fetch_item_history, fetch_item_holders, fetch_user_history, fetch_inventory
+from logbook import check_entry, record_logs
+from balances import balance_statements, check_balances, rebuild_balances
+from boxes import save_boxes, parse_box_csv
+from log_journal import LogJournal
+from box_cache import BoxCache, etag_matches
+import config
+
+from typing import List, Optional
+from datetime import datetime, timezone
 import numpy as np
 
-# Load the InsightFace model globally (once)
-from insightface.app import FaceAnalysis
 from insightface.data import get_image as ins_get_image
 
 # ========================================================================================
@@ -33,8 +44,19 @@ from insightface.data import get_image as ins_get_image
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
 
-from rfid_reader import RFIDReader
-from camera import CameraReader
+from camera import create_camera
+from face_index import FaceIndex, gallery_digest
+from ann_index import create_face_index
+from frame_ring import FrameRing, SharedFrameRing
+from face_models import load_detector, load_embedder, warm_up_detector, warm_up_embedder
+from face_models import run_detection, run_embedding, embed_image, session_report
+from model_registry import ModelRegistry
+from inference_pool import InferencePool
+from capture import CaptureThread
+from stream_controller import AdaptiveStreamController
+from jpeg_encoder import JpegEncoder
+from motion_gate import MotionGate
+from face_tracker import FaceTracker
 
 # ========================================================================================
 #                            Global constants and variables
@@ -60,14 +82,23 @@ flip_vertical = False
 image_capture_counter = 0
 captured_image = None
 
-face_detection_queue = queue.Queue(maxsize=1)
+# Frames are shared through the ring; the workers are woken by these events instead of frame queues
+# Slots: one being written, the newest frame, the stream loop, and one per worker that may hold a lease
+if config.INFERENCE_MODE == "process":
+    frame_ring = SharedFrameRing(slots=4 + config.DETECTION_WORKERS + config.RECOGNITION_WORKERS)
+else:
+    frame_ring = FrameRing(slots=6)
+inference_pools = []
+detection_done_seq = -1     # sequence number of the newest frame the detection worker finished
+detection_requested = threading.Event()
+
 face_detection_result_queue = queue.Queue(maxsize=1)
 
-face_embedding_queue = queue.Queue(maxsize=1)
-face_embedding_result_queue = queue.Queue(maxsize=1)
+# (track_id, aligned crop) cut by the detection stage; recognition never runs the detector again
+face_crop_queue = queue.Queue(maxsize=2 * config.RECOGNITION_BATCH_SIZE)
 
-face_recognition_queue = queue.Queue(maxsize=1)
-face_recognition_result_queue = queue.Queue(maxsize=1)
+# Lists of (track_id, result), one per recognition batch
+face_recognition_result_queue = queue.Queue()
 
 # Add the src directory to the Python path
 is_continuous_capture = False
@@ -76,16 +107,33 @@ is_auto_capture = False
 
 connected_ws = None
 
-known_embeddings = []
+# Shared by the API routes and face_recognition_worker
+face_index = create_face_index(config.FACE_INDEX_BACKEND, **config.FACE_INDEX_OPTIONS)
 
 # ========================================================================================
 #                                Starting FastAPI, RFID and Camera
 # ========================================================================================
 
-reader = RFIDReader()
-camera = CameraReader(main_resolution=(512, 512))
+camera = create_camera(config.CAMERA_SOURCE, **config.camera_options())
+# Lambdas because orient_frame/oriented_shape are defined further down
+capture_thread = CaptureThread(camera, frame_ring, transform=lambda *a, **kw: orient_frame(*a, **kw),
+                               output_shape=lambda shape: oriented_shape(shape))
+stream_controller = AdaptiveStreamController(**config.STREAM_OPTIONS)
+jpeg_encoder = JpegEncoder(backend=config.JPEG_BACKEND, preset=config.JPEG_PRESET)
+motion_gate = MotionGate(**config.MOTION_GATE_OPTIONS)
+face_tracker = FaceTracker(**config.FACE_TRACKER_OPTIONS)
+stream_stats = {"frames_sent": 0, "bytes_sent": 0}
+stage_timings = {}      # "detection" / "embedding" / "match" -> smoothed ms (thread mode; pools report their own)
 app = FastAPI()
 
+# Number of SQL statements each request ran, for spotting N+1 query patterns
+@app.middleware("http")
+async def count_db_queries(request: Request, call_next):
+    with count_queries() as counter:
+        response = await call_next(request)
+    response.headers["X-DB-Queries"] = str(counter.count)
+    return response
+
 # Allow React frontend (adjust origin if needed)
 app.add_middleware(
     CORSMiddleware,
@@ -99,13 +147,12 @@ app.add_middleware(
 #                                Load InsightFace model
 # ========================================================================================
 
-# Only load the detection module (fast and lightweight)
-det_model = FaceAnalysis(allowed_modules=['detection'])  
-det_model.prepare(ctx_id=-1, det_size=(160, 160))  # -1 = CPU
-
-rec_model = FaceAnalysis(name='buffalo_s', allowed_modules=['detection', 'recognition'])
-rec_model.prepare(ctx_id=-1, det_size=(640, 640))
-# print("Modules:", rec_model.models.keys())
+# Loaded in the background after startup (see /ready), so the API answers immediately.
+# One detector and one recognition model serve both the live stream and enrolment; in
+# process mode the worker processes load their own copies for the stream.
+model_registry = ModelRegistry()
+model_registry.register("detector", load_detector, warmup=warm_up_detector, describe=session_report)
+model_registry.register("embedder", load_embedder, warmup=warm_up_embedder, describe=session_report)
 
 
 class ItemCreate(BaseModel):
@@ -121,18 +168,86 @@ class RfidBoxCreate(BaseModel):
 class UserCreate(BaseModel):
     name: str
 
+BOX_LIST = TypeAdapter(List[RfidBoxCreate])
+
 class LogEntry(BaseModel):
     user_id: int
     items_added: List[dict]  # [{item_id, name, quantity}]
     items_returned: List[dict]
     comment: str | None = None
 
+class LogBatch(BaseModel):
+    entries: List[LogEntry]
+
+
+# Box payloads by UID for the tag-tap lookups (/rfid-box/{uid}, /items/{uid})
+box_cache = BoxCache(max_entries=config.BOX_CACHE_SIZE, ttl=config.BOX_CACHE_TTL)
+
+# Write-behind logging (LOG_WRITE_BEHIND=1): /create-log journals the entry and returns,
+# the journal's writer group-commits it
+log_journal = LogJournal(
+    config.LOG_JOURNAL_PATH,
+    dead_letter_path=config.LOG_JOURNAL_DEAD_LETTER_PATH,
+    batch_size=config.LOG_JOURNAL_BATCH,
+    interval=config.LOG_JOURNAL_INTERVAL_MS / 1000,
+    fsync=config.LOG_JOURNAL_FSYNC
+) if config.LOG_WRITE_BEHIND else None
+
 
 @app.on_event("startup")
 def start_worker_threads():
-    threading.Thread(target=face_detection_worker, daemon=True).start()
-    threading.Thread(target=face_recognition_worker, daemon=True).start()
-    print("✅ Face detection thread started.")
+    db = SessionLocal()
+    try:
+        load_face_index(db, face_index)
+    finally:
+        db.close()
+
+    threading.Thread(target=face_index_saver, daemon=True).start()
+    model_registry.start()
+
+    if config.INFERENCE_MODE == "process":
+        detection_pool = InferencePool(
+            "detection", frame_ring, workers=config.DETECTION_WORKERS,
+            on_result=lambda face, seq: put_latest(face_detection_result_queue, face)
+        )
+        recognition_pool = InferencePool(
+            "recognition", frame_ring, workers=config.RECOGNITION_WORKERS, drop_stale=False,
+            on_result=lambda embeddings, track_ids: face_recognition_result_queue.put(list(zip(track_ids, recognition_results(embeddings))))
+        )
+        for pool in (detection_pool, recognition_pool):
+            pool.start()
+            inference_pools.append(pool)
+
+        threading.Thread(target=pooled_worker, args=(detection_pool, detection_requested), daemon=True).start()
+        threading.Thread(target=pooled_crop_worker, args=(recognition_pool,), daemon=True).start()
+    else:
+        threading.Thread(target=face_detection_worker, daemon=True).start()
+        threading.Thread(target=face_recognition_worker, daemon=True).start()
+        print("✅ Face detection thread started.")
+
+
+@app.on_event("shutdown")
+def save_face_index():
+    if face_index.dirty:
+        face_index.save(config.FACE_INDEX_PATH)
+
+    for pool in inference_pools:
+        pool.stop()
+    if isinstance(frame_ring, SharedFrameRing):
+        frame_ring.close()
+
+
+@app.on_event("startup")
+async def start_log_journal():
+    if log_journal is not None:
+        await log_journal.start(AsyncSessionLocal)     # replays what a crash left in the journal
+
+
+@app.on_event("shutdown")
+async def close_database():
+    if log_journal is not None:
+        await log_journal.stop()
+    await async_engine.dispose()
 
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -159,6 +274,39 @@ def get_flip_code(flip_horizontal: bool, flip_vertical: bool):
         return None  # no flip
 
 
+def oriented_shape(shape):
+    if rotation_angle in (90, 270):
+        return (shape[1], shape[0]) + tuple(shape[2:])
+    return tuple(shape)
+
+
+def orient_frame(image, dst=None, scratch=None):
+    """Apply rotation_angle and the flip settings in (at most) two OpenCV calls.
+
+    Writes into ``dst`` when given (e.g. a FrameRing slot); ``scratch`` holds the
+    intermediate result when both a 90/270 rotation and a flip are needed.
+    """
+    h_flip, v_flip, angle = flip_horizontal, flip_vertical, rotation_angle
+    if angle == 180:                # a 180° turn is the same as flipping both axes
+        h_flip, v_flip, angle = not h_flip, not v_flip, 0
+
+    rotate_code = rotate_map[angle]
+    flip_code = get_flip_code(h_flip, v_flip)
+
+    if rotate_code is None and flip_code is None:
+        if dst is None:
+            return image
+        np.copyto(dst, image)
+        return dst
+    if rotate_code is None:
+        return cv2.flip(image, flip_code, dst=dst)
+    if flip_code is None:
+        return cv2.rotate(image, rotate_code, dst=dst)
+
+    rotated = cv2.rotate(image, rotate_code, dst=scratch)
+    return cv2.flip(rotated, flip_code, dst=dst)
+
+
 # Dependency to get the database session
 def get_db():
     db = SessionLocal()
@@ -167,62 +315,102 @@ def get_db():
     finally:
         db.close()
 
-def load_all_embeddings(db: Session):
-    users = db.query(User).all()
-    embeddings = []
+# Async session for the hot routes (box lookups, user items, logging)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
 
-    for user in users:
-        if user.face_encoding:
-            emb = np.frombuffer(user.face_encoding, dtype=np.float32)
-            length = np.linalg.norm(emb)  # <-- Length of the embedding
-            print(f"User: {user.name}, Embedding shape: {emb.shape}, Length: {length:.4f}, First 5 values: {emb[:5]}")
-            embeddings.append((user.name, emb))
+def gallery_entries(db: Session):
+    """[(user_id, name, embedding), ...] for every enrolled user."""
+    users = db.query(User.id, User.name, User.face_encoding).filter(User.face_encoding.isnot(None)).all()
+    return [
+        (user_id, name, np.frombuffer(face_encoding, dtype=np.float32))
+        for user_id, name, face_encoding in users
+    ]
 
-    return embeddings
+def load_all_embeddings(db: Session, index: FaceIndex, entries=None):
+    """Full rebuild of the index from the users table (startup and /reload-embeddings only)."""
+    index.rebuild(gallery_entries(db) if entries is None else entries)
 
-# Route to create a new RFID box
+    print(f"Loaded {len(index)} face embeddings into the index.")
+    return index
 
-@app.post("/rfid-box/")
-def create_or_update_rfid_box(data: RfidBoxCreate, db: Session = Depends(get_db)):
-    existing_box = db.query(RfidBox).filter(RfidBox.uid == data.uid).first()
+def load_face_index(db: Session, index: FaceIndex):
+    """Load the saved index if it still matches the users table, otherwise rebuild and save it.
 
-    if not existing_box:
-        existing_box = RfidBox(uid=data.uid, box_name=data.box_name)
-        db.add(existing_box)
-        db.commit()
-        db.refresh(existing_box)
-    else:
-        existing_box.box_name = data.box_name
-        db.query(BoxItem).filter(BoxItem.box_id == existing_box.id).delete()
-
-    for item_data in data.items:
-        item_master = db.query(ItemMaster).filter(ItemMaster.name == item_data.item_name).first()
-        
-        if not item_master:
-            item_master = ItemMaster(
-                name=item_data.item_name,
-                description=item_data.item_description,
-                total_quantity=item_data.quantity
+    The saved ids, names and embeddings are compared with the users table by digest, so
+    a face re-enrolled or a user renamed after the last periodic save is not served stale.
+    """
+    entries = gallery_entries(db)
+
+    if os.path.exists(config.FACE_INDEX_PATH):
+        try:
+            index.load(config.FACE_INDEX_PATH)
+            expected = gallery_digest(
+                [user_id for user_id, _, _ in entries],
+                [name for _, name, _ in entries],
+                [FaceIndex.normalize(embedding) for _, _, embedding in entries],
             )
-            db.add(item_master)
-            db.commit()
-            db.refresh(item_master)
+            if index.digest() == expected:
+                print(f"Loaded {len(index)} face embeddings from {config.FACE_INDEX_PATH}.")
+                return index
+            print("Saved face index is out of date, rebuilding.")
+        except Exception as e:
+            print(f"Failed to load saved face index, rebuilding: {e}")
+
+    load_all_embeddings(db, index, entries)
+    index.save(config.FACE_INDEX_PATH)
+    return index
+
+def face_index_saver():
+    """Periodically persist enrolment changes so the next startup can skip the rebuild."""
+    while True:
+        time.sleep(config.FACE_INDEX_SAVE_INTERVAL)
+        if face_index.dirty:
+            try:
+                face_index.save(config.FACE_INDEX_PATH)
+            except Exception as e:
+                print(f"Failed to save face index: {e}")
+
+# Route to create a new RFID box
+
+@app.post("/rfid-box/")
+async def create_or_update_rfid_box(data: RfidBoxCreate, db: AsyncSession = Depends(get_async_db)):
+    # Items resolved and written in bulk, box contents replaced, balances updated: one transaction
+    box_ids = await save_boxes(db, [data])
+    await db.commit()
+    # Its items' descriptions may have changed too, and they show in other boxes
+    box_cache.invalidate(uids=[data.uid], item_names=[item.item_name for item in data.items])
+    return {"message": "RFID box saved", "box_id": box_ids[data.uid]}
+
+
+# Many boxes at once, for onboarding a warehouse: a JSON list of boxes shaped like
+# POST /rfid-box/, or CSV (Content-Type: text/csv) with one row per item:
+#   curl -X POST -H "Content-Type: text/csv" --data-binary @boxes.csv localhost:8000/import-boxes
+@app.post("/import-boxes")
+async def import_boxes(request: Request, db: AsyncSession = Depends(get_async_db)):
+    body = await request.body()
+    try:
+        if "csv" in request.headers.get("content-type", ""):
+            payload = parse_box_csv(body.decode("utf-8-sig"))
         else:
-            # Update description if changed
-            if item_master.description != item_data.item_description:
-                item_master.description = item_data.item_description
-                db.commit()
-
-        box_item = BoxItem(
-            box_id=existing_box.id,
-            item_id=item_master.id,
-            quantity=item_data.quantity
-        )
-        db.add(box_item)
+            payload = json.loads(body)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read the import: {e}")
 
+    try:
+        boxes = BOX_LIST.validate_python(payload)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
 
-    db.commit()
-    return {"message": "RFID box saved", "box_id": existing_box.id}
+    box_ids = await save_boxes(db, boxes)
+    await db.commit()
+    box_cache.invalidate(uids=box_ids, item_names=[item.item_name for box in boxes for item in box.items])
+    return {
+        "message": f"{len(box_ids)} boxes imported",
+        "boxes": len(box_ids),
+        "items": sum(len(box.items) for box in boxes),
+    }
 
 
 # Route to add an item to a box
@@ -244,8 +432,7 @@ def add_item(
             total_quantity=0  # we'll increment after
         )
         db.add(item_master)
-        db.commit()
-        db.refresh(item_master)
+        db.flush()
 
     # Step 2: Create the BoxItem entry linking it to the box
     box_item = BoxItem(
@@ -255,10 +442,13 @@ def add_item(
     )
     db.add(box_item)
 
-    # Step 3: Update total quantity in item_master
-    item_master.total_quantity += quantity
+    # Step 3: Update item_balances, and total quantity in item_master with it
+    db.flush()
+    for statement in balance_statements(in_boxes={item_master.id: quantity}):
+        db.execute(statement)
 
     db.commit()
+    box_cache.invalidate(uids=[db.query(RfidBox.uid).filter(RfidBox.id == rfid_box_id).scalar()])
     return {
         "message": "Item added to box",
         "box_id": rfid_box_id,
@@ -266,58 +456,51 @@ def add_item(
         "new_total": item_master.total_quantity
     }
 
+async def cached_box(db, uid):
+    """The box's cache entry, read through to the database on a miss; (entry or None, "hit" | "miss")."""
+    entry = box_cache.get(uid)
+    if entry is not None:
+        return entry, "hit"
+    version = box_cache.version()
+    box = await fetch_box(db, uid)
+    if box is None:
+        return None, "miss"
+    return box_cache.put(uid, box, version), "miss"
+
 @app.get("/rfid-box/{uid}")
-def get_rfid_box(uid: str, db: Session = Depends(get_db)):
-    box = db.query(RfidBox).filter(RfidBox.uid == uid).first()
-    if not box:
+async def get_rfid_box(uid: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    start = time.perf_counter()
+    entry, kind = await cached_box(db, uid)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Box not found")
 
-    return {
-        "uid": box.uid,
-        "box_name": box.box_name,
-        "items": [
-            {
-                "item_id": bi.item.id,
-                "item_name": bi.item.name,
-                "item_description": bi.item.description,  # <-- Ensure this line exists
-                "quantity": bi.quantity
-            }
-            for bi in box.box_items
-        ]
-    }
+    # no-cache: the browser keeps the body but revalidates every time with If-None-Match
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    not_modified = etag_matches(request.headers.get("if-none-match"), entry.etag)
+    if not_modified:
+        response = Response(status_code=304, headers=headers)
+    else:
+        response = Response(content=entry.body, media_type="application/json", headers=headers)
+    box_cache.record(kind, time.perf_counter() - start, not_modified)
+    return response
 
 
 
 # Route to get items by RFID box UID
 @app.get("/items/{rfid_uid}")
-def get_items(rfid_uid: str, db: Session = Depends(get_db)):
-    db_rfid_box = db.query(RfidBox).filter(RfidBox.uid == rfid_uid).first()
-    if db_rfid_box is None:
+async def get_items(rfid_uid: str, db: AsyncSession = Depends(get_async_db)):
+    entry, _ = await cached_box(db, rfid_uid)
+    if entry is None:
         raise HTTPException(status_code=404, detail="RFID box not found")
-    return db_rfid_box.items
+    return entry.payload["items"]
+
+@app.get("/box-cache")
+def get_box_cache_stats():
+    return box_cache.stats()
 
 @app.get("/get-all-boxes")
-def get_all_boxes(db: Session = Depends(get_db)):
-    boxes = db.query(RfidBox).all()
-    result = []
-    for box in boxes:
-        box_data = {
-            "id": box.id,
-            "uid": box.uid,
-            "box_name": box.box_name,
-            "items": []
-        }
-        for bi in box.box_items:
-            if bi.item is None:
-                continue  # skip invalid item link
-            box_data["items"].append({
-                "item_id": bi.item.id,
-                "item_name": bi.item.name,
-                "item_description": bi.item.description,
-                "quantity": bi.quantity
-            })
-        result.append(box_data)
-    return result
+async def get_all_boxes(db: AsyncSession = Depends(get_async_db)):
+    return await fetch_all_boxes(db)
 
 
 
@@ -327,8 +510,17 @@ def delete_box(box_id: int = Path(...), db: Session = Depends(get_db)):
     if not box:
         raise HTTPException(status_code=404, detail="Box not found")
 
+    in_boxes = Counter()
+    for box_item in box.box_items:
+        in_boxes[box_item.item_id] -= box_item.quantity or 0
+
+    uid = box.uid
     db.delete(box)  # Will also delete items if cascade is set
+    db.flush()
+    for statement in balance_statements(in_boxes=in_boxes):
+        db.execute(statement)
     db.commit()
+    box_cache.invalidate(uids=[uid])
     return {"message": "Box deleted successfully"}
 
 
@@ -342,26 +534,12 @@ async def trigger_once():
     """Handles the trigger action when the frontend clicks 'Trigger Once'"""
     clear_all_queues()
     try:
-        # Capture the image using the CameraReader
-        image = camera.capture_image()
-        #---------------------------------------------          Maunual process
-        if rotate_map[rotation_angle] is not None:
-
-            image = cv2.rotate(image, rotate_map[rotation_angle])
-
-        flip_code = get_flip_code(flip_horizontal, flip_vertical)
-        
-        if flip_code is not None:
-            image = cv2.flip(image, flip_code)
-        #---------------------------------------------
-
-        if image is None:
-            raise Exception("Failed to capture image.")
-        
+        # Capture the image off the event loop
+        image = await asyncio.to_thread(capture_single_frame)
+
         # Convert the image to bytes (as a Blob)
         captured_image = image
-        _, img_encoded = cv2.imencode('.jpg', image)
-        img_bytes = img_encoded.tobytes()
+        img_bytes = jpeg_encoder.encode(image)
 
         # Check if WebSocket connection is established
         if connected_ws:
@@ -409,12 +587,26 @@ async def start_continuous_capture(background_tasks: BackgroundTasks):
     if is_continuous_capture:
         return {"message": "Already running continuous capture."}
 
+    try:
+        capture_thread.start()
+    except RuntimeError as e:
+        return JSONResponse(status_code=409, content={"message": str(e)})
     is_continuous_capture = True
     clear_all_queues()
     background_tasks.add_task(continuous_capture)
     return {"message": "Continuous capture started."}
 
 
+def capture_single_frame():
+    """Grab one oriented frame straight from the camera (the capture thread is stopped first)."""
+    if not capture_thread.stop():   # the camera has a single reader
+        raise Exception("Capture thread is still reading the camera.")
+    image = camera.capture_image()
+    if image is None:
+        raise Exception("Failed to capture image.")
+    return orient_frame(image)
+
+
 async def continuous_capture():
     global is_continuous_capture
     frame_count = 0
@@ -422,7 +614,13 @@ async def continuous_capture():
     TARGET_POSITION = ((TARGET_BOX[0] + TARGET_BOX[2]) // 2, (TARGET_BOX[1] + TARGET_BOX[3]) // 2)
     auto_trigger_capture = False
     face_center = (0, 0)
-    last_recognition_result = {"name": None, "distance": None}
+    last_face = None
+    last_seq = -1
+    tracks = []
+    sent_primary_id = None      # primary_track_id of the last "recognitions" message
+    stream_controller.reset()
+    motion_gate.reset()
+    face_tracker.reset()
 
     """Function that continuously captures and sends images."""
     while is_continuous_capture:
@@ -432,174 +630,336 @@ async def continuous_capture():
             is_continuous_capture = False
             break
 
+        # Wait for the capture thread to publish a newer frame, so the loop runs at sensor rate
+        frame = await capture_thread.next_frame(after=last_seq, timeout=1.0)
+        if frame is None:
+            print("No frame received from the camera within 1 s.")
+            continue
+
+        last_seq = frame.seq
+        resumed = False
+        if config.MOTION_GATE_ENABLED:
+            was_active = motion_gate.active
+            motion_gate.update(frame.image)
+            face_present = last_face is not None and len(last_face) > 0   # keep going while someone stands still
+            if not motion_gate.should_pass(force=face_present):
+                # Static scene: no detection, recognition or push until motion (or the idle keep-alive)
+                detection_requested.clear()
+                frame.release()
+                continue
+            resumed = motion_gate.active and not was_active
+
+        if not resumed and not stream_controller.should_send():    # adaptive frame rate: skip this frame
+            frame.release()
+            continue
+
         frame_count += 1
         try:
-            # Capture the image using the CameraReader
-            image = camera.capture_image()
-            if image is None:
-                raise Exception("Failed to capture image.")
-            
-            #------------------------------------------------------------Maunual process
-            if rotate_map[rotation_angle] is not None:
-
-                image = cv2.rotate(image, rotate_map[rotation_angle])
-
-            flip_code = get_flip_code(flip_horizontal, flip_vertical)
-            
-            if flip_code is not None:
-                image = cv2.flip(image, flip_code)
-
-            #------------------------------------------------------------Draw features
-            processed_image = image
-
-            if is_show_features or is_auto_capture:
-                try:
-                    if face_detection_queue.empty():
-                        face_detection_queue.put_nowait(image.copy())
-                except queue.Full:
-                    pass
-
-                try:
-                    face = face_detection_result_queue.get_nowait()
-                    face_detection_result_queue.task_done()
-                    last_face = face  # 🔁 Update the cache
-                except queue.Empty:
-                    face = last_face  # ⏪ Reuse cached result
-
-                if face is not None and len(face) > 0:
-                    try:
-                        if face_recognition_queue.empty():
-                            face_recognition_queue.put_nowait(image.copy())
-                    except queue.Full:
-                        pass
+            with frame:     # read-only view shared with the workers; features are drawn on a scratch copy
+                image = frame.image
 
-                    # Get recognition result (non-blocking)
-                    try:
-                        recognition_result = face_recognition_result_queue.get_nowait()
-                        face_recognition_result_queue.task_done()
-                    except queue.Empty:
-                        recognition_result = None
+                #------------------------------------------------------------Draw features
+                processed_image = image
 
-                    # Send only if new and valid
-                    if connected_ws and recognition_result:
-                        name = recognition_result.get("name")
-                        distance = recognition_result.get("distance")
+                if is_show_features or is_auto_capture:
+                    detection_requested.set()
 
-                        if (name != last_recognition_result["name"]) or (distance != last_recognition_result["distance"]):
-                            last_recognition_result = {"name": name, "distance": distance}
+                    try:
+                        face = face_detection_result_queue.get_nowait()
+                        face_detection_result_queue.task_done()
+                        last_face = face  # 🔁 Update the cache
+                        tracks = face_tracker.update([f.bbox for f in face] if face is not None else [])
+                    except queue.Empty:
+                        face = last_face  # ⏪ Reuse cached result
 
+                    if is_show_features:
+                        processed_image = frame_ring.scratch("overlay", image.shape)
+                        np.copyto(processed_image, image)
+
+                    if face is not None and len(face) > 0:
+                        # Queue the crops of every new or stale track, largest face first; the
+                        # recognition worker embeds whatever is waiting as one batch
+                        for track, f in sorted(zip(tracks, face), key=lambda pair: -pair[0].area()):
+                            if f.get("crop") is None or not face_tracker.needs_recognition(track):
+                                continue
+                            try:
+                                face_crop_queue.put_nowait((track.id, f.crop))
+                            except queue.Full:
+                                break       # retried on a later frame
+                            face_tracker.mark_requested(track)
+
+                        # Get recognition results (non-blocking), one list per batch
+                        updated = False
+                        while True:
+                            try:
+                                results = face_recognition_result_queue.get_nowait()
+                                face_recognition_result_queue.task_done()
+                            except queue.Empty:
+                                break
+                            for track_id, result in results:
+                                updated |= face_tracker.set_identity(track_id, result) is not None
+
+                        # Send every face in view whenever new results came in or the primary
+                        # (largest) face changed; pending faces have "name": null and "pending": true,
+                        # so a client acts on primary_track_id only once that face is recognized
+                        primary = face_tracker.primary(tracks)
+                        primary_id = primary.id if primary is not None else None
+                        if connected_ws and (updated or primary_id != sent_primary_id):
                             await connected_ws.send_text(json.dumps({
-                                "type": "recognition",
-                                "name": name,
-                                "distance": float(distance) if distance is not None else None
+                                "type": "recognitions",
+                                "primary_track_id": primary_id,
+                                "faces": [
+                                    {
+                                        "track_id": track.id,
+                                        "name": track.name,
+                                        "pending": track.recognized_at is None,
+                                        "distance": float(track.distance) if track.distance is not None else None,
+                                        "bbox": [int(v) for v in track.bbox],
+                                    }
+                                    for track in sorted(tracks, key=lambda t: -t.area())
+                                ],
                             }))
+                            sent_primary_id = primary_id
+
+                        if primary is not None:
+                            face_center = tuple(int(v) for v in primary.center())
 
+                #---------------------------------------------
+                        if is_show_features:
+                            for f in face:
+                                x1, y1, x2, y2 = map(int, f.bbox)
+                                cv2.arrowedLine(processed_image, ((x1 + x2) // 2, (y1 + y2) // 2), TARGET_POSITION, (0, 0, 255), 1, tipLength=0.2)
+                                cv2.rectangle(processed_image, (x1, y1), (x2, y2), (0, 255, 0), 1)
 
-                    for f in face:
-                        x1, y1, x2, y2 = map(int, f.bbox)
-                        face_center = ((x1 + x2) // 2, (y1 + y2) // 2)
-            #---------------------------------------------
+                                for x, y in f.kps:
+                                    cv2.circle(processed_image, (int(x), int(y)), 1, (255, 0, 0), -1)
+                #---------------------------------------------
                     if is_show_features:
-                        cv2.arrowedLine(processed_image, face_center, TARGET_POSITION, (0, 0, 255), 1, tipLength=0.2)
-                        cv2.rectangle(processed_image, (x1, y1), (x2, y2), (0, 255, 0), 1)
-
-                        for x, y in f.kps:
-                            cv2.circle(processed_image, (int(x), int(y)), 1, (255, 0, 0), -1)
-            #---------------------------------------------
-                if is_show_features:
-                    cv2.rectangle(processed_image, (TARGET_BOX[0], TARGET_BOX[1]), (TARGET_BOX[2], TARGET_BOX[3]), (255, 255, 0), 1)
-            #---------------------------------------------
-            if is_auto_capture:
-                # 1. Error vector
-                dx = TARGET_POSITION[0] - face_center[0]
-                dy = TARGET_POSITION[1] - face_center[1]
-
-                # 2. Magnitude (Euclidean distance)
-                error_magnitude = math.sqrt(dx**2 + dy**2)
-
-                # 3. Threshold comparison
-                THRESHOLD = 20  # you can tune this value
-
-                if error_magnitude < THRESHOLD:
-                    # 4. Trigger capture
-                    auto_trigger_capture = True
+                        cv2.rectangle(processed_image, (TARGET_BOX[0], TARGET_BOX[1]), (TARGET_BOX[2], TARGET_BOX[3]), (255, 255, 0), 1)
+                        for track in tracks:
+                            label = f"#{track.id} {track.name or '?'}"
+                            cv2.putText(processed_image, label, (int(track.bbox[0]), max(int(track.bbox[1]) - 4, 10)),
+                                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 0), 1)
                 else:
-                    auto_trigger_capture = False
+                    detection_requested.clear()
+                    if tracks:
+                        face_tracker.reset()
+                        tracks = []
+                #---------------------------------------------
+                if is_auto_capture:
+                    # 1. Error vector
+                    dx = TARGET_POSITION[0] - face_center[0]
+                    dy = TARGET_POSITION[1] - face_center[1]
+
+                    # 2. Magnitude (Euclidean distance)
+                    error_magnitude = math.sqrt(dx**2 + dy**2)
+
+                    # 3. Threshold comparison
+                    THRESHOLD = 20  # you can tune this value
+
+                    if error_magnitude < THRESHOLD:
+                        # 4. Trigger capture
+                        auto_trigger_capture = True
+                    else:
+                        auto_trigger_capture = False
+
+                #---------------------------------------------
+                # Convert the image to bytes (as a Blob), at the controller's scale and quality
+                if is_show_features and not auto_trigger_capture :
+                    output_image = processed_image
+                else:
+                    output_image = image
 
-            #---------------------------------------------
-            # Convert the image to bytes (as a Blob)
-            if is_show_features and not auto_trigger_capture :
-                _, img_encoded = cv2.imencode('.jpg', processed_image)
-            else:
-                _, img_encoded = cv2.imencode('.jpg', image)
+                if stream_controller.scale < 1.0:
+                    height, width = output_image.shape[:2]
+                    size = (max(int(width * stream_controller.scale), 1), max(int(height * stream_controller.scale), 1))
+                    scaled = frame_ring.scratch("stream_scaled", (size[1], size[0]) + output_image.shape[2:])
+                    output_image = cv2.resize(output_image, size, dst=scaled, interpolation=cv2.INTER_AREA)
 
-            img_bytes = img_encoded.tobytes()
+                img_bytes = jpeg_encoder.encode(output_image, quality=stream_controller.quality)
 
             if connected_ws:                                    # Send the image as Blob (binary data) over WebSocket
+                send_start = time.perf_counter()
                 await connected_ws.send_text(json.dumps({"type": "auto_trigger", "status": auto_trigger_capture}))
                 await connected_ws.send_bytes(img_bytes)
+                send_time = time.perf_counter() - send_start
+                stream_stats["frames_sent"] += 1
+                stream_stats["bytes_sent"] += len(img_bytes)
+
+                # Feed the controller and tell the client whenever it changes the settings
+                stream_controller.observe(encode_s=jpeg_encoder.last_encode_s, send_s=send_time, inference_lag=inference_lag(last_seq))
+                if stream_controller.update() or frame_count == 1:
+                    await connected_ws.send_text(json.dumps(stream_controller.decisions()))
             else:
                 print("WebSocket connection not established. Skipping image sending.")
 
         except Exception as e:
             print(f"Error occurred while capturing or sending image: {str(e)}")
 
-        await asyncio.sleep(1 / 30)  # 30 FPS
+    detection_requested.clear()
+    face_crop_queue.queue.clear()
+    if not is_continuous_capture:
+        await asyncio.to_thread(capture_thread.stop)
+
+def inference_lag(frame_seq):
+    """How many frames the newest detection result is behind the frame being streamed."""
+    if not (is_show_features or is_auto_capture):
+        return 0
+    done_seq = inference_pools[0].last_delivered_seq if inference_pools else detection_done_seq
+    return max(frame_seq - done_seq, 0) if done_seq >= 0 else 0
+
+def wait_for_model(name):
+    """Block until a model is loaded; None if it failed to load (the worker then stops, /ready shows why)."""
+    try:
+        return model_registry.get(name)
+    except RuntimeError as e:
+        print(f"❌ {e}; its worker is stopping, see /ready")
+        return None
 
 def face_detection_worker():
+    global detection_done_seq
+    det_model = wait_for_model("detector")
+    if det_model is None:
+        return
+    last_seq = -1
     while True:
-        image = face_detection_queue.get()
+        detection_requested.wait()
+        frame = frame_ring.borrow_latest(after=last_seq, timeout=1.0)
+        if frame is None:
+            continue
+
+        with frame:     # read-only view of the ring slot, no copy
+            last_seq = frame.seq
+            try:
+                start = time.perf_counter()
+                face = run_detection(det_model, frame.image)
+                record_stage("detection", time.perf_counter() - start)
+                # print(faces)
+                if face_detection_result_queue.full():
+                    face_detection_result_queue.get_nowait()
+                face_detection_result_queue.put_nowait(face)
+                detection_done_seq = frame.seq
+            except Exception as e:
+                print("Worker error:", e)
+
+def take_crop_batch():
+    """Block for one aligned crop, then gather whatever else arrives within the batch window."""
+    batch = [face_crop_queue.get()]
+    deadline = time.perf_counter() + config.RECOGNITION_BATCH_WAIT_MS / 1000
+    while len(batch) < config.RECOGNITION_BATCH_SIZE:
+        remaining = deadline - time.perf_counter()
         try:
-            face = det_model.get(image, max_num=1)
-            # print(faces)
-            if face_detection_result_queue.full():
-                face_detection_result_queue.get_nowait()
-            face_detection_result_queue.put_nowait(face)
-        except Exception as e:
-            print("Worker error:", e)
-        finally:
-            face_detection_queue.task_done()
+            batch.append(face_crop_queue.get(timeout=remaining) if remaining > 0 else face_crop_queue.get_nowait())
+        except queue.Empty:
+            break
+    track_ids = [track_id for track_id, _ in batch]
+    return track_ids, np.stack([crop for _, crop in batch])
 
 def face_recognition_worker():
-    db = next(get_db())  # Get DB session from generator
-    known_embeddings = load_all_embeddings(db)  # [(name, np_embedding), ...]
-
+    """Embeds the aligned crops cut by the detection stage; only the recognition ONNX model runs here."""
+    embedder = wait_for_model("embedder")
+    if embedder is None:
+        return
     while True:
-        image = face_recognition_queue.get()
+        track_ids, crops = take_crop_batch()
         try:
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            face = rec_model.get(rgb_image, max_num=1)
+            start = time.perf_counter()
+            embeddings = run_embedding(embedder, crops)    # one ONNX run for the whole batch
+            elapsed = time.perf_counter() - start
+            record_stage("embedding", elapsed)
+            record_stage("embedding_per_face", elapsed / len(track_ids))
+            face_recognition_result_queue.put(list(zip(track_ids, recognition_results(embeddings))))
 
-            if not face:
-                face_recognition_result_queue.put_nowait(None)
-                continue
+        except Exception as e:
+            print("Recognition worker error:", e)
 
-            embedding = face[0].embedding
-            embedding = embedding / np.linalg.norm(embedding)
-
-            # Find best match
-            best_match = None
-            best_distance = float("inf")
-            for name, db_embedding in known_embeddings:
-                distance = np.linalg.norm(embedding - db_embedding)
-                if distance < best_distance:
-                    best_distance = distance
-                    best_match = name
-
-            # Threshold for "recognition"
-            THRESHOLD = 1.0
-            if best_distance < THRESHOLD:
-                result = {"name": best_match, "distance": best_distance}
-            else:
-                result = {"name": None, "distance": best_distance}
+def recognition_results(embeddings):
+    """Match a batch of embeddings against the gallery together; one result dict per embedding."""
+    # Find best matches (single matrix product over the whole gallery and batch)
+    start = time.perf_counter()
+    matches = face_index.best_matches(embeddings)
+    record_stage("match", time.perf_counter() - start)
+
+    # Threshold for "recognition"
+    THRESHOLD = 1.0
+    results = []
+    for best_match, best_distance in matches:
+        if best_distance < THRESHOLD:
+            results.append({"name": best_match, "distance": best_distance})
+        else:
+            results.append({"name": None, "distance": best_distance})
+    return results
 
-            face_recognition_result_queue.put_nowait(result)
-            print(result)
+def pooled_worker(pool, requested):
+    """Process-mode counterpart of the detection thread: feeds borrowed frames to an InferencePool."""
+    last_seq = -1
+    while True:
+        requested.wait()
 
-        except Exception as e:
-            print("Recognition worker error:", e)
-        finally:
-            face_recognition_queue.task_done()
+        if not pool.reserve(timeout=1.0):
+            continue
+        frame = frame_ring.borrow_latest(after=last_seq, timeout=1.0)
+        if frame is None:
+            pool.unreserve()
+            continue
+
+        last_seq = frame.seq
+        pool.submit(frame)      # the pool releases the lease when the result comes back
+
+def pooled_crop_worker(pool):
+    """Process-mode recognition: sends each batch of aligned crops (a few KB per face) to the pool by value."""
+    while True:
+        track_ids, crops = take_crop_batch()
+        while not pool.reserve(timeout=1.0):
+            pass
+        pool.submit_array(crops, context=track_ids)
+
+def record_stage(stage, seconds):
+    """Smoothed per-stage time in milliseconds, reported by /pipeline-stats."""
+    ms = seconds * 1000
+    previous = stage_timings.get(stage)
+    stage_timings[stage] = ms if previous is None else previous + 0.2 * (ms - previous)
+
+def put_latest(result_queue, item):
+    """Replace whatever is waiting in a maxsize=1 result queue with the newest result."""
+    try:
+        result_queue.get_nowait()
+    except queue.Empty:
+        pass
+    try:
+        result_queue.put_nowait(item)
+    except queue.Full:
+        pass
+
+
+@app.get("/pipeline-stats")
+def get_pipeline_stats():
+    """Frame ring counters (allocations_per_frame should drop to ~0 once the slots are warm)
+    and, in process mode, worker pool throughput and added latency."""
+    return {
+        "inference_mode": config.INFERENCE_MODE,
+        "frame_ring": frame_ring.stats(),
+        "jpeg_encoder": jpeg_encoder.stats(),
+        "motion_gate": motion_gate.stats(),
+        "face_tracker": face_tracker.stats(),
+        "stage_ms": {stage: round(ms, 3) for stage, ms in stage_timings.items()},
+        "stream": stream_stats,
+        "pools": [pool.stats() for pool in inference_pools],
+    }
+
+
+@app.get("/ready")
+def get_readiness():
+    """Model loading progress and per-model load / warm-up times; 503 until everything is ready."""
+    status = model_registry.status()
+    status["precision"] = config.FACE_MODEL_PRECISION
+    if inference_pools:
+        status["pools"] = [
+            {"task": pool.task, "ready_workers": pool.ready_workers, "workers": pool.workers}
+            for pool in inference_pools
+        ]
+        status["ready"] = status["ready"] and all(pool.ready_workers == pool.workers for pool in inference_pools)
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
 
 
 
@@ -624,10 +984,21 @@ async def set_auto_capture(data: AutoCaptureRequest):
 
 @app.post("/reload-embeddings")
 def reload_embeddings():
-    global known_embeddings
-    db = next(get_db())
-    known_embeddings = load_all_embeddings(db)
-    return {"message": "Embeddings reloaded"}
+    db = SessionLocal()
+    try:
+        load_all_embeddings(db, face_index)
+    finally:
+        db.close()
+    return {"message": "Embeddings reloaded", "count": len(face_index)}
+
+
+def compute_embedding(image):
+    """Embedding of the face in an enrolment photo, or None when no face is found."""
+    detector = model_registry.get("detector", timeout=60)
+    embedder = model_registry.get("embedder", timeout=60)
+    if detector is None or embedder is None:
+        raise HTTPException(status_code=503, detail="Face models are still loading, try again shortly.")
+    return embed_image(detector, embedder, image)
 
 
 @app.post("/add-user")
@@ -643,23 +1014,22 @@ def add_user(user: UserCreate, db: Session = Depends(get_db)):
     if existing_user:
         raise HTTPException(status_code=409, detail="User with this name already exists.")
 
-    global captured_image
-    if captured_image is None:
+    # One reference for the whole request: a capture meanwhile rebinds the global
+    image = captured_image
+    if image is None:
         raise HTTPException(status_code=404, detail="No captured image found.")
 
     # Save image
     safe_filename = normalized_name.replace(" ", "_") + ".jpg"
     target_path = os.path.join(image_directory, safe_filename)
-    cv2.imwrite(target_path, captured_image)
+    cv2.imwrite(target_path, image)
 
-    # Convert image and run embedding
-    rgb_image = cv2.cvtColor(captured_image, cv2.COLOR_BGR2RGB)
-    faces = rec_model.get(rgb_image, max_num=1)
+    # Run embedding
+    embedding = compute_embedding(image)
 
-    if not faces:
+    if embedding is None:
         raise HTTPException(status_code=400, detail="No face detected in image.")
 
-    embedding = faces[0].embedding
     embedding = embedding / np.linalg.norm(embedding)
     embedding_blob = embedding.astype(np.float32).tobytes()
 
@@ -673,39 +1043,33 @@ def add_user(user: UserCreate, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(db_user)
 
-    reload_embeddings()
+    face_index.add(db_user.id, db_user.name, embedding)
 
     return {"message": f"User '{normalized_name}' added", "user_id": db_user.id}
 
 @app.get("/users")
-def get_users(db: Session = Depends(get_db)):
-    users = db.query(User).all()
+async def get_users(db: AsyncSession = Depends(get_async_db)):
+    # Only the listed columns; the face encodings are not needed here
+    result = await db.execute(select(User.id, User.name, User.image_filename))
     return [
         {
             "id": user.id,
             "name": user.name,
             "image_url": f"/user-image/{user.image_filename}"
         }
-        for user in users
+        for user in result.all()
     ]
 
 @app.get("/user-items/{user_id}")
-def get_user_items(user_id: int, db: Session = Depends(get_db)):
-    items = db.query(UserItem).filter(UserItem.user_id == user_id).all()
+async def get_user_items(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    items = await fetch_user_items(db, user_id)
     
     if not items:
         return {"message": "No items found", "items": []}
 
     return {
         "message": "Items found",
-        "items": [
-            {
-                "item_id": ui.item.id,
-                "item_name": ui.item.name,
-                "description": ui.item.description,
-                "quantity": ui.quantity
-            } for ui in items if ui.item
-        ]
+        "items": items
     }
 
 
@@ -728,6 +1092,10 @@ def get_user_image(filename: str):
 
 @app.put("/update-user/{user_id}")
 def update_user(user_id: int, user: UserCreate, db: Session = Depends(get_db)):
+    # One reference for the whole request, so the saved image, the stored embedding and the
+    # index entry all come from the same capture even if another one happens meanwhile
+    image = captured_image
+
     db_user = db.query(User).filter(User.id == user_id).first()
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
@@ -751,18 +1119,15 @@ def update_user(user_id: int, user: UserCreate, db: Session = Depends(get_db)):
     db_user.name = normalized_name
     db_user.image_filename = new_filename
 
-    global captured_image
-    if captured_image is not None:
+    if image is not None:
         # Save new captured image
-        cv2.imwrite(new_image_path, captured_image)
+        cv2.imwrite(new_image_path, image)
 
         # Recalculate embedding
-        rgb_image = cv2.cvtColor(captured_image, cv2.COLOR_BGR2RGB)
-        faces = rec_model.get(rgb_image, max_num=1)
-        if not faces:
+        embedding = compute_embedding(image)
+        if embedding is None:
             raise HTTPException(status_code=400, detail="No face found")
 
-        embedding = faces[0].embedding
         embedding = embedding / np.linalg.norm(embedding)
         db_user.face_encoding = embedding.astype(np.float32).tobytes()
 
@@ -777,7 +1142,10 @@ def update_user(user_id: int, user: UserCreate, db: Session = Depends(get_db)):
 
     db.commit()
 
-    reload_embeddings()
+    if image is not None:
+        face_index.add(db_user.id, normalized_name, embedding)
+    else:
+        face_index.rename(db_user.id, normalized_name)
 
     return {"message": f"User '{normalized_name}' updated successfully"}
 
@@ -787,20 +1155,27 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    # The user's items go with them (cascade): no longer checked out
+    checked_out = Counter()
+    for user_item in user.user_items:
+        checked_out[user_item.item_id] -= user_item.quantity or 0
+
     db.delete(user)
+    db.flush()
+    for statement in balance_statements(checked_out=checked_out):
+        db.execute(statement)
     db.commit()
 
-    reload_embeddings()
+    face_index.remove(user_id)
 
     return {"message": "User deleted successfully"}
 
 
 @app.get("/check-user")
-def check_user(name: str = Query(...)):
-    db = SessionLocal()
+async def check_user(name: str = Query(...), db: AsyncSession = Depends(get_async_db)):
     normalized_name = name.strip().lower()
-    user = db.query(User).filter(User.name == normalized_name).first()
-    db.close()
+    result = await db.execute(select(User.id).filter(User.name == normalized_name))
+    user = result.first()
 
     if user:
         return {"exists": True, "id": user.id}
@@ -808,36 +1183,69 @@ def check_user(name: str = Query(...)):
         return {"exists": False}
     
 @app.post("/create-log")
-def create_log(entry: LogEntry, db: Session = Depends(get_db)):
-    # Update user items
-    def apply_change(item_list, delta):
-        for it in item_list:
-            ui = db.query(UserItem).filter_by(user_id=entry.user_id, item_id=it["item_id"]).first()
-            if ui:
-                ui.quantity += delta * it["quantity"]
-                if ui.quantity <= 0:
-                    db.delete(ui)
-            elif delta > 0:
-                new = UserItem(user_id=entry.user_id, item_id=it["item_id"], quantity=it["quantity"])
-                db.add(new)
-
-    apply_change(entry.items_added, +1)
-    apply_change(entry.items_returned, -1)
-
-    # Create log entry
-    new_log = ItemLog(
-        user_id=entry.user_id,
-        items_added=json.dumps(entry.items_added),
-        items_returned=json.dumps(entry.items_returned),
-        comment=entry.comment or ""
-    )
-    db.add(new_log)
-    db.commit()
+async def create_log(entry: LogEntry, db: AsyncSession = Depends(get_async_db)):
+    # One entry through record_logs(), the same rules as /create-logs and the journal's
+    # writer; with write-behind the same checks run before the entry is journaled
+    if log_journal is not None:
+        error = await check_entry(db, entry)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+        # Durable in the journal once this returns; the database commit follows in a group
+        seq = await asyncio.to_thread(log_journal.append, entry.model_dump())
+        return {"message": "Log recorded successfully", "journal_seq": seq}
+
+    errors = await record_logs(db, [entry])
+    if errors:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=errors[0]["detail"])
+    await db.commit()
     return {"message": "Log recorded successfully"}
 
+# Many log entries in one request and one transaction (e.g. kiosks catching up at shift
+# change); entries that fail validation are reported by index and the rest are recorded
+@app.post("/create-logs")
+async def create_logs(batch: LogBatch, db: AsyncSession = Depends(get_async_db)):
+    errors = await record_logs(db, batch.entries)
+    await db.commit()
+    return {
+        "message": "Logs recorded",
+        "recorded": len(batch.entries) - len(errors),
+        "errors": errors
+    }
+
+@app.get("/log-journal")
+def get_log_journal_stats():
+    # lag_entries / lag_s: journaled entries not yet committed, and how long the oldest has waited
+    if log_journal is None:
+        return {"enabled": False}
+    return log_journal.stats()
+
+@app.get("/inventory/{item_id}")
+async def get_inventory(item_id: int, db: AsyncSession = Depends(get_async_db)):
+    inventory = await fetch_inventory(db, item_id)
+    if inventory is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return inventory
+
+@app.get("/inventory-check")
+def inventory_check(db: Session = Depends(get_db)):
+    """Compare item_balances with the boxes and the replayed logs; read-only."""
+    differences = check_balances(db)
+    return {"consistent": not differences, "differences": differences}
+
+@app.post("/inventory-check/fix")
+def inventory_check_fix(db: Session = Depends(get_db)):
+    """Rebuild item_balances if it differs from the boxes and the replayed logs."""
+    differences = check_balances(db)
+    if differences:
+        rebuild_balances(db)
+        db.commit()
+    return {"consistent": not differences, "fixed": bool(differences), "differences": differences}
+
 @app.get("/item-master")
-def get_all_items(db: Session = Depends(get_db)):
-    items = db.query(ItemMaster).all()
+async def get_all_items(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(ItemMaster))
+    items = result.scalars().all()
     return [
         {
             "id": item.id,
@@ -849,13 +1257,105 @@ def get_all_items(db: Session = Depends(get_db)):
     ]
 
 
+# ========================================================================================
+#                      Paginated listings and NDJSON export (/list/...)
+# ========================================================================================
+#
+# GET /list/boxes?uid=UID0&item=screw&limit=50            first page
+# GET /list/boxes?uid=UID0&item=screw&cursor=<next_cursor>  following pages
+# GET /list/logs?user_id=3&since=2025-01-01&format=ndjson   every matching row, streamed
+
+async def list_response(db, listing, cursor, limit, format):
+    if format == "ndjson":
+        return StreamingResponse(
+            export_ndjson(AsyncSessionLocal, listing, cursor, config.EXPORT_CHUNK_SIZE),
+            media_type="application/x-ndjson"
+        )
+    return await fetch_page(db, listing, cursor, limit)
+
+def naive_utc(moment):
+    # ItemLog.timestamp is stored as naive UTC
+    if moment is None or moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+@app.get("/list/boxes")
+async def list_boxes(
+    uid: Optional[str] = None,
+    item: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(config.LIST_PAGE_SIZE, ge=1, le=config.LIST_MAX_PAGE_SIZE),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await list_response(db, box_listing(uid, item), cursor, limit, format)
+
+@app.get("/list/items")
+async def list_items(
+    name: Optional[str] = None,
+    box_uid: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(config.LIST_PAGE_SIZE, ge=1, le=config.LIST_MAX_PAGE_SIZE),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await list_response(db, item_listing(name, box_uid), cursor, limit, format)
+
+@app.get("/list/users")
+async def list_users(
+    name: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(config.LIST_PAGE_SIZE, ge=1, le=config.LIST_MAX_PAGE_SIZE),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await list_response(db, user_listing(name), cursor, limit, format)
+
+@app.get("/list/logs")
+async def list_logs(
+    user_id: Optional[int] = None,
+    item_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(config.LIST_PAGE_SIZE, ge=1, le=config.LIST_MAX_PAGE_SIZE),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    listing = log_listing(user_id, naive_utc(since), naive_utc(until), item_id)
+    return await list_response(db, listing, cursor, limit, format)
+
+# Item and user history from item_log_lines, e.g. who took item 12 last week:
+# GET /item-history/12?since=2025-06-02T00:00:00&until=2025-06-09T00:00:00
+@app.get("/item-history/{item_id}")
+async def get_item_history(
+    item_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await fetch_item_history(db, item_id, naive_utc(since), naive_utc(until))
+
+@app.get("/item-holders/{item_id}")
+async def get_item_holders(item_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await fetch_item_holders(db, item_id)
+
+@app.get("/user-history/{user_id}")
+async def get_user_history(
+    user_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await fetch_user_history(db, user_id, naive_utc(since), naive_utc(until))
+
+
 def clear_all_queues():
     try:
-        face_detection_queue.queue.clear()
+        frame_ring.clear()
+        detection_requested.clear()
         face_detection_result_queue.queue.clear()
-        face_embedding_queue.queue.clear()
-        face_embedding_result_queue.queue.clear()
-        face_recognition_queue.queue.clear()
+        face_crop_queue.queue.clear()
         face_recognition_result_queue.queue.clear()
         print("All queues cleared.")
     except Exception as e:
@@ -924,12 +1424,25 @@ def get_vision_settings():
 #                                     RFID Reader Endpoints
 # ========================================================================================
 
+# The MFRC522 reader (SPI) is opened on the first RFID request, so the API and the vision
+# pipeline also start on a machine without one
+reader = None
+reader_lock = threading.Lock()
+
+def get_reader():
+    global reader
+    with reader_lock:
+        if reader is None:
+            from rfid_reader import RFIDReader
+            reader = RFIDReader()
+        return reader
+
 # ------------------------------------   Initialize   ------------------------------------
 @app.post("/initialize")
 def initialize_rfid():
     """Initializes the RFID reader"""
     try:
-        success, error = reader.initialize_rfid()
+        success, error = get_reader().initialize_rfid()
         if success:
             return JSONResponse(
                 status_code=200,
@@ -951,7 +1464,7 @@ def initialize_rfid():
 def halt_rfid():
     """Halts communication with the RFID card"""
     try:
-        success, error = reader.halt_rfid()
+        success, error = get_reader().halt_rfid()
         if success:
             return JSONResponse(
                 status_code=200,
@@ -973,7 +1486,7 @@ def halt_rfid():
 def reset_rfid():
     """Resets the RFID reader"""
     try:
-        success, error = reader.reset_rfid()
+        success, error = get_reader().reset_rfid()
         if success:
             return {"message": "RFID reader has been reset."}
         else:
@@ -992,7 +1505,7 @@ def reset_rfid():
 def close_rfid():
     """Closes the RFID reader"""
     try:
-        success, error = reader.close_rfid()
+        success, error = get_reader().close_rfid()
         if success:
             return {"message": "RFID reader closed successfully."}
         else:
@@ -1012,7 +1525,7 @@ def close_rfid():
 def scan_rfid():
     """Scans for an RFID card and returns UID"""
     # print("[INFO] Scanning for RFID card...")
-    success, result = reader.scan_rfid()
+    success, result = get_reader().scan_rfid()
 
     if result == "Stopped by client":
         # Return HTTP 200 so the client sees this as a normal stop event
@@ -1027,7 +1540,7 @@ def scan_rfid():
 @app.post("/scancont")
 def scan_rfid_continuous():
     """Scans for an RFID card continuously until detected"""
-    success, result = reader.scan_rfid(continuous=True)
+    success, result = get_reader().scan_rfid(continuous=True)
 
     if result == "Stopped by client":
         # Return HTTP 200 so the client sees this as a normal stop event
@@ -1041,7 +1554,7 @@ def scan_rfid_continuous():
 # ------------------------------------   Stop Scan   -----------------------------------
 @app.post("/stopscan")
 def stop_scan():
-    reader.stop_scan = True
+    get_reader().stop_scan = True
     return {"message": "Scan stopped"}
 
 # ------------------------------------   Read   ---------------------------------------
@@ -1051,7 +1564,7 @@ async def read_rfid(request: Request):
     try:
         body = await request.json()
         block = body.get("block", 8)  # default to block 8 if not provided
-        success, result = reader.read_rfid(block=block)
+        success, result = get_reader().read_rfid(block=block)
 
         if success:
             return {
@@ -1073,7 +1586,7 @@ async def write_rfid(request: Request):
         block = int(body.get("block"))
         data_str = body.get("data", "")
 
-        success, result, error = reader.write_rfid(block, data_str)
+        success, result, error = get_reader().write_rfid(block, data_str)
 
         if success:
             return {
@@ -0,0 +1,86 @@
+# migrations.py
+#
+# Data migrations, run in order by init_db() after create_all() has created any new
+# tables. SQLite's user_version pragma holds the number of the last one applied, and is
+# set in the same transaction as the migration's writes.
+#
+# To run by hand:   cd RFID-Vision-Logger/web/backend/
+#                   python migrations.py
+
+import json, time
+from sqlalchemy import select, insert, text, exists
+from sqlalchemy.orm import Session
+from models import ItemLog, ItemLogLine, UserItem
+from logbook import line_values
+from balances import rebuild_balances
+
+BACKFILL_CHUNK = 1000
+
+
+def backfill_log_lines(db):
+    """Write item_log_lines for the logs recorded before the table existed."""
+    written, cursor = 0, 0
+    while True:
+        logs = db.execute(
+            select(ItemLog.id, ItemLog.user_id, ItemLog.timestamp, ItemLog.items_added, ItemLog.items_returned)
+            .where(ItemLog.id > cursor)
+            .where(~exists().where(ItemLogLine.log_id == ItemLog.id))
+            .order_by(ItemLog.id)
+            .limit(BACKFILL_CHUNK)
+        ).all()
+        if not logs:
+            return written
+
+        rows = []
+        for log in logs:
+            try:
+                added, returned = json.loads(log.items_added or "[]"), json.loads(log.items_returned or "[]")
+            except ValueError:
+                print(f"⚠️ Log {log.id}: items are not valid JSON, no lines written")
+                continue
+            for values in line_values(log.user_id, added, returned, log.timestamp):
+                rows.append({"log_id": log.id, **values})
+        if rows:
+            db.execute(insert(ItemLogLine), rows)
+        written += len(rows)
+        cursor = logs[-1].id
+
+
+def index_user_items(db):
+    """Index user_items by item_id; create_all() only indexes the tables it creates."""
+    for index in UserItem.__table__.indexes:
+        index.create(db.connection(), checkfirst=True)
+    return 0
+
+
+def add_item_log_sentinel(db):
+    """Add item_logs.sentinel (models.ItemLog) to a table created without it."""
+    columns = {row.name for row in db.execute(text("PRAGMA table_info(item_logs)"))}
+    if "sentinel" not in columns:
+        db.execute(text("ALTER TABLE item_logs ADD COLUMN sentinel INTEGER"))
+    return 0
+
+
+# user_version N means MIGRATIONS[:N] have been applied; only ever append to this list
+MIGRATIONS = [
+    backfill_log_lines,
+    rebuild_balances,       # first fill of item_balances
+    index_user_items,
+    add_item_log_sentinel,
+]
+
+
+def run_migrations(engine):
+    with Session(engine) as db:
+        version = db.execute(text("PRAGMA user_version")).scalar()
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            start = time.perf_counter()
+            count = migration(db)
+            db.execute(text(f"PRAGMA user_version = {number}"))
+            db.commit()
+            print(f"✅ Migration {number} ({migration.__name__}): {count} rows in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    from database import init_db
+    init_db()
@@ -0,0 +1,101 @@
+import time, threading
+
+
+class ModelRegistry:
+    """Loads the inference models in a background thread so the API answers right away.
+
+    Each model is registered with a loader and an optional warm-up call, run once after
+    loading so the first real frame does not pay for ONNX Runtime's lazy initialization,
+    and an optional describe call whose result (e.g. effective session settings) is
+    printed at startup and included in status().
+    get() blocks until a model is ready (or its timeout runs out); status() reports
+    progress and per-model load / warm-up times for the readiness endpoint.
+    """
+
+    def __init__(self):
+        self._entries = {}      # name -> dict(loader, warmup, model, state, error, timings, event)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.started_at = None
+
+    def register(self, name, loader, warmup=None, describe=None):
+        with self._lock:
+            self._entries[name] = {
+                "loader": loader,
+                "warmup": warmup,
+                "describe": describe,
+                "details": None,
+                "model": None,
+                "state": "pending",     # pending -> loading -> ready | failed
+                "error": None,
+                "load_s": None,
+                "warmup_s": None,
+                "event": threading.Event(),
+            }
+
+    def start(self):
+        """Load every registered model, in registration order, on a daemon thread."""
+        if self._thread is not None:
+            return
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._load_all, daemon=True)
+        self._thread.start()
+
+    def _load_all(self):
+        for name, entry in list(self._entries.items()):
+            entry["state"] = "loading"
+            try:
+                start = time.perf_counter()
+                model = entry["loader"]()
+                entry["load_s"] = time.perf_counter() - start
+
+                if entry["warmup"] is not None:
+                    start = time.perf_counter()
+                    entry["warmup"](model)
+                    entry["warmup_s"] = time.perf_counter() - start
+
+                if entry["describe"] is not None:
+                    entry["details"] = entry["describe"](model)
+
+                entry["model"] = model
+                entry["state"] = "ready"
+                print(f"✅ Model '{name}' ready (load {entry['load_s']:.2f} s, warm-up {entry['warmup_s'] or 0:.2f} s).")
+                if entry["details"]:
+                    print(f"   {name}: {entry['details']}")
+            except Exception as e:
+                entry["state"] = "failed"
+                entry["error"] = str(e)
+                print(f"❌ Model '{name}' failed to load: {e}")
+            finally:
+                entry["event"].set()
+
+    def get(self, name, timeout=None):
+        """Return the loaded model, waiting for it if needed; None if it is not ready within timeout."""
+        entry = self._entries[name]
+        if not entry["event"].wait(timeout):
+            return None
+        if entry["state"] == "failed":
+            raise RuntimeError(f"Model '{name}' failed to load: {entry['error']}")
+        return entry["model"]
+
+    def is_ready(self, name=None):
+        names = [name] if name is not None else list(self._entries)
+        return all(self._entries[n]["state"] == "ready" for n in names)
+
+    def status(self):
+        models = {}
+        for name, entry in self._entries.items():
+            models[name] = {
+                "state": entry["state"],
+                "load_ms": round(entry["load_s"] * 1000, 1) if entry["load_s"] is not None else None,
+                "warmup_ms": round(entry["warmup_s"] * 1000, 1) if entry["warmup_s"] is not None else None,
+                "error": entry["error"],
+                "details": entry["details"],
+            }
+        done = sum(1 for entry in self._entries.values() if entry["event"].is_set())
+        return {
+            "ready": self.is_ready(),
+            "progress": f"{done}/{len(self._entries)}",
+            "uptime_s": round(time.perf_counter() - self.started_at, 1) if self.started_at else 0.0,
+            "models": models,
+        }
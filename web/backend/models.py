@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, LargeBinary, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, LargeBinary, Text, Index, insert_sentinel
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -62,6 +62,11 @@ class UserItem(Base):
     user = relationship("User", back_populates="user_items")
     item = relationship("ItemMaster", back_populates="user_items")
 
+    # Who holds an item (/item-holders/{item_id})
+    __table_args__ = (
+        Index("ix_user_items_item", "item_id"),
+    )
+
 # Logs of user actions (add/return)
 class ItemLog(Base):
     __tablename__ = "item_logs"
@@ -72,6 +77,48 @@ class ItemLog(Base):
     items_added = Column(Text)      # JSON string: [{item_id, name, qty}]
     items_returned = Column(Text)   # JSON string: [{item_id, name, qty}]
     comment = Column(String)
+    # Numbered by SQLAlchemy in each multi-row INSERT, so RETURNING rows can be put back
+    # in parameter order (sort_by_parameter_order); SQLite's own ids cannot be used for that
+    sentinel = insert_sentinel("sentinel")
 
     user = relationship("User", back_populates="item_logs")
+    lines = relationship("ItemLogLine", back_populates="log", cascade="all, delete-orphan")
+
+# One row per item of a log (items_added / items_returned above, normalized), so item and
+# user history is answered from the indexes instead of json.loads-ing every log.
+# user_id and timestamp are copied from the log for the composite indexes.
+class ItemLogLine(Base):
+    __tablename__ = "item_log_lines"
+
+    id = Column(Integer, primary_key=True)
+    log_id = Column(Integer, ForeignKey("item_logs.id"), index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    item_id = Column(Integer, ForeignKey("item_master.id"))
+    quantity = Column(Integer)
+    direction = Column(String)      # "added" (taken by the user) or "returned"
+    timestamp = Column(DateTime)
+
+    log = relationship("ItemLog", back_populates="lines")
+
+    __table_args__ = (
+        Index("ix_item_log_lines_item_time", "item_id", "timestamp"),
+        Index("ix_item_log_lines_user_time", "user_id", "timestamp"),
+    )
+
+
+# Per item: how many are stocked in boxes and how many users hold right now. Kept up to
+# date in the same transaction as every change to box_items / user_items (balances.py).
+class ItemBalance(Base):
+    __tablename__ = "item_balances"
+
+    item_id = Column(Integer, ForeignKey("item_master.id"), primary_key=True)
+    in_boxes = Column(Integer, nullable=False, default=0)
+    checked_out = Column(Integer, nullable=False, default=0)
+
+# Last write-behind journal entry committed to the database (log_journal.py), written in
+# the same transaction as the entries so a replay after a crash skips them
+class JournalCheckpoint(Base):
+    __tablename__ = "journal_checkpoints"
 
+    name = Column(String, primary_key=True)
+    seq = Column(Integer, nullable=False)
@@ -0,0 +1,90 @@
+import time
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Cheap scene-change detector that lets the stream idle while nothing moves.
+
+    Each frame is shrunk to a small grayscale thumbnail and compared with the previous
+    thumbnail (motion) and with the thumbnail of the last frame let through (slow scene
+    change). A frame is "active" when more than ``area_threshold`` of the thumbnail
+    pixels differ by over ``pixel_threshold`` grey levels, and the gate stays active for
+    ``hold_frames`` frames after that. While idle, only one keep-alive frame is let
+    through every ``idle_interval`` seconds.
+    """
+
+    def __init__(self, thumb_size=(96, 96), pixel_threshold=25, area_threshold=0.005,
+                 hold_frames=15, idle_interval=1.0):
+        self.thumb_size = thumb_size
+        self.pixel_threshold = pixel_threshold
+        self.area_threshold = area_threshold
+        self.hold_frames = hold_frames
+        self.idle_interval = idle_interval
+
+        width, height = thumb_size
+        self._small = np.empty((height, width, 3), dtype=np.uint8)
+        self._gray = np.empty((height, width), dtype=np.uint8)
+        self._previous = np.empty((height, width), dtype=np.uint8)
+        self._reference = np.empty((height, width), dtype=np.uint8)
+        self._diff = np.empty((height, width), dtype=np.uint8)
+        self.reset()
+
+    def reset(self):
+        self._has_previous = False
+        self._hold = 0
+        self._last_pass = 0.0
+        self.active = True
+        self.frames_seen = 0
+        self.frames_passed = 0
+        self.frames_suppressed = 0
+        self.changed_fraction = 0.0
+
+    def _changed_fraction(self, other):
+        cv2.absdiff(self._gray, other, dst=self._diff)
+        return np.count_nonzero(self._diff > self.pixel_threshold) / self._diff.size
+
+    def update(self, image):
+        """Classify a frame; returns True while the scene is active (motion or change)."""
+        self.frames_seen += 1
+        if image.ndim == 3:
+            cv2.resize(image, self.thumb_size, dst=self._small, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        else:
+            cv2.resize(image, self.thumb_size, dst=self._gray, interpolation=cv2.INTER_AREA)
+
+        if not self._has_previous:
+            np.copyto(self._reference, self._gray)
+            changed = 1.0
+        else:
+            changed = max(self._changed_fraction(self._previous), self._changed_fraction(self._reference))
+        np.copyto(self._previous, self._gray)
+        self._has_previous = True
+        self.changed_fraction = float(changed)
+
+        if changed > self.area_threshold:
+            self._hold = self.hold_frames
+        elif self._hold > 0:
+            self._hold -= 1
+        self.active = self._hold > 0
+        return self.active
+
+    def should_pass(self, now=None, force=False):
+        """True when this frame should be processed and pushed: active, forced, or keep-alive due."""
+        now = time.perf_counter() if now is None else now
+        if self.active or force or now - self._last_pass >= self.idle_interval:
+            self._last_pass = now
+            self.frames_passed += 1
+            np.copyto(self._reference, self._gray)
+            return True
+        self.frames_suppressed += 1
+        return False
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "changed_fraction": round(self.changed_fraction, 4),
+            "frames_seen": self.frames_seen,
+            "frames_passed": self.frames_passed,
+            "frames_suppressed": self.frames_suppressed,
+        }
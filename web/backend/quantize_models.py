@@ -0,0 +1,132 @@
+# quantize_models.py
+#
+# Writes dynamically quantized (int8 weights) copies of the detection and recognition
+# graphs next to the InsightFace packs, then compares them with the float models:
+#
+#   - cosine drift between the float and int8 embedding of every enrolled user's photo
+#   - match accuracy: does the photo still match its own user in the stored gallery
+#     (users.face_encoding), and is the nearest user the same as with the float model
+#   - latency per inference of the detector and the recognition model, float vs int8
+#
+# To run:   cd RFID-Vision-Logger/web/backend/
+#           python quantize_models.py              (convert, then report)
+#           python quantize_models.py --report     (report only)
+#
+# Then start the backend with FACE_MODEL_PRECISION=int8 to use the quantized graphs.
+
+import os, sys, time, shutil
+import cv2
+import numpy as np
+from onnxruntime.quantization import quantize_dynamic, QuantType
+
+import config
+from database import SessionLocal
+from models import User
+from face_models import DETECTOR_PACK, DETECTOR_FILE, EMBEDDER_PACK, EMBEDDER_FILE
+from face_models import load_detector, load_embedder, align_face, run_embedding
+from insightface.utils import ensure_available
+
+IMAGE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+LATENCY_RUNS = 50
+THRESHOLD = 1.0     # same as recognition_results() in main.py
+
+
+def quantize(pack, filename):
+    source_dir = ensure_available('models', pack, root=config.INSIGHTFACE_ROOT)
+    target_dir = os.path.join(config.INSIGHTFACE_ROOT, 'models', pack + '_int8')
+    os.makedirs(target_dir, exist_ok=True)
+
+    source = os.path.join(source_dir, filename)
+    target = os.path.join(target_dir, filename)
+    tmp = target + ".tmp"
+    # Weights stored as int8, activations quantized on the fly (ConvInteger / MatMulInteger on CPU)
+    quantize_dynamic(source, tmp, weight_type=QuantType.QUInt8)
+    shutil.move(tmp, target)
+    print(f"{source} ({os.path.getsize(source) / 1e6:.1f} MB) -> {target} ({os.path.getsize(target) / 1e6:.1f} MB)")
+
+
+def latency_ms(run):
+    run()   # warm-up
+    start = time.perf_counter()
+    for _ in range(LATENCY_RUNS):
+        run()
+    return (time.perf_counter() - start) / LATENCY_RUNS * 1000
+
+
+def load_users():
+    db = SessionLocal()
+    try:
+        users = db.query(User).filter(User.face_encoding.isnot(None)).all()
+        return [(user.id, user.name, user.image_filename, np.frombuffer(user.face_encoding, dtype=np.float32)) for user in users]
+    finally:
+        db.close()
+
+
+def report():
+    users = load_users()
+    if not users:
+        sys.exit("No enrolled users with a face encoding in the database.")
+
+    gallery = np.stack([encoding / np.linalg.norm(encoding) for _, _, _, encoding in users])
+    ids = [user_id for user_id, _, _, _ in users]
+
+    def nearest(embedding):
+        embedding = embedding / np.linalg.norm(embedding)
+        distances = np.sqrt(np.maximum(2.0 - 2.0 * (gallery @ embedding), 0.0))
+        best = int(np.argmin(distances))
+        return ids[best], float(distances[best])
+
+    models = {precision: (load_detector(precision), load_embedder(precision)) for precision in ("fp32", "int8")}
+
+    drifts, correct, same_nearest, evaluated = [], {"fp32": 0, "int8": 0}, 0, 0
+    sample_frame, sample_crop = None, None
+    for user_id, name, filename, _ in users:
+        image = cv2.imread(os.path.join(IMAGE_DIRECTORY, filename or ""))
+        if image is None:
+            print(f"  skipped {name}: image {filename} not found")
+            continue
+        sample_frame = image if sample_frame is None else sample_frame
+
+        # End to end per precision: its own detector keypoints, alignment and embedding
+        embeddings, matches = {}, {}
+        for precision, (detector, embedder) in models.items():
+            faces = detector.get(image, max_num=1)
+            if not faces:
+                break
+            crop = align_face(image, faces[0].kps)
+            sample_crop = crop if sample_crop is None else sample_crop
+            embeddings[precision] = run_embedding(embedder, crop)
+            matches[precision] = nearest(embeddings[precision])
+        if len(embeddings) < 2:
+            print(f"  skipped {name}: no face detected")
+            continue
+
+        for precision, (nearest_id, distance) in matches.items():
+            correct[precision] += nearest_id == user_id and distance < THRESHOLD
+
+        a, b = embeddings["fp32"], embeddings["int8"]
+        drifts.append(1.0 - float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))))
+        same_nearest += matches["fp32"][0] == matches["int8"][0]
+        evaluated += 1
+
+    if evaluated == 0:
+        sys.exit("None of the enrolled users' photos could be evaluated.")
+
+    drifts = np.array(drifts)
+    print(f"\n{evaluated} enrolled users evaluated against a gallery of {len(users)}")
+    print(f"cosine drift fp32 -> int8   | mean {drifts.mean():.5f} | p95 {np.percentile(drifts, 95):.5f} | max {drifts.max():.5f}")
+    print(f"matches own user            | fp32 {correct['fp32'] / evaluated:6.1%} | int8 {correct['int8'] / evaluated:6.1%}")
+    print(f"same nearest user as fp32   | {same_nearest / evaluated:6.1%}")
+
+    print(f"\nlatency per inference ({LATENCY_RUNS} runs)")
+    for precision, (detector, embedder) in models.items():
+        detect_ms = latency_ms(lambda: detector.get(sample_frame, max_num=1))
+        embed_ms = latency_ms(lambda: run_embedding(embedder, sample_crop))
+        print(f"{precision:<5} | detection {detect_ms:7.2f} ms | recognition {embed_ms:7.2f} ms")
+
+
+if __name__ == "__main__":
+    if "--report" not in sys.argv:
+        quantize(DETECTOR_PACK, DETECTOR_FILE)
+        quantize(EMBEDDER_PACK, EMBEDDER_FILE)
+    report()
@@ -0,0 +1,270 @@
+# queries.py
+#
+# Read queries behind the box and user routes, with their relationships loaded up
+# front: a fixed number of SELECTs per request however many boxes and items there are.
+# The functions take an AsyncSession and return the JSON payloads the routes send.
+#
+# The /list/... routes page through a table by keyset (WHERE id > :cursor ORDER BY id
+# LIMIT n), so every page costs the same whatever its position, and export a whole
+# listing as NDJSON one page-sized query at a time.
+#
+# Item and user history is read from item_log_lines through its (item_id, timestamp)
+# and (user_id, timestamp) indexes; who holds an item now, from user_items by item_id.
+
+import json
+from sqlalchemy import select, and_, func, case
+from sqlalchemy.orm import selectinload, subqueryload, joinedload, load_only
+from models import ItemMaster, RfidBox, BoxItem, User, UserItem, ItemLog, ItemLogLine, ItemBalance
+
+# One SELECT for the boxes, one for all their box_items joined with item_master.
+# selectinload batches its IN (...) list per 500 parents, so the full listing uses
+# subqueryload, which fetches the box_items of every box in one statement.
+BOX_ITEMS = selectinload(RfidBox.box_items).joinedload(BoxItem.item)
+ALL_BOX_ITEMS = subqueryload(RfidBox.box_items).joinedload(BoxItem.item)
+
+
+def box_items_payload(box):
+    return [
+        {
+            "item_id": bi.item.id,
+            "item_name": bi.item.name,
+            "item_description": bi.item.description,
+            "quantity": bi.quantity
+        }
+        for bi in box.box_items
+        if bi.item is not None      # skip invalid item links
+    ]
+
+
+async def fetch_box(db, uid):
+    """Payload of the box with this UID, or None (2 queries)."""
+    result = await db.execute(select(RfidBox).filter(RfidBox.uid == uid).options(BOX_ITEMS))
+    box = result.scalars().first()
+    if box is None:
+        return None
+    return {"uid": box.uid, "box_name": box.box_name, "items": box_items_payload(box)}
+
+
+async def fetch_all_boxes(db):
+    """Payloads of every box with its items (2 queries)."""
+    result = await db.execute(select(RfidBox).options(ALL_BOX_ITEMS))
+    return [
+        {"id": box.id, "uid": box.uid, "box_name": box.box_name, "items": box_items_payload(box)}
+        for box in result.scalars().all()
+    ]
+
+
+async def fetch_inventory(db, item_id):
+    """Stock of one item from item_balances (1 primary key lookup), or None for an unknown item."""
+    result = await db.execute(
+        select(ItemMaster.id, ItemMaster.name, ItemBalance.in_boxes, ItemBalance.checked_out)
+        .outerjoin(ItemBalance, ItemBalance.item_id == ItemMaster.id)
+        .where(ItemMaster.id == item_id)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    in_boxes, checked_out = row.in_boxes or 0, row.checked_out or 0
+    return {
+        "item_id": row.id,
+        "item_name": row.name,
+        "in_boxes": in_boxes,
+        "checked_out": checked_out,
+        "available": in_boxes - checked_out,
+    }
+
+
+async def fetch_user_items(db, user_id):
+    """Items a user currently holds (1 query, item_master joined in)."""
+    result = await db.execute(
+        select(UserItem).filter(UserItem.user_id == user_id).options(joinedload(UserItem.item))
+    )
+    return [
+        {
+            "item_id": ui.item.id,
+            "item_name": ui.item.name,
+            "description": ui.item.description,
+            "quantity": ui.quantity
+        }
+        for ui in result.scalars().all()
+        if ui.item
+    ]
+
+
+# ---------------------------------------------------------------- keyset listings
+
+def prefix_filter(column, prefix):
+    """column starts with prefix, as a range the column's index can serve (LIKE cannot)."""
+    return and_(column >= prefix, column < prefix + "\U0010ffff")
+
+
+class Listing:
+    """A filtered SELECT of one table, the key it is paged by and how a row is serialized."""
+
+    def __init__(self, statement, key, serialize, descending=False):
+        self.statement = statement
+        self.key = key
+        self.serialize = serialize
+        self.descending = descending
+
+
+def box_listing(uid=None, item_prefix=None):
+    statement = select(RfidBox).options(BOX_ITEMS)
+    if uid:
+        statement = statement.where(prefix_filter(RfidBox.uid, uid))
+    if item_prefix:
+        statement = statement.where(RfidBox.box_items.any(BoxItem.item.has(prefix_filter(ItemMaster.name, item_prefix))))
+    return Listing(statement, RfidBox.id, lambda box: {
+        "id": box.id, "uid": box.uid, "box_name": box.box_name, "items": box_items_payload(box)
+    })
+
+
+def item_listing(name_prefix=None, box_uid=None):
+    statement = select(ItemMaster)
+    if name_prefix:
+        statement = statement.where(prefix_filter(ItemMaster.name, name_prefix))
+    if box_uid:
+        statement = statement.where(ItemMaster.box_items.any(BoxItem.box.has(RfidBox.uid == box_uid)))
+    return Listing(statement, ItemMaster.id, lambda item: {
+        "id": item.id, "name": item.name, "description": item.description, "total_quantity": item.total_quantity
+    })
+
+
+def user_listing(name_prefix=None):
+    # Only the listed columns; the face encodings are not needed here
+    statement = select(User).options(load_only(User.id, User.name, User.image_filename))
+    if name_prefix:
+        statement = statement.where(prefix_filter(User.name, name_prefix.strip().lower()))
+    return Listing(statement, User.id, lambda user: {
+        "id": user.id, "name": user.name, "image_url": f"/user-image/{user.image_filename}"
+    })
+
+
+def log_listing(user_id=None, since=None, until=None, item_id=None):
+    """Item logs, newest first; since / until are naive UTC datetimes like ItemLog.timestamp."""
+    statement = select(ItemLog).options(joinedload(ItemLog.user).load_only(User.name))
+    if user_id is not None:
+        statement = statement.where(ItemLog.user_id == user_id)
+    if item_id is not None:
+        statement = statement.where(ItemLog.id.in_(select(ItemLogLine.log_id).where(ItemLogLine.item_id == item_id)))
+    if since is not None:
+        statement = statement.where(ItemLog.timestamp >= since)
+    if until is not None:
+        statement = statement.where(ItemLog.timestamp < until)
+    return Listing(statement, ItemLog.id, lambda log: {
+        "id": log.id,
+        "user_id": log.user_id,
+        "user_name": log.user.name if log.user else None,
+        "timestamp": log.timestamp.isoformat() if log.timestamp else None,
+        "items_added": json.loads(log.items_added or "[]"),
+        "items_returned": json.loads(log.items_returned or "[]"),
+        "comment": log.comment,
+    }, descending=True)
+
+
+async def fetch_page(db, listing, cursor=None, limit=50):
+    """One page of a listing: {"results": [...], "next_cursor": key to pass back, or None}."""
+    key = listing.key
+    statement = listing.statement
+    if cursor is not None:
+        statement = statement.where(key < cursor if listing.descending else key > cursor)
+    statement = statement.order_by(key.desc() if listing.descending else key).limit(limit + 1)
+
+    rows = (await db.execute(statement)).scalars().all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "results": [listing.serialize(row) for row in rows],
+        "next_cursor": getattr(rows[-1], key.key) if more else None,
+    }
+
+
+async def export_ndjson(session_factory, listing, cursor=None, chunk_size=500):
+    """Yield every row of a listing as NDJSON lines, one chunk_size query at a time.
+
+    Each chunk runs in its own short session, so memory stays at one chunk and a long
+    export does not hold a read snapshot open while the kiosks keep writing.
+    """
+    while True:
+        async with session_factory() as db:
+            page = await fetch_page(db, listing, cursor, chunk_size)
+        if page["results"]:
+            yield "".join(json.dumps(row) + "\n" for row in page["results"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return
+
+
+# ---------------------------------------------------------------- item / user history
+
+def in_time_range(statement, since=None, until=None):
+    if since is not None:
+        statement = statement.where(ItemLogLine.timestamp >= since)
+    if until is not None:
+        statement = statement.where(ItemLogLine.timestamp < until)
+    return statement
+
+
+def line_totals():
+    """Quantity taken, quantity returned and the last time, over a group of log lines."""
+    return (
+        func.sum(case((ItemLogLine.direction == "added", ItemLogLine.quantity), else_=0)).label("taken"),
+        func.sum(case((ItemLogLine.direction == "returned", ItemLogLine.quantity), else_=0)).label("returned"),
+        func.max(ItemLogLine.timestamp).label("last_at"),
+    )
+
+
+def totals_payload(row):
+    return {
+        "taken": row.taken,
+        "returned": row.returned,
+        "last_at": row.last_at.isoformat() if row.last_at else None,
+    }
+
+
+async def fetch_item_history(db, item_id, since=None, until=None):
+    """Who took and returned an item in a time range, per user, most recent first."""
+    totals = in_time_range(
+        select(ItemLogLine.user_id, *line_totals()).where(ItemLogLine.item_id == item_id), since, until
+    ).group_by(ItemLogLine.user_id).subquery()
+    result = await db.execute(
+        select(totals, User.name).outerjoin(User, User.id == totals.c.user_id).order_by(totals.c.last_at.desc())
+    )
+    return [
+        {"user_id": row.user_id, "user_name": row.name, **totals_payload(row)}
+        for row in result.all()
+    ]
+
+
+async def fetch_item_holders(db, item_id):
+    """Users holding an item now, from user_items through its item_id index."""
+    held = func.sum(UserItem.quantity)
+    holders = (
+        select(UserItem.user_id, held.label("quantity"))
+        .where(UserItem.item_id == item_id)
+        .group_by(UserItem.user_id)
+        .having(held > 0)
+        .subquery()
+    )
+    result = await db.execute(
+        select(holders, User.name).outerjoin(User, User.id == holders.c.user_id).order_by(holders.c.quantity.desc())
+    )
+    return [
+        {"user_id": row.user_id, "user_name": row.name, "quantity": row.quantity}
+        for row in result.all()
+    ]
+
+
+async def fetch_user_history(db, user_id, since=None, until=None):
+    """What a user took and returned in a time range, per item, most recent first."""
+    totals = in_time_range(
+        select(ItemLogLine.item_id, *line_totals()).where(ItemLogLine.user_id == user_id), since, until
+    ).group_by(ItemLogLine.item_id).subquery()
+    result = await db.execute(
+        select(totals, ItemMaster.name).outerjoin(ItemMaster, ItemMaster.id == totals.c.item_id)
+        .order_by(totals.c.last_at.desc())
+    )
+    return [
+        {"item_id": row.item_id, "item_name": row.name, **totals_payload(row)}
+        for row in result.all()
+    ]
@@ -0,0 +1,126 @@
+import time
+
+
+class AdaptiveStreamController:
+    """Chooses JPEG quality, output scale and frame rate for the live stream.
+
+    The streaming loop reports, per frame, how long JPEG encoding and the WebSocket
+    send took and how many frames inference is behind. Every ``adjust_interval``
+    seconds the controller compares the smoothed numbers with the frame budget
+    (1 / fps) and moves one step:
+
+    - a slow send (client or Wi-Fi backlog) lowers quality, then scale, then fps;
+    - slow encoding lowers scale, then fps;
+    - inference falling behind lowers fps;
+    - after ``recover_after`` healthy intervals in a row it steps back up (fps first).
+    """
+
+    def __init__(self, min_quality=40, max_quality=90, quality_step=10,
+                 min_scale=0.5, max_scale=1.0, scale_step=0.125,
+                 min_fps=5, max_fps=30, fps_step=5,
+                 max_inference_lag=15, adjust_interval=0.5, recover_after=4, smoothing=0.2):
+        self.min_quality, self.max_quality, self.quality_step = min_quality, max_quality, quality_step
+        self.min_scale, self.max_scale, self.scale_step = min_scale, max_scale, scale_step
+        self.min_fps, self.max_fps, self.fps_step = min_fps, max_fps, fps_step
+        self.max_inference_lag = max_inference_lag
+        self.adjust_interval = adjust_interval
+        self.recover_after = recover_after
+        self.smoothing = smoothing
+        self.reset()
+
+    def reset(self):
+        self.quality = self.max_quality
+        self.scale = self.max_scale
+        self.fps = self.max_fps
+        self.encode_s = 0.0
+        self.send_s = 0.0
+        self.inference_lag = 0.0
+        self.reason = "start"
+        self._healthy_intervals = 0
+        self._last_adjust = time.perf_counter()
+        self._next_frame_time = 0.0
+
+    def _smooth(self, old, new):
+        return old + self.smoothing * (new - old)
+
+    # ------------------------------------------------------------------ per frame
+
+    def should_send(self, now=None):
+        """Frame-rate gate: True when enough time has passed since the last sent frame."""
+        now = time.perf_counter() if now is None else now
+        if now < self._next_frame_time:
+            return False
+        # Schedule from the ideal time, but never build up a burst after a stall
+        self._next_frame_time = max(self._next_frame_time + 1.0 / self.fps, now - 0.5 / self.fps)
+        return True
+
+    def observe(self, encode_s=None, send_s=None, inference_lag=None):
+        if encode_s is not None:
+            self.encode_s = self._smooth(self.encode_s, encode_s)
+        if send_s is not None:
+            self.send_s = self._smooth(self.send_s, send_s)
+        if inference_lag is not None:
+            self.inference_lag = self._smooth(self.inference_lag, inference_lag)
+
+    # ------------------------------------------------------------------ adjustment
+
+    def _step_quality(self, direction):
+        new = min(max(self.quality + direction * self.quality_step, self.min_quality), self.max_quality)
+        changed, self.quality = new != self.quality, new
+        return changed
+
+    def _step_scale(self, direction):
+        new = min(max(self.scale + direction * self.scale_step, self.min_scale), self.max_scale)
+        changed, self.scale = new != self.scale, new
+        return changed
+
+    def _step_fps(self, direction):
+        new = min(max(self.fps + direction * self.fps_step, self.min_fps), self.max_fps)
+        changed, self.fps = new != self.fps, new
+        return changed
+
+    def update(self, now=None):
+        """Re-evaluate the settings; returns True when any of them changed."""
+        now = time.perf_counter() if now is None else now
+        if now - self._last_adjust < self.adjust_interval:
+            return False
+        self._last_adjust = now
+
+        budget = 1.0 / self.fps
+        if self.send_s > 0.5 * budget:
+            self._healthy_intervals = 0
+            self.reason = "network"
+            return self._step_quality(-1) or self._step_scale(-1) or self._step_fps(-1)
+        if self.encode_s > 0.3 * budget:
+            self._healthy_intervals = 0
+            self.reason = "encode"
+            return self._step_scale(-1) or self._step_fps(-1)
+        if self.inference_lag > self.max_inference_lag:
+            self._healthy_intervals = 0
+            self.reason = "inference"
+            return self._step_fps(-1)
+
+        # Only recover when there is clear headroom, so the settings do not oscillate
+        if self.send_s + self.encode_s < 0.25 * budget and self.inference_lag < self.max_inference_lag / 2:
+            self._healthy_intervals += 1
+        else:
+            self._healthy_intervals = 0
+
+        if self._healthy_intervals >= self.recover_after:
+            self._healthy_intervals = 0
+            self.reason = "recovered"
+            return self._step_fps(+1) or self._step_scale(+1) or self._step_quality(+1)
+        return False
+
+    def decisions(self):
+        """Current settings and the measurements behind them (sent to the client as JSON)."""
+        return {
+            "type": "stream_settings",
+            "quality": self.quality,
+            "scale": self.scale,
+            "fps": self.fps,
+            "reason": self.reason,
+            "encode_ms": round(self.encode_s * 1000, 2),
+            "send_ms": round(self.send_s * 1000, 2),
+            "inference_lag_frames": round(self.inference_lag, 1),
+        }
@@ -0,0 +1,69 @@
+# Tests of the backend modules, run from web/backend/:   python -m pytest
+#
+# The modules import each other flat (from models import ...), as when uvicorn runs
+# main:app from this directory.
+
+import os, sys, asyncio
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from database import Base, make_engine, make_async_engine
+from models import ItemMaster, RfidBox, BoxItem, User
+from migrations import run_migrations
+from balances import rebuild_balances
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A scratch SQLite database with the full schema, migrated like init_db() does."""
+    path = str(tmp_path / "test.db")
+    engine = make_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    engine.dispose()
+    return path
+
+
+@pytest.fixture
+def db(db_path):
+    """A sync session on the scratch database, for seeding and checking."""
+    engine = make_engine(f"sqlite:///{db_path}")
+    with sessionmaker(bind=engine, autoflush=False)() as session:
+        yield session
+    engine.dispose()
+
+
+@pytest.fixture
+def run_async(db_path):
+    """run_async(scenario): runs the coroutine function scenario(Session) on a fresh event
+    loop, Session being an async_sessionmaker on the scratch database like AsyncSessionLocal."""
+    def run(scenario):
+        async def main():
+            engine = make_async_engine(f"sqlite+aiosqlite:///{db_path}")
+            try:
+                return await scenario(async_sessionmaker(engine, autoflush=False, expire_on_commit=False))
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+    return run
+
+
+@pytest.fixture
+def warehouse(db):
+    """Users "alice" (id 1) and "bob" (id 2); items 1-6 named "item 1".."item 6"; box UID001
+    holding 10 each of items 1-3 and UID002 holding 10 each of items 4-6; balances to match."""
+    db.add_all([User(name="alice"), User(name="bob")])
+    db.add_all(ItemMaster(name=f"item {i}", description=f"description {i}", total_quantity=0) for i in range(1, 7))
+    db.flush()
+    for number, item_ids in ((1, (1, 2, 3)), (2, (4, 5, 6))):
+        box = RfidBox(uid=f"UID00{number}", box_name=f"box {number}")
+        db.add(box)
+        db.flush()
+        db.add_all(BoxItem(box_id=box.id, item_id=item_id, quantity=10) for item_id in item_ids)
+    db.flush()
+    rebuild_balances(db)
+    db.commit()
+    return db
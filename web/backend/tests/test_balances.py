@@ -0,0 +1,71 @@
+from sqlalchemy import update
+from models import ItemMaster, ItemBalance, UserItem
+from logbook import new_log
+from balances import balance_statements, replay_checked_out, check_balances, rebuild_balances
+from queries import fetch_inventory
+
+
+def stored(db, item_id):
+    balance = db.get(ItemBalance, item_id)
+    return (balance.in_boxes, balance.checked_out) if balance else None
+
+
+def test_warehouse_starts_consistent(warehouse):
+    assert stored(warehouse, 1) == (10, 0)
+    assert warehouse.get(ItemMaster, 1).total_quantity == 10
+    assert check_balances(warehouse) == []
+
+
+def test_statements_add_deltas_and_update_total_quantity(warehouse):
+    for statement in balance_statements(in_boxes={1: -4, 2: 0}, checked_out={1: 3, 6: 2}):
+        warehouse.execute(statement)
+    warehouse.commit()
+    warehouse.expire_all()
+
+    assert stored(warehouse, 1) == (6, 3)
+    assert stored(warehouse, 2) == (10, 0)
+    assert stored(warehouse, 6) == (10, 2)
+    assert warehouse.get(ItemMaster, 1).total_quantity == 6
+
+
+def test_no_statements_without_a_change():
+    assert balance_statements() == []
+    assert balance_statements(in_boxes={1: 0}, checked_out={2: 0}) == []
+
+
+def test_replay_follows_create_log_rules(warehouse):
+    warehouse.add_all([
+        # Returned in the same log that first takes it: the return is not applied
+        new_log(1, [{"item_id": 1, "quantity": 2}], [{"item_id": 1, "quantity": 2}]),
+        # Return of an item bob does not hold: dropped
+        new_log(2, [], [{"item_id": 2, "quantity": 5}]),
+        # Taken, then returned in full and more: the holding is gone, not negative
+        new_log(2, [{"item_id": 3, "quantity": 1}], []),
+        new_log(2, [], [{"item_id": 3, "quantity": 4}]),
+    ])
+    warehouse.commit()
+    assert dict(replay_checked_out(warehouse)) == {1: 2}
+
+
+def test_check_reports_and_rebuild_fixes_drift(warehouse, run_async):
+    warehouse.add(new_log(1, [{"item_id": 4, "quantity": 3}], []))
+    warehouse.add(UserItem(user_id=1, item_id=4, quantity=3))
+    warehouse.execute(update(ItemBalance).where(ItemBalance.item_id == 5).values(in_boxes=7))
+    warehouse.commit()
+
+    differences = {difference["item_id"]: difference for difference in check_balances(warehouse)}
+    assert set(differences) == {4, 5}
+    assert differences[4]["expected"] == {"in_boxes": 10, "checked_out": 3}
+    assert differences[5]["stored"] == {"in_boxes": 7, "checked_out": 0}
+
+    assert rebuild_balances(warehouse) == 6
+    warehouse.commit()
+    assert check_balances(warehouse) == []
+
+    async def scenario(Session):
+        async with Session() as session:
+            return await fetch_inventory(session, 4), await fetch_inventory(session, 99)
+
+    inventory, missing = run_async(scenario)
+    assert inventory == {"item_id": 4, "item_name": "item 4", "in_boxes": 10, "checked_out": 3, "available": 7}
+    assert missing is None
@@ -0,0 +1,78 @@
+import json
+from box_cache import BoxCache, CachedBox, etag_matches
+
+
+def payload(uid, *item_names):
+    return {"uid": uid, "box_name": f"box {uid}", "items": [
+        {"item_id": i, "item_name": name, "item_description": "", "quantity": 1} for i, name in enumerate(item_names)
+    ]}
+
+
+def test_etag_follows_the_payload():
+    first = CachedBox(payload("A", "screw"), expires_at=0)
+    assert json.loads(first.body) == payload("A", "screw")
+    assert CachedBox(payload("A", "screw"), expires_at=0).etag == first.etag
+    assert CachedBox(payload("A", "nail"), expires_at=0).etag != first.etag
+
+
+def test_if_none_match():
+    etag = '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"old", "abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches("", etag)
+
+
+def test_hit_miss_and_lru_eviction():
+    cache = BoxCache(max_entries=2, ttl=60)
+    for uid in "ABC":
+        assert cache.get(uid, now=0) is None
+        cache.put(uid, payload(uid), cache.version(), now=0)
+    # A was the least recently used when C came in
+    assert cache.get("A", now=1) is None
+    assert cache.get("B", now=1).payload["uid"] == "B"
+    cache.put("D", payload("D"), cache.version(), now=1)
+    assert cache.get("C", now=1) is None and cache.get("B", now=1) is not None
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (2, 2, 5)
+
+
+def test_entries_expire_after_the_ttl():
+    cache = BoxCache(ttl=10)
+    cache.put("A", payload("A"), cache.version(), now=0)
+    assert cache.get("A", now=9.9) is not None
+    assert cache.get("A", now=10) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidate_by_uid_and_by_item_name():
+    cache = BoxCache()
+    cache.put("A", payload("A", "screw", "nut"), cache.version())
+    cache.put("B", payload("B", "nut"), cache.version())
+    cache.put("C", payload("C", "bolt"), cache.version())
+
+    cache.invalidate(uids=["A"])
+    assert cache.get("A") is None and cache.get("B") is not None
+
+    cache.invalidate(item_names=["nut"])
+    assert cache.get("B") is None and cache.get("C") is not None
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_a_lookup_older_than_an_invalidation_is_not_stored():
+    cache = BoxCache()
+    version = cache.version()       # read from the database starts
+    cache.invalidate(uids=["A"])    # the box is saved meanwhile
+    entry = cache.put("A", payload("A", "stale"), version)
+    assert entry.payload["items"][0]["item_name"] == "stale"     # still served to this request
+    assert cache.get("A") is None
+
+
+def test_zero_entries_disables_the_cache():
+    cache = BoxCache(max_entries=0)
+    cache.put("A", payload("A"), cache.version())
+    assert cache.get("A") is None
@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import select
+from database import count_queries
+from models import ItemMaster, RfidBox, BoxItem
+from balances import check_balances
+from boxes import save_boxes, parse_box_csv
+
+
+def box(uid, items, box_name=None):
+    return SimpleNamespace(uid=uid, box_name=box_name or uid, items=[
+        SimpleNamespace(item_name=name, item_description=f"{name} description", quantity=quantity)
+        for name, quantity in items
+    ])
+
+
+def save(run_async, boxes):
+    async def scenario(Session):
+        async with Session() as session:
+            with count_queries() as counter:
+                box_ids = await save_boxes(session, boxes)
+            await session.commit()
+        return box_ids, counter.count
+    return run_async(scenario)
+
+
+def contents(db, uid):
+    return sorted(
+        (item.name, box_item.quantity)
+        for box_item, item in db.execute(
+            select(BoxItem, ItemMaster).join(ItemMaster).join(RfidBox).where(RfidBox.uid == uid)
+        )
+    )
+
+
+def test_new_box_and_replaced_contents(warehouse, run_async):
+    box_ids, _ = save(run_async, [box("UID003", [("item 1", 2), ("new item", 4)])])
+    assert set(box_ids) == {"UID003"}
+    assert contents(warehouse, "UID003") == [("item 1", 2), ("new item", 4)]
+
+    save(run_async, [box("UID001", [("item 2", 1)], box_name="renamed")])
+    warehouse.expire_all()
+    assert contents(warehouse, "UID001") == [("item 2", 1)]
+    assert warehouse.scalar(select(RfidBox.box_name).where(RfidBox.uid == "UID001")) == "renamed"
+    assert warehouse.scalar(select(ItemMaster.description).where(ItemMaster.name == "item 2")) == "item 2 description"
+    assert check_balances(warehouse) == []
+
+
+def test_same_uid_twice_keeps_the_last(warehouse, run_async):
+    save(run_async, [box("UID009", [("item 1", 1)]), box("UID009", [("item 3", 3)])])
+    assert contents(warehouse, "UID009") == [("item 3", 3)]
+
+
+def test_statement_count_does_not_grow_with_items(warehouse, run_async):
+    _, small = save(run_async, [box("UID010", [(f"item {i}", 1) for i in range(1, 3)])])
+    _, large = save(run_async, [box("UID011", [(f"bulk {i}", 1) for i in range(50)])])
+    _, many = save(run_async, [box(f"MANY{b}", [(f"bulk {i}", 1) for i in range(10)]) for b in range(40)])
+    assert small == large == 8
+    assert many == 7        # its items are already up to date, so no item upsert
+    assert check_balances(warehouse) == []
+
+
+def test_empty_save_runs_nothing(run_async, db_path):
+    assert save(run_async, []) == ({}, 0)
+
+
+def test_csv_rows_are_merged_per_uid():
+    text = (
+        "UID,Box_Name,Item_Name,Item_Description,Quantity\n"
+        "A1,Screws,M3,Small,10\n"
+        "A1,,M4,,5\n"
+        " B2 ,,,,\n"
+        ",,,,\n"
+    )
+    assert parse_box_csv(text) == [
+        {"uid": "A1", "box_name": "Screws", "items": [
+            {"item_name": "M3", "item_description": "Small", "quantity": 10},
+            {"item_name": "M4", "item_description": "", "quantity": 5},
+        ]},
+        {"uid": "B2", "box_name": "B2", "items": []},
+    ]
+
+
+def test_scanner_export_registers_empty_boxes():
+    boxes = parse_box_csv("Timestamp,UID\n2025-04-01 10:00:00,04A1B2C3\n2025-04-01 10:00:05,04A1B2C3\n")
+    assert boxes == [{"uid": "04A1B2C3", "box_name": "04A1B2C3", "items": []}]
+
+
+def test_csv_errors():
+    with pytest.raises(ValueError, match="uid"):
+        parse_box_csv("name,quantity\nx,1\n")
+    with pytest.raises(ValueError, match="line 3"):
+        parse_box_csv("uid,item_name,quantity\nA,x,1\nA,y,many\n")
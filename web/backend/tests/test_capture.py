@@ -0,0 +1,43 @@
+import asyncio, threading
+import pytest
+
+from capture import CaptureThread
+
+
+class BlockedCamera:
+    """A camera whose capture blocks until released, like a sensor read that hangs."""
+    finished = False
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def continous_capture(self):
+        while True:
+            self.release.wait()
+            yield None
+
+
+class NullRing:
+    def write(self, image):
+        return None
+
+
+def test_stop_keeps_a_thread_that_did_not_exit():
+    async def scenario():
+        camera = BlockedCamera()
+        capture = CaptureThread(camera, NullRing())
+        capture.start()
+
+        assert not capture.stop(timeout=0.05)
+        assert capture.is_running
+        with pytest.raises(RuntimeError):
+            capture.start()     # a second reader on the same camera
+
+        camera.release.set()
+        assert capture.stop(timeout=2.0)
+        assert not capture.is_running
+        capture.start()         # the camera is free again
+        assert capture.is_running
+        assert capture.stop(timeout=2.0)
+
+    asyncio.run(scenario())
@@ -0,0 +1,174 @@
+import numpy as np
+import pytest
+
+from face_index import FaceIndex, gallery_digest
+from ann_index import IVFFaceIndex, HNSWFaceIndex, create_face_index, hnswlib
+
+BACKENDS = ["exact", "ivf", pytest.param("hnsw", marks=pytest.mark.skipif(hnswlib is None, reason="hnswlib not installed"))]
+
+
+def embeddings(count, seed=0, dim=512):
+    return np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+
+
+def gallery(count=40, seed=0):
+    return [(user_id, f"user {user_id}", emb) for user_id, emb in enumerate(embeddings(count, seed), start=1)]
+
+
+def make_index(backend):
+    # IVF trains from 16 faces on, so the saved centroids are exercised too
+    options = {"min_train_size": 16, "nlist": 4, "nprobe": 4} if backend == "ivf" else {}
+    return create_face_index(backend, **options)
+
+
+def test_search_finds_the_enrolled_face():
+    index = FaceIndex()
+    index.rebuild(gallery())
+    user_id, name, distance = index.search(gallery()[6][2])[0]
+    assert (user_id, name) == (7, "user 7")
+    assert distance == pytest.approx(0.0, abs=1e-3)
+
+
+def test_remove_keeps_rows_packed():
+    index = FaceIndex()
+    entries = gallery(5)
+    index.rebuild(entries)
+    assert index.remove(2)
+    assert not index.remove(2)
+    assert len(index) == 4
+    assert sorted(index.user_ids()) == [1, 3, 4, 5]
+    # The last row moved into the freed slot and is still found under its own id
+    assert index.search(entries[4][2])[0][:2] == (5, "user 5")
+
+
+def test_best_matches_agrees_with_best_match():
+    index = FaceIndex()
+    index.rebuild(gallery())
+    queries = embeddings(8, seed=1)
+    assert [name for name, _ in index.best_matches(queries)] == [index.best_match(q)[0] for q in queries]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_save_and_load_round_trip(tmp_path, backend):
+    path = str(tmp_path / "index.npz")
+    index = make_index(backend)
+    index.rebuild(gallery())
+    index.rename(3, "renamed")
+    index.remove(5)
+    index.save(path)
+    assert not index.dirty
+
+    loaded = make_index(backend)
+    loaded.load(path)
+    assert loaded.digest() == index.digest()
+    assert sorted(loaded.user_ids()) == sorted(index.user_ids())
+    for user_id, _, emb in gallery():
+        if user_id != 5:
+            assert loaded.search(emb)[0][0] == user_id
+    if backend == "ivf":
+        assert loaded.is_trained
+
+
+def test_ivf_trains_as_it_grows_through_add():
+    index = IVFFaceIndex(min_train_size=100, nprobe=4)
+    entries = gallery(500)
+    for user_id, name, emb in entries[:99]:
+        index.add(user_id, name, emb)
+    assert not index.is_trained
+
+    index.add(*entries[99])
+    assert index.is_trained and index._centroids.shape[0] == 10
+
+    # Retrained with sqrt(n) clusters once the gallery has doubled
+    for user_id, name, emb in entries[100:]:
+        index.add(user_id, name, emb)
+    assert index._trained_size == 400 and index._centroids.shape[0] == 20
+    assert index.search(entries[450][2])[0][0] == 451
+
+
+def test_ivf_trains_a_large_untrained_file_on_load(tmp_path):
+    path = str(tmp_path / "index.npz")
+    untrained = IVFFaceIndex(min_train_size=1000)
+    untrained.rebuild(gallery(200))
+    untrained.save(path)
+
+    loaded = IVFFaceIndex(min_train_size=100)
+    loaded.load(path)
+    assert loaded.is_trained and loaded.dirty
+
+    loaded.save(path)
+    reloaded = IVFFaceIndex(min_train_size=100)
+    reloaded.load(path)
+    assert reloaded.is_trained and not reloaded.dirty
+
+
+def test_create_face_index_passes_only_constructor_parameters():
+    # The shared config holds the options of every backend; each takes its own
+    index = create_face_index("ivf", nprobe=2, m=16, ef=64)
+    assert isinstance(index, IVFFaceIndex) and index.nprobe == 2
+    assert type(create_face_index("exact", nprobe=2, capacity=8)) is FaceIndex
+    with pytest.raises(ValueError):
+        create_face_index("annoy")
+
+
+def test_load_refuses_another_backend(tmp_path):
+    path = str(tmp_path / "index.npz")
+    index = FaceIndex()
+    index.rebuild(gallery())
+    index.save(path)
+    with pytest.raises(ValueError):
+        IVFFaceIndex().load(path)
+
+
+def test_digest_follows_names_and_embeddings_not_row_order():
+    entries = gallery(10)
+    index = FaceIndex()
+    index.rebuild(entries)
+    expected = gallery_digest([e[0] for e in entries], [e[1] for e in entries],
+                              [FaceIndex.normalize(e[2]) for e in entries])
+    assert index.digest() == expected
+
+    shuffled = FaceIndex()
+    shuffled.rebuild(reversed(entries))
+    assert shuffled.digest() == expected
+
+    index.rename(4, "someone else")
+    assert index.digest() != expected
+    index.rename(4, "user 4")
+    assert index.digest() == expected
+
+    index.add(4, "user 4", embeddings(1, seed=9)[0])     # face re-enrolled
+    assert index.digest() != expected
+
+
+def test_load_detects_a_corrupt_file(tmp_path):
+    path = str(tmp_path / "index.npz")
+    index = FaceIndex()
+    index.rebuild(gallery(5))
+    index.save(path)
+
+    with np.load(path) as data:
+        state = {key: data[key] for key in data.files}
+    state["names"] = np.asarray(["x"] * 5)
+    with open(path, "wb") as f:
+        np.savez(f, **state)
+    with pytest.raises(ValueError):
+        FaceIndex().load(path)
+
+
+@pytest.mark.skipif(hnswlib is None, reason="hnswlib not installed")
+def test_hnsw_refuses_a_graph_from_another_save(tmp_path):
+    path = str(tmp_path / "index.npz")
+    index = HNSWFaceIndex()
+    index.rebuild(gallery(10))
+    index.save(path)
+    old_npz = open(path, "rb").read()
+
+    # Crash after the graph of a newer save was renamed into place, before its .npz was
+    index.add(99, "new", embeddings(1, seed=5)[0])
+    index.save(path)
+    with open(path, "wb") as f:
+        f.write(old_npz)
+
+    with pytest.raises(ValueError):
+        HNSWFaceIndex().load(path)
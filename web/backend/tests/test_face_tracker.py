@@ -0,0 +1,59 @@
+from face_tracker import FaceTracker, iou
+
+BOX = (100, 100, 200, 200)
+
+
+def tracked(tracker, now=0.0):
+    return tracker.update([BOX], now=now)[0]
+
+
+def test_iou():
+    assert iou(BOX, BOX) == 1.0
+    assert iou(BOX, (300, 300, 400, 400)) == 0.0
+
+
+def test_moving_face_keeps_its_track():
+    tracker = FaceTracker()
+    first = tracked(tracker)
+    second = tracker.update([(110, 105, 210, 205)], now=0.1)[0]
+    assert second is first
+    assert tracker.tracks_created == 1
+
+
+def test_track_dropped_after_max_misses():
+    tracker = FaceTracker(max_misses=2)
+    tracked(tracker)
+    for frame in range(3):
+        tracker.update([], now=frame * 0.1)
+    assert not tracker.tracks
+
+
+def test_accepted_match_is_held_whatever_its_distance():
+    tracker = FaceTracker(confidence_half_life=10.0, min_confidence=0.2)
+    track = tracked(tracker)
+    assert tracker.needs_recognition(track, now=0.0)
+
+    tracker.mark_requested(track, now=0.0)
+    assert not tracker.needs_recognition(track, now=0.1)      # in flight
+
+    # Just inside the index's threshold of 1.0: still held for log2(1 / 0.2) half-lives
+    tracker.set_identity(track.id, {"name": "alice", "distance": 0.95}, now=0.0)
+    assert tracker.confidence(track, now=0.0) == 1.0
+    assert not tracker.needs_recognition(track, now=20.0)
+    assert tracker.needs_recognition(track, now=24.0)
+
+
+def test_unknown_face_retried_after_unknown_retry():
+    tracker = FaceTracker(unknown_retry=1.0)
+    track = tracked(tracker)
+    tracker.set_identity(track.id, None, now=0.0)
+    assert not tracker.needs_recognition(track, now=0.5)
+    assert tracker.needs_recognition(track, now=1.0)
+
+
+def test_lost_request_is_retried_after_timeout():
+    tracker = FaceTracker(request_timeout=2.0)
+    track = tracked(tracker)
+    tracker.mark_requested(track, now=0.0)
+    assert not tracker.needs_recognition(track, now=1.9)
+    assert tracker.needs_recognition(track, now=2.0)
@@ -0,0 +1,57 @@
+import time, queue, threading
+import numpy as np
+
+from inference_pool import InferencePool
+
+
+def collecting_pool(on_result, drop_stale):
+    """A pool whose collector runs, fed by hand in place of the worker processes (never started)."""
+    pool = InferencePool("recognition", ring=None, workers=2, on_result=on_result, drop_stale=drop_stale)
+    pool._results = queue.Queue()
+    threading.Thread(target=pool._collect, daemon=True).start()
+    return pool
+
+
+def drain(pool):
+    """Wait until the collector has handled everything put so far (it counts "ready" messages)."""
+    pool._results.put(("ready", 0, None, 0.0))
+    deadline = time.monotonic() + 2
+    while not pool.ready_workers and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.ready_workers
+
+
+def submit(pool, count):
+    for context in range(count):
+        assert pool.reserve(timeout=1)
+        pool.submit_array(np.zeros(1), context=context)
+
+
+def test_a_failing_callback_does_not_stop_the_collector():
+    delivered = []
+
+    def on_result(result, context):
+        if context == 0:
+            raise KeyError("track gone")
+        delivered.append((result, context))
+
+    pool = collecting_pool(on_result, drop_stale=False)
+    submit(pool, 2)
+    pool._results.put(("result", 1, "first", 0.0))
+    pool._results.put(("result", 2, "second", 0.0))
+    drain(pool)
+
+    assert delivered == [("second", 1)]
+    assert pool.callback_errors == 1 and pool.in_flight == 0
+    assert pool.reserve(timeout=1) and pool.reserve(timeout=1)      # both workers free again
+
+
+def test_drop_stale_delivers_only_newer_results():
+    for drop_stale, expected in ((True, ["newer"]), (False, ["newer", "older"])):
+        delivered = []
+        pool = collecting_pool(lambda result, context: delivered.append(result), drop_stale)
+        submit(pool, 2)
+        pool._results.put(("result", 2, "newer", 0.0))
+        pool._results.put(("result", 1, "older", 0.0))
+        drain(pool)
+        assert delivered == expected
@@ -0,0 +1,120 @@
+import asyncio, json, os
+from types import SimpleNamespace
+from sqlalchemy import select, func
+from models import ItemLog, UserItem, JournalCheckpoint
+from logbook import check_entry
+from balances import check_balances
+from log_journal import LogJournal, CHECKPOINT
+
+
+def entry(user_id, item_id, quantity=1):
+    return {"user_id": user_id, "items_added": [{"item_id": item_id, "quantity": quantity}], "items_returned": [],
+            "comment": None}
+
+
+def log_count(db):
+    db.expire_all()
+    return db.scalar(select(func.count(ItemLog.id)))
+
+
+def journal_at(tmp_path):
+    return LogJournal(str(tmp_path / "journal.ndjson"), interval=0.001, fsync=False)
+
+
+def test_appended_entries_are_committed(warehouse, run_async, tmp_path):
+    async def scenario(Session):
+        journal = journal_at(tmp_path)
+        await journal.start(Session)
+        seqs = [await asyncio.to_thread(journal.append, entry(1 + i % 2, 1 + i % 6)) for i in range(30)]
+        await journal.stop(timeout=30)
+        return journal, seqs
+
+    journal, seqs = run_async(scenario)
+    assert seqs == list(range(1, 31))
+    assert log_count(warehouse) == 30
+    assert warehouse.get(JournalCheckpoint, CHECKPOINT).seq == 30
+    assert os.path.getsize(journal.path) == 0      # truncated once caught up
+    assert journal.stats()["committed"] == 30 and journal.stats()["lag_entries"] == 0
+    assert check_balances(warehouse) == []
+
+
+def test_crash_is_replayed_and_a_torn_line_cut(warehouse, run_async, tmp_path):
+    async def crash(Session):
+        journal = journal_at(tmp_path)
+        await journal.start(Session)
+        journal._task.cancel()                      # the writer dies with everything pending
+        for i in range(5):
+            journal.append(entry(1, 2))
+        journal._file.write('{"seq": 6, "entry": {"user_')
+        journal._file.close()
+
+    async def restart(Session):
+        journal = journal_at(tmp_path)
+        await journal.start(Session)
+        await journal.stop(timeout=30)
+        return journal.replayed
+
+    run_async(crash)
+    assert log_count(warehouse) == 0
+    assert run_async(restart) == 5
+    assert log_count(warehouse) == 5
+    assert warehouse.scalar(select(UserItem.quantity).where(UserItem.user_id == 1, UserItem.item_id == 2)) == 5
+
+    # Nothing left to replay: the checkpoint covers it all
+    assert run_async(restart) == 0
+    assert log_count(warehouse) == 5
+
+
+def test_entries_before_the_checkpoint_are_not_replayed(warehouse, run_async, tmp_path):
+    path = tmp_path / "journal.ndjson"
+    path.write_text("".join(json.dumps({"seq": seq, "entry": entry(2, 3)}) + "\n" for seq in range(1, 5)))
+    warehouse.add(JournalCheckpoint(name=CHECKPOINT, seq=3))
+    warehouse.commit()
+
+    async def restart(Session):
+        journal = journal_at(tmp_path)
+        await journal.start(Session)
+        await journal.stop(timeout=30)
+        return journal.replayed, journal.appended_seq
+
+    assert run_async(restart) == (1, 4)
+    assert log_count(warehouse) == 1
+
+
+def test_rejected_entries_go_to_the_dead_letter_file(warehouse, run_async, tmp_path):
+    async def scenario(Session):
+        journal = journal_at(tmp_path)
+        await journal.start(Session)
+        journal.append(entry(1, 1))
+        journal.append(entry(42, 1))                # e.g. the user was deleted after validation
+        await journal.stop(timeout=30)
+        return journal
+
+    journal = run_async(scenario)
+    assert log_count(warehouse) == 1
+    with open(journal.dead_letter_path) as f:
+        rejected = [json.loads(line) for line in f]
+    assert [(record["seq"], record["detail"]) for record in rejected] == [(2, "user 42 not found")]
+    assert journal.stats()["recent_rejections"][0]["entry"] == entry(42, 1)
+
+    # Shown again after a restart
+    async def restart(Session):
+        journal = journal_at(tmp_path)
+        await journal.start(Session)
+        await journal.stop()
+        return journal.stats()["recent_rejections"]
+
+    assert len(run_async(restart)) == 1
+
+
+def test_check_entry_matches_what_record_logs_rejects(warehouse, run_async):
+    async def scenario(Session):
+        async with Session() as session:
+            return [
+                await check_entry(session, SimpleNamespace(**values))
+                for values in (entry(1, 1), entry(9, 1), entry(1, 9), entry(1, 1, quantity=0),
+                               {**entry(1, 1), "items_added": [{"item_id": "zz", "quantity": 1}]})
+            ]
+
+    assert run_async(scenario) == [None, "user 9 not found", "item 9 not found", "item 1: quantity must be positive",
+                                   "invalid item_id 'zz'"]
@@ -0,0 +1,91 @@
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from sqlalchemy import select
+from models import ItemLog, ItemLogLine
+from logbook import new_log, record_logs
+from balances import check_balances
+from migrations import backfill_log_lines
+from queries import fetch_item_history, fetch_item_holders, fetch_user_history
+
+
+def lines(db):
+    return [(line.log_id, line.item_id, line.quantity, line.direction)
+            for line in db.scalars(select(ItemLogLine).order_by(ItemLogLine.id))]
+
+
+def test_new_log_writes_one_line_per_item(warehouse):
+    log = new_log(1, [{"item_id": 1, "quantity": 2}, {"item_id": 2, "qty": 3}],
+                  [{"item_id": 3, "quantity": 1}, {"name": "no id"}], "comment")
+    warehouse.add(log)
+    warehouse.commit()
+
+    assert lines(warehouse) == [(log.id, 1, 2, "added"), (log.id, 2, 3, "added"), (log.id, 3, 1, "returned")]
+    assert all(line.user_id == 1 and line.timestamp == log.timestamp for line in log.lines)
+
+
+def test_backfill_writes_lines_for_old_logs_only(warehouse):
+    timestamp = datetime(2025, 6, 1)
+    old = ItemLog(user_id=2, timestamp=timestamp, items_added=json.dumps([{"item_id": 4, "qty": 5}]), items_returned="[]")
+    broken = ItemLog(user_id=2, timestamp=timestamp, items_added="not json", items_returned="[]")
+    current = new_log(1, [{"item_id": 1, "quantity": 1}], [])
+    warehouse.add_all([old, broken, current])
+    warehouse.commit()
+
+    assert backfill_log_lines(warehouse) == 1
+    warehouse.commit()
+    assert lines(warehouse) == [(current.id, 1, 1, "added"), (old.id, 4, 5, "added")]
+    assert backfill_log_lines(warehouse) == 0
+
+
+def add_log(db, user_id, added, returned, timestamp):
+    log = new_log(user_id, added, returned)
+    log.timestamp = timestamp
+    for line in log.lines:
+        line.timestamp = timestamp
+    db.add(log)
+    db.commit()
+
+
+def test_item_and_user_history(warehouse, run_async):
+    add_log(warehouse, 1, [{"item_id": 1, "quantity": 3}], [], datetime(2026, 1, 1))
+    add_log(warehouse, 2, [{"item_id": 1, "quantity": 1}], [], datetime(2026, 1, 2))
+    add_log(warehouse, 1, [], [{"item_id": 1, "quantity": 1}], datetime(2026, 1, 3))
+    add_log(warehouse, 2, [], [{"item_id": 1, "quantity": 1}, {"item_id": 2, "quantity": 1}], datetime(2026, 1, 4))
+
+    async def scenario(Session):
+        async with Session() as session:
+            return (
+                await fetch_item_history(session, 1),
+                await fetch_item_history(session, 1, since=datetime(2026, 1, 2), until=datetime(2026, 1, 3)),
+                await fetch_user_history(session, 2),
+            )
+
+    history, ranged, user_history = run_async(scenario)
+    assert [(row["user_name"], row["taken"], row["returned"]) for row in history] == [("bob", 1, 1), ("alice", 3, 1)]
+    assert history[0]["last_at"] == "2026-01-04T00:00:00"
+    assert [(row["user_name"], row["taken"], row["returned"]) for row in ranged] == [("bob", 1, 0)]
+    assert sorted((row["item_name"], row["taken"], row["returned"]) for row in user_history) == [
+        ("item 1", 1, 1), ("item 2", 0, 1)
+    ]
+
+
+def test_item_holders_follow_user_items(warehouse, run_async):
+    def entry(user_id, added=(), returned=()):
+        return SimpleNamespace(user_id=user_id, comment=None,
+                               items_added=[{"item_id": 1, "quantity": q} for q in added],
+                               items_returned=[{"item_id": 1, "quantity": q} for q in returned])
+
+    async def scenario(Session):
+        async with Session() as session:
+            # alice returns 3 she does not hold (dropped), then takes 2; bob takes 5, returns 1
+            await record_logs(session, [entry(1, returned=[3]), entry(1, added=[2]),
+                                        entry(2, added=[5]), entry(2, returned=[1])])
+            await session.commit()
+            return await fetch_item_holders(session, 1)
+
+    assert run_async(scenario) == [
+        {"user_id": 2, "user_name": "bob", "quantity": 4},
+        {"user_id": 1, "user_name": "alice", "quantity": 2},
+    ]
+    assert check_balances(warehouse) == []
@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+from sqlalchemy import select, func
+from database import count_queries
+from models import ItemLog, ItemLogLine, UserItem
+from logbook import apply_log, record_logs
+from balances import check_balances
+
+
+def entry(user_id, added=(), returned=(), comment=None):
+    return SimpleNamespace(user_id=user_id, comment=comment,
+                           items_added=[{"item_id": i, "quantity": q} for i, q in added],
+                           items_returned=[{"item_id": i, "quantity": q} for i, q in returned])
+
+
+def record(run_async, entries):
+    async def scenario(Session):
+        async with Session() as session:
+            with count_queries() as counter:
+                errors = await record_logs(session, entries)
+            await session.commit()
+        return errors, counter.count
+    return run_async(scenario)
+
+
+def holdings(db):
+    return {(row.user_id, row.item_id): row.quantity for row in db.scalars(select(UserItem))}
+
+
+def test_apply_log():
+    held = {(1, 2): 1}
+    change = apply_log(held, 1, [{"item_id": 3, "quantity": 2}], [{"item_id": 2, "quantity": 5}, {"item_id": 3, "quantity": 1}])
+    assert held == {(1, 3): 2}
+    assert change == {3: 2, 2: -1}
+
+
+def test_entries_are_recorded_in_order(warehouse, run_async):
+    errors, _ = record(run_async, [
+        entry(1, added=[(1, 3)]),
+        entry(1, returned=[(1, 1)]),
+        entry(2, added=[(1, 1), (4, 2)]),
+        entry(2, returned=[(4, 2)]),
+    ])
+    assert errors == []
+    assert holdings(warehouse) == {(1, 1): 2, (2, 1): 1}
+    assert warehouse.scalar(select(func.count(ItemLog.id))) == 4
+    assert check_balances(warehouse) == []
+
+
+def test_single_entry_with_qty_and_a_repeated_item(warehouse, run_async):
+    # As POST /create-log records it: "qty" from early kiosks, a string quantity, one item twice
+    log = SimpleNamespace(user_id=1, comment=None, items_returned=[],
+                          items_added=[{"item_id": 1, "qty": "2"}, {"item_id": 1, "quantity": 3}])
+    errors, _ = record(run_async, [log])
+    assert errors == []
+    assert holdings(warehouse) == {(1, 1): 5}
+    assert warehouse.scalar(select(func.count(UserItem.id))) == 1
+    assert check_balances(warehouse) == []
+
+
+def test_identical_entries_each_get_their_lines(warehouse, run_async):
+    errors, _ = record(run_async, [entry(1, added=[(1, 1), (2, 1)])] * 3 + [entry(2, added=[(1, 1)])])
+    assert errors == []
+    per_log = warehouse.execute(
+        select(ItemLogLine.log_id, func.count(), func.min(ItemLogLine.user_id))
+        .group_by(ItemLogLine.log_id).order_by(ItemLogLine.log_id)
+    ).all()
+    assert [(count, user_id) for _, count, user_id in per_log] == [(2, 1), (2, 1), (2, 1), (1, 2)]
+
+
+def test_lines_belong_to_their_own_log(warehouse, run_async):
+    entries = [entry(1 + i % 2, added=[(1 + i % 6, 1 + i)], comment=f"entry {i}") for i in range(700)]
+    errors, _ = record(run_async, entries)
+    assert errors == []
+    rows = warehouse.execute(
+        select(ItemLog.comment, ItemLog.user_id, ItemLogLine.user_id, ItemLogLine.item_id, ItemLogLine.quantity)
+        .join(ItemLogLine, ItemLogLine.log_id == ItemLog.id).order_by(ItemLog.id)
+    ).all()
+    assert [row[0] for row in rows] == [f"entry {i}" for i in range(700)]
+    assert all(row[1:] == (1 + i % 2, 1 + i % 2, 1 + i % 6, 1 + i) for i, row in enumerate(rows))
+
+
+def test_invalid_entries_are_reported_by_index(warehouse, run_async):
+    bad_id = SimpleNamespace(user_id=1, comment=None, items_added=[{"item_id": "zz", "quantity": 1}], items_returned=[])
+    errors, _ = record(run_async, [
+        entry(1, added=[(2, 1)]),
+        entry(99, added=[(2, 1)]),
+        entry(1, added=[(99, 1)]),
+        bad_id,
+        entry(2, added=[(3, 0)]),
+    ])
+    assert errors == [
+        {"index": 1, "detail": "user 99 not found"},
+        {"index": 2, "detail": "item 99 not found"},
+        {"index": 3, "detail": "invalid item_id 'zz'"},
+        {"index": 4, "detail": "item 3: quantity must be positive"},
+    ]
+    assert holdings(warehouse) == {(1, 2): 1}
+    assert warehouse.scalar(select(func.count(ItemLog.id))) == 1
+
+
+def test_statement_count_does_not_grow_with_entries(warehouse, run_async):
+    def batch(count):
+        # Repeats the same takes and returns, so after the first batch only UPDATEs user_items
+        return [entry(1 + i % 2, added=[(1 + i % 6, 2)], returned=[(1 + (i + 3) % 6, 1)]) for i in range(count)]
+
+    record(run_async, batch(12))
+    _, few = record(run_async, batch(12))
+    _, many = record(run_async, batch(600))       # more than one 500-row chunk of logs
+    assert few == 7         # users, items, user_items lookups; the UPDATE; logs; lines; balances
+    # 600 logs: two 500-row chunks of logs, their 1200 lines in three 500-row statements
+    assert many == few + 3
+    assert warehouse.scalar(select(func.count(ItemLog.id))) == 624
+    assert check_balances(warehouse) == []
@@ -0,0 +1,122 @@
+import json
+from datetime import datetime, timedelta
+from database import count_queries
+from models import ItemMaster, RfidBox, BoxItem, UserItem, ItemLog
+from queries import (fetch_box, fetch_all_boxes, fetch_user_items, fetch_page, export_ndjson,
+                     box_listing, item_listing, user_listing, log_listing)
+
+
+def add_boxes(db, count, items_per_box=3):
+    items = [ItemMaster(name=f"bulk {i}", description="", total_quantity=0) for i in range(count * items_per_box)]
+    db.add_all(items)
+    db.flush()
+    for b in range(count):
+        box = RfidBox(uid=f"BULK{b:04d}", box_name=f"bulk box {b}")
+        db.add(box)
+        db.flush()
+        db.add_all(BoxItem(box_id=box.id, item_id=items[b * items_per_box + i].id, quantity=1) for i in range(items_per_box))
+    db.add_all(UserItem(user_id=1, item_id=item.id, quantity=1) for item in items)
+    db.commit()
+
+
+def count(run_async, call):
+    async def scenario(Session):
+        async with Session() as session:
+            with count_queries() as counter:
+                result = await call(session)
+        return result, counter.count
+    return run_async(scenario)
+
+
+def test_fetch_box_payload(warehouse, run_async):
+    box, _ = count(run_async, lambda session: fetch_box(session, "UID001"))
+    assert box["box_name"] == "box 1"
+    assert [(item["item_name"], item["quantity"]) for item in box["items"]] == [("item 1", 10), ("item 2", 10), ("item 3", 10)]
+    assert count(run_async, lambda session: fetch_box(session, "missing"))[0] is None
+
+
+def test_reads_run_a_constant_number_of_queries(warehouse, run_async):
+    calls = {
+        "fetch_box": lambda session: fetch_box(session, "UID001"),
+        "fetch_all_boxes": fetch_all_boxes,
+        "fetch_user_items": lambda session: fetch_user_items(session, 1),
+    }
+    small = {name: count(run_async, call)[1] for name, call in calls.items()}
+    add_boxes(warehouse, 600)     # more than selectinload's 500 parents per IN list
+    large = {name: count(run_async, call)[1] for name, call in calls.items()}
+
+    assert small == large == {"fetch_box": 2, "fetch_all_boxes": 2, "fetch_user_items": 1}
+    assert len(count(run_async, fetch_all_boxes)[0]) == 602
+
+
+# ---------------------------------------------------------------- keyset listings
+
+def page_through(run_async, listing, limit):
+    async def scenario(Session):
+        pages, cursor = [], None
+        while True:
+            async with Session() as session:
+                page = await fetch_page(session, listing, cursor, limit)
+            pages.append(page["results"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return pages
+    return run_async(scenario)
+
+
+def add_logs(db, count, start=datetime(2026, 1, 1)):
+    for i in range(count):
+        db.add(ItemLog(user_id=1 + i % 2, timestamp=start + timedelta(hours=i),
+                       items_added=json.dumps([{"item_id": 1, "quantity": 1}]), items_returned="[]", comment=f"log {i}"))
+    db.commit()
+
+
+def test_pages_cover_every_row_once(warehouse, run_async):
+    add_boxes(warehouse, 23)
+    pages = page_through(run_async, box_listing(), limit=10)
+    assert [len(page) for page in pages] == [10, 10, 5]
+    ids = [box["id"] for page in pages for box in page]
+    assert ids == sorted(ids) and len(set(ids)) == 25
+
+
+def test_exact_multiple_of_the_page_size_ends_without_an_empty_page(warehouse, run_async):
+    add_boxes(warehouse, 8)
+    assert [len(page) for page in page_through(run_async, box_listing(), limit=5)] == [5, 5]
+
+
+def test_listing_filters(warehouse, run_async):
+    add_boxes(warehouse, 3)
+
+    def uids(listing):
+        return [box["uid"] for page in page_through(run_async, listing, 50) for box in page]
+
+    assert uids(box_listing(uid="UID")) == ["UID001", "UID002"]
+    assert uids(box_listing(item_prefix="item 5")) == ["UID002"]
+    assert uids(box_listing(item_prefix="bulk 4")) == ["BULK0001"]
+
+    items = [item["name"] for page in page_through(run_async, item_listing(box_uid="UID001"), 50) for item in page]
+    assert items == ["item 1", "item 2", "item 3"]
+    users = [user["name"] for page in page_through(run_async, user_listing(name_prefix=" Al"), 50) for user in page]
+    assert users == ["alice"]
+
+
+def test_logs_newest_first_with_time_range(warehouse, run_async):
+    add_logs(warehouse, 12)
+    listing = log_listing(user_id=1, since=datetime(2026, 1, 1, 2), until=datetime(2026, 1, 1, 9))
+    logs = [log for page in page_through(run_async, listing, limit=2) for log in page]
+    assert [log["comment"] for log in logs] == ["log 8", "log 6", "log 4", "log 2"]
+    assert logs[0]["user_name"] == "alice"
+    assert logs[0]["items_added"] == [{"item_id": 1, "quantity": 1}]
+
+
+def test_export_streams_every_row_in_chunks(warehouse, run_async):
+    add_boxes(warehouse, 9)
+
+    async def scenario(Session):
+        return [chunk async for chunk in export_ndjson(Session, box_listing(), chunk_size=4)]
+
+    chunks = run_async(scenario)
+    rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert len(chunks) == 3
+    assert [row["uid"] for row in rows][:2] == ["UID001", "UID002"]
+    assert len(rows) == 11
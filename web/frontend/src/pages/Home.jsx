@@ -77,24 +77,27 @@ const HomePage = () => {
 
           if (json.type === "auto_trigger") {
             setIsFaceCentered(json.status);
-          } else if (json.type === "recognition") {
+          } else if (json.type === "recognitions") {
 
-            // console.log("Recognition result:", json.name);
+            // Every tracked face; only the primary one (the largest, at the counter) logs in,
+            // and only once it is recognized: a face in the background must not
+            const primary = json.faces.find(f => f.track_id === json.primary_track_id);
+            // console.log("Recognition result:", primary?.name);
             
-            if (!isAnotherPersonRef.current) {  
+            if (primary && !primary.pending && !isAnotherPersonRef.current) {  
               // console.log("isAnotherPersonRef:", isAnotherPersonRef);
 
-              if (json.name) {
-                setDetectedName(capitalizeName(json.name));
-                setSearchTerm(capitalizeName(json.name));
-                showSavedImage(json.name);
+              if (primary.name) {
+                setDetectedName(capitalizeName(primary.name));
+                setSearchTerm(capitalizeName(primary.name));
+                showSavedImage(primary.name);
               } else {
                 setDetectedName(null);
               }
 
               setIsRecognitionDone(true);
 
-              if (json.name) {
+              if (primary.name) {
                 api.post("/stopContinuous").then(() => {
                   console.log("Continuous capture stopped after recognition");
                 }).catch(err => {
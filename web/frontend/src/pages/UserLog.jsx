@@ -1,5 +1,159 @@
+import React, { useEffect, useRef, useState } from "react";
+import api from "../api";
+
+// Local midnight of a yyyy-mm-dd date input, as an ISO timestamp the backend converts to UTC
+const startOfDay = (date, addDays = 0) => {
+  const day = new Date(`${date}T00:00`);
+  day.setDate(day.getDate() + addDays);
+  return day.toISOString();
+};
+
+const formatItems = (items) =>
+  items.map(item => `${item.name || `Item #${item.item_id}`} x${item.quantity}`).join(", ");
+
 const UserLog = () => {
-    return <h1 className="text-3xl font-bold">UserLog Page</h1>;
+  const [logs, setLogs] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [users, setUsers] = useState([]);
+  const [userId, setUserId] = useState("");
+  const [since, setSince] = useState("");
+  const [until, setUntil] = useState("");
+  const request = useRef(null);
+
+  useEffect(() => {
+    const fetchUsers = async () => {
+      try {
+        const response = await api.get("/list/users", { params: { limit: 500 } });
+        setUsers(response.data.results);
+      } catch (err) {
+        console.error("Failed to fetch users:", err);
+      }
+    };
+
+    fetchUsers();
+  }, []);
+
+  useEffect(() => {
+    fetchLogs();
+    return () => request.current?.abort();
+  }, [userId, since, until]);
+
+  const filterParams = () => ({
+    user_id: userId || undefined,
+    since: since ? startOfDay(since) : undefined,
+    until: until ? startOfDay(until, 1) : undefined,   // the whole "until" day is included
+  });
+
+  // Newest first, one page at a time from /list/logs; "Load more" continues from next_cursor.
+  // Each request cancels the one still in flight, so a slower, older response never
+  // replaces the results of the newer filter
+  const fetchLogs = async (cursor = null) => {
+    request.current?.abort();
+    const controller = new AbortController();
+    request.current = controller;
+    try {
+      const response = await api.get("/list/logs", {
+        params: { ...filterParams(), cursor: cursor ?? undefined },
+        signal: controller.signal,
+      });
+      const { results, next_cursor } = response.data;
+      setLogs(prev => (cursor ? [...prev, ...results] : results));
+      setNextCursor(next_cursor);
+    } catch (err) {
+      if (controller.signal.aborted) return;
+      console.error("Failed to fetch logs:", err);
+    }
   };
-  export default UserLog;
-  
\ No newline at end of file
+
+  // The whole filtered log as NDJSON, streamed by the backend
+  const exportUrl = () => {
+    const params = new URLSearchParams({ format: "ndjson" });
+    Object.entries(filterParams()).forEach(([key, value]) => {
+      if (value !== undefined) params.append(key, value);
+    });
+    return `${api.defaults.baseURL}/list/logs?${params}`;
+  };
+
+  return (
+    <div className="p-4">
+      <div className="flex flex-wrap items-center gap-4 mb-6">
+        <select
+          value={userId}
+          onChange={(e) => setUserId(e.target.value)}
+          className="px-4 py-2 border rounded-md focus:outline-none focus:ring focus:border-blue-300 capitalize"
+        >
+          <option value="">All users</option>
+          {users.map(user => (
+            <option key={user.id} value={user.id}>{user.name}</option>
+          ))}
+        </select>
+
+        <label className="flex items-center gap-2">
+          From
+          <input
+            type="date"
+            value={since}
+            onChange={(e) => setSince(e.target.value)}
+            className="px-4 py-2 border rounded-md focus:outline-none focus:ring focus:border-blue-300"
+          />
+        </label>
+
+        <label className="flex items-center gap-2">
+          To
+          <input
+            type="date"
+            value={until}
+            onChange={(e) => setUntil(e.target.value)}
+            className="px-4 py-2 border rounded-md focus:outline-none focus:ring focus:border-blue-300"
+          />
+        </label>
+
+        <a
+          href={exportUrl()}
+          download="item_logs.ndjson"
+          className="bg-[#285082] text-white px-6 py-2 rounded-md hover:bg-[#1f407a]"
+        >
+          Export
+        </a>
+      </div>
+
+      <table className="w-full bg-white rounded-xl shadow text-left">
+        <thead>
+          <tr className="border-b text-gray-500">
+            <th className="p-3">Time</th>
+            <th className="p-3">User</th>
+            <th className="p-3">Taken</th>
+            <th className="p-3">Returned</th>
+            <th className="p-3">Comment</th>
+          </tr>
+        </thead>
+        <tbody>
+          {logs.map(log => (
+            <tr key={log.id} className="border-b last:border-0">
+              <td className="p-3 whitespace-nowrap">
+                {log.timestamp ? new Date(`${log.timestamp}Z`).toLocaleString() : ""}
+              </td>
+              <td className="p-3 capitalize">{log.user_name}</td>
+              <td className="p-3">{formatItems(log.items_added)}</td>
+              <td className="p-3">{formatItems(log.items_returned)}</td>
+              <td className="p-3 text-gray-500">{log.comment}</td>
+            </tr>
+          ))}
+        </tbody>
+      </table>
+
+      {nextCursor && (
+        <div className="flex justify-center mt-6">
+          <button
+            onClick={() => fetchLogs(nextCursor)}
+            className="bg-[#285082] text-white px-6 py-2 rounded-md hover:bg-[#1f407a]"
+          >
+            Load more
+          </button>
+        </div>
+      )}
+    </div>
+  );
+};
+
+export default UserLog;
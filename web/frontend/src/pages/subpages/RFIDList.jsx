@@ -1,23 +1,44 @@
-  import React, { useEffect, useState } from "react";
+  import React, { useEffect, useRef, useState } from "react";
   import { useNavigate } from "react-router-dom";
   import { Pencil, Trash2 } from "lucide-react";
   import api from "../../api";
 
   const RFIDList = () => {
     const [boxes, setBoxes] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [uidFilter, setUidFilter] = useState("");
+    const [itemFilter, setItemFilter] = useState("");
     const [selectedBoxUid, setSelectedBoxUid] = useState(null);
+    const request = useRef(null);
 
     const navigate = useNavigate();
 
     useEffect(() => {
       fetchBoxes();
-    }, []);
-
-    const fetchBoxes = async () => {
+      return () => request.current?.abort();
+    }, [uidFilter, itemFilter]);
+
+    // One page at a time from /list/boxes; "Load more" continues from next_cursor.
+    // Each request cancels the one still in flight, so a slower, older response never
+    // replaces the results of the newer filter
+    const fetchBoxes = async (cursor = null) => {
+      request.current?.abort();
+      const controller = new AbortController();
+      request.current = controller;
       try {
-        const response = await api.get("/get-all-boxes");
-        setBoxes(response.data);
+        const response = await api.get("/list/boxes", {
+          params: {
+            uid: uidFilter || undefined,
+            item: itemFilter || undefined,
+            cursor: cursor ?? undefined,
+          },
+          signal: controller.signal,
+        });
+        const { results, next_cursor } = response.data;
+        setBoxes(prev => (cursor ? [...prev, ...results] : results));
+        setNextCursor(next_cursor);
       } catch (err) {
+        if (controller.signal.aborted) return;
         console.error("Failed to fetch boxes", err);
       }
     };
@@ -48,6 +69,23 @@
 
     return (
       <div className="p-4">
+        <div className="flex flex-wrap gap-4 mb-6">
+          <input
+            type="text"
+            placeholder="Filter by UID..."
+            value={uidFilter}
+            onChange={(e) => setUidFilter(e.target.value)}
+            className="px-4 py-2 border rounded-md focus:outline-none focus:ring focus:border-blue-300"
+          />
+          <input
+            type="text"
+            placeholder="Filter by item name..."
+            value={itemFilter}
+            onChange={(e) => setItemFilter(e.target.value)}
+            className="px-4 py-2 border rounded-md focus:outline-none focus:ring focus:border-blue-300"
+          />
+        </div>
+
         <div className="grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-6">
           {boxes.map((box) => {
             const isSelected = selectedBoxUid === box.uid;
@@ -104,6 +142,17 @@
             );
           })}
         </div>
+
+        {nextCursor && (
+          <div className="flex justify-center mt-6">
+            <button
+              onClick={() => fetchBoxes(nextCursor)}
+              className="bg-[#285082] text-white px-6 py-2 rounded-md hover:bg-[#1f407a]"
+            >
+              Load more
+            </button>
+          </div>
+        )}
       </div>
     );
   };
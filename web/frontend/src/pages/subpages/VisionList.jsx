@@ -1,23 +1,42 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { useNavigate } from "react-router-dom";
 import { Pencil, Trash2 } from "lucide-react"; // <-- Add icons
 import api from "../../api";
 
 const VisionList = () => {
   const [users, setUsers] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [nameFilter, setNameFilter] = useState("");
   const [selectedUserId, setSelectedUserId] = useState(null);
+  const request = useRef(null);
 
   const navigate = useNavigate();
 
   useEffect(() => {
     fetchUsers();
-  }, []);
+    return () => request.current?.abort();
+  }, [nameFilter]);
 
-  const fetchUsers = async () => {
+  // One page at a time from /list/users; "Load more" continues from next_cursor.
+  // Each request cancels the one still in flight, so a slower, older response never
+  // replaces the results of the newer filter
+  const fetchUsers = async (cursor = null) => {
+    request.current?.abort();
+    const controller = new AbortController();
+    request.current = controller;
     try {
-      const response = await api.get("/users");
-      setUsers(response.data);
+      const response = await api.get("/list/users", {
+        params: {
+          name: nameFilter || undefined,
+          cursor: cursor ?? undefined,
+        },
+        signal: controller.signal,
+      });
+      const { results, next_cursor } = response.data;
+      setUsers(prev => (cursor ? [...prev, ...results] : results));
+      setNextCursor(next_cursor);
     } catch (err) {
+      if (controller.signal.aborted) return;
       console.error("Failed to fetch users:", err);
     }
   };
@@ -57,6 +76,14 @@ const VisionList = () => {
 
   return (
     <div className="p-4">
+      <input
+        type="text"
+        placeholder="Search by name..."
+        value={nameFilter}
+        onChange={(e) => setNameFilter(e.target.value)}
+        className="mb-6 px-4 py-2 border rounded-md focus:outline-none focus:ring focus:border-blue-300"
+      />
+
       <div className="grid grid-cols-2 sm:grid-cols-3 md:grid-cols-4 lg:grid-cols-5 gap-6">
         {users.map(user => {
           const isSelected = selectedUserId === user.id;
@@ -105,6 +132,17 @@ const VisionList = () => {
           );
         })}
       </div>
+
+      {nextCursor && (
+        <div className="flex justify-center mt-6">
+          <button
+            onClick={() => fetchUsers(nextCursor)}
+            className="bg-[#285082] text-white px-6 py-2 rounded-md hover:bg-[#1f407a]"
+          >
+            Load more
+          </button>
+        </div>
+      )}
     </div>
   );
 };
@@ -46,17 +46,24 @@ const VisionSettings = () => {
             if (json.status) {
               triggerOnce();
             }
-          } else if (json.type === "recognition") {
-
-            const formattedName = json.name
-              ? json.name.replace(/\b\w/g, c => c.toUpperCase())
+          } else if (json.type === "recognitions") {
+            // Every tracked face, largest first; the primary one (closest to the camera) is
+            // shown once recognized, faces still pending are listed as such
+            const primary = json.faces.find(f => f.track_id === json.primary_track_id);
+            if (!primary || primary.pending) return;
+            const formatName = (name) => name
+              ? name.replace(/\b\w/g, c => c.toUpperCase())
               : "Unknown";
 
-              const confidence = json.distance !== null
-              ? Math.max(0, Math.min(100, (1.5 - json.distance) * 100)).toFixed(3)  // Example: distance 0.234 → confidence 0.766
+            const formattedName = formatName(primary.name);
+
+              const confidence = primary.distance !== null
+              ? Math.max(0, Math.min(100, (1.5 - primary.distance) * 100)).toFixed(3)  // Example: distance 0.234 → confidence 0.766
               : "0.000";
             
-            const logText = `Recognition result: ${formattedName} (${json.distance?.toFixed(3) ?? "N/A"})`;
+            const logText = "Recognition result: " + json.faces
+              .map(f => f.pending ? "Pending" : `${formatName(f.name)} (${f.distance?.toFixed(3) ?? "N/A"})`)
+              .join(", ");
 
             if (formattedName === detectionRef.current) {
               replaceDebugConsole(logText);
@@ -69,6 +76,11 @@ const VisionSettings = () => {
             setDetectionPercent(confidence);
             setDetectionName(formattedName);     // still needed for input box
             detectionRef.current = formattedName; // for immediate comparison
+          } else if (json.type === "stream_settings") {
+            // Adaptive stream controller changed quality / scale / frame rate
+            updateDebugConsole(
+              `Stream: ${json.fps} FPS, scale ${Math.round(json.scale * 100)}%, quality ${json.quality} (${json.reason})`
+            );
           }
 
         } else if (event.data instanceof Blob) {